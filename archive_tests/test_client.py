@@ -58,13 +58,20 @@ async def test_tinydb_tools():
             content_concepts = ["python", "web", "frameworks", "django", "flask", "apis", "programming"]
             found_suggestions = 0
             
-            for concept in content_concepts[:4]:  # Test first 4 concepts
+            concepts = content_concepts[:4]  # Test first 4 concepts
+            similar_results = await asyncio.gather(*[
+                client.call_tool("tinydb_find_similar_tags", {
+                    "query": concept,
+                    "limit": 3,
+                    "min_similarity": 0.3
+                })
+                for concept in concepts
+            ], return_exceptions=True)
+            
+            for concept, similar_result in zip(concepts, similar_results):
                 try:
-                    similar_result = await client.call_tool("tinydb_find_similar_tags", {
-                        "query": concept,
-                        "limit": 3,
-                        "min_similarity": 0.3
-                    })
+                    if isinstance(similar_result, BaseException):
+                        raise similar_result
                     similar_data = similar_result.data
                     
                     if similar_data.get("success"):
@@ -483,24 +490,44 @@ async def test_server_timestamps():
         traceback.print_exc()
         return False
 
+def run(coro):
+    """Run a coroutine on a fresh event loop, with eager tasks where supported (3.12+)."""
+    loop = asyncio.new_event_loop()
+    if hasattr(asyncio, "eager_task_factory"):
+        loop.set_task_factory(asyncio.eager_task_factory)
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        asyncio.set_event_loop(None)
+        loop.close()
+
 if __name__ == "__main__":
+    # uvloop is optional; fall back to the default event loop without it
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
     # Run main test
-    asyncio.run(main())
+    run(main())
     
     # Run tag mapping integration test
-    tag_mapping_success = asyncio.run(test_tag_mapping_integration())
+    tag_mapping_success = run(test_tag_mapping_integration())
     if not tag_mapping_success:
         print("❌ Tag mapping integration test failed!")
         exit(1)
     
     # Run fresh install test
-    fresh_success = asyncio.run(test_fresh_install_initialization())
+    fresh_success = run(test_fresh_install_initialization())
     if not fresh_success:
         print("❌ Fresh install test failed!")
         exit(1)
     
     # Run timestamp test
-    timestamp_success = asyncio.run(test_server_timestamps())
+    timestamp_success = run(test_server_timestamps())
     if not timestamp_success:
         print("❌ Timestamp test failed!")
         exit(1)
@@ -9,6 +9,8 @@ import os
 import pathlib
 from typing import Any, Dict
 
+from .embeddings import get_genai_client
+
 ASSISTANT_MODEL = os.getenv('FIRST_MCP_ASSISTANT_MODEL', 'gemini-2.5-flash')
 
 _PROMPTS_DIR = pathlib.Path(__file__).parent / 'prompts'
@@ -24,7 +26,6 @@ def get_second_opinion(question: str, context: str = "") -> Dict[str, Any]:
     """
     import importlib
     try:
-        genai = importlib.import_module('google.genai')
         genai_types = importlib.import_module('google.genai.types')
     except ImportError:
         return {'success': False, 'error': 'google-genai not installed'}
@@ -37,7 +38,7 @@ def get_second_opinion(question: str, context: str = "") -> Dict[str, Any]:
     contents = question if not context else f"{context}\n\n{question}"
 
     try:
-        client = genai.Client(api_key=api_key)
+        client = get_genai_client(api_key)
         response = client.models.generate_content(
             model=ASSISTANT_MODEL,
             contents=contents,
@@ -16,15 +16,20 @@ from .canonical import CANONICAL_NT_BOOKS, CANONICAL_OT_BOOKS
 # Markdown parsing (extracted from pynt extraction layer, no spaCy required)
 # ---------------------------------------------------------------------------
 
+# "16. text" (markdown list) or "16 text" (plain number)
+_VERSE_RE = re.compile(r'^(\d+)\.?\s+(.+)$')
+
+# Chapter header: ## Chapter 3  or  ## 3
+_CHAPTER_RE = re.compile(r'^##\s+.*?(\d+)')
+
+
 def _parse_verse_reference(line: str):
     """Extract (verse_number, verse_text) from a markdown line, or (None, line)."""
-    match = re.match(r'^(\d+)\.\s+(.+)$', line.strip())
+    line = line.strip()
+    match = _VERSE_RE.match(line)
     if match:
         return int(match.group(1)), match.group(2)
-    match = re.match(r'^(\d+)\s+(.+)$', line.strip())
-    if match:
-        return int(match.group(1)), match.group(2)
-    return None, line.strip()
+    return None, line
 
 
 def parse_chapter_markdown(markdown_text: str, book_name: str):
@@ -36,26 +41,25 @@ def parse_chapter_markdown(markdown_text: str, book_name: str):
         N. verse text        — verse (markdown list format)
     """
     verses = []
+    append = verses.append
     current_chapter = 1
 
-    for raw_line in markdown_text.strip().split('\n'):
-        line = raw_line.strip()
+    for line in markdown_text.splitlines():
+        line = line.strip()
         if not line:
             continue
 
-        # Chapter header: ## Chapter 3  or  ## 3
-        chapter_match = re.match(r'^##\s+.*?(\d+)', line)
-        if chapter_match:
-            current_chapter = int(chapter_match.group(1))
-            continue
-
-        # Book header: # Genesis
-        if line.startswith('#') and not line.startswith('##'):
+        match = _CHAPTER_RE.match(line)
+        if match:
+            current_chapter = int(match.group(1))
             continue
 
-        verse_num, verse_text = _parse_verse_reference(line)
-        if verse_num and verse_text:
-            verses.append((book_name, current_chapter, verse_num, verse_text))
+        # Book headers (# Genesis) never match the verse pattern
+        match = _VERSE_RE.match(line)
+        if match:
+            verse_num = int(match.group(1))
+            if verse_num:
+                append((book_name, current_chapter, verse_num, match.group(2)))
 
     return verses
 
@@ -17,6 +17,8 @@ from .canonical import CANONICAL_NT_BOOKS, CANONICAL_OT_BOOKS
 from .books import VerseAccessor
 from .sources import SUPPORTED_VERSIONS
 
+_CANONICAL_BOOKS = frozenset(CANONICAL_NT_BOOKS + CANONICAL_OT_BOOKS)
+
 
 class BibleReference:
     """A parsed biblical reference."""
@@ -138,15 +140,10 @@ class BibleLookup:
 
     def normalize_book_name(self, user_book_name: str) -> str:
         """Normalize a user-supplied book name to its canonical form."""
-        all_canonical = set(CANONICAL_NT_BOOKS + CANONICAL_OT_BOOKS)
         # Already a canonical name (e.g. "II_Samuel" passed directly)
-        if user_book_name in all_canonical:
+        if user_book_name in _CANONICAL_BOOKS:
             return user_book_name
-        key = user_book_name.lower().strip()
-        canonical = self.BOOK_MAPPINGS.get(key, user_book_name.title())
-        if canonical in all_canonical:
-            return canonical
-        return user_book_name.title()
+        return _BOOK_ALIASES.get(user_book_name.lower().strip(), user_book_name.title())
 
     def parse_reference(self, reference: str) -> BibleReference:
         """Parse a single biblical reference string into a BibleReference object."""
@@ -206,6 +203,13 @@ class BibleLookup:
         return results
 
 
+# Lowercased alias or canonical name -> canonical name, built once at import
+_BOOK_ALIASES = {book.lower(): book for book in _CANONICAL_BOOKS}
+_BOOK_ALIASES.update(
+    (alias, book) for alias, book in BibleLookup.BOOK_MAPPINGS.items() if book in _CANONICAL_BOOKS
+)
+
+
 # Module-level lookup instance (shared, thread-safe at the accessor cache level)
 _lookup = BibleLookup()
 
@@ -6,8 +6,13 @@ for semantic similarity scoring. These are general-purpose utilities not tied
 to the memory/tag system.
 """
 
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from importlib.util import find_spec as _find_spec
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import os
 
 # Check availability without importing (avoids 3+ second startup cost)
@@ -16,11 +21,37 @@ GENAI_AVAILABLE: bool = _find_spec('google.genai') is not None
 EMBEDDING_MODEL = "gemini-embedding-001"
 EMBEDDING_DIMENSIONS = 3072
 
+# One google.genai client per process (re-created only if the API key
+# changes), so every call after the first reuses its HTTP session instead of
+# paying for a new connection and TLS handshake.
+_client: Any = None
+_client_key: Optional[str] = None
+_client_lock = threading.Lock()
+
+
+def get_genai_client(api_key: str) -> Any:
+    """
+    Return the shared google.genai.Client for api_key, creating it on first use.
+
+    Raises ImportError if google-genai is not installed.
+    """
+    global _client, _client_key
+    with _client_lock:
+        if _client is None or _client_key != api_key:
+            import google.genai as genai
+            _client = genai.Client(api_key=api_key)
+            _client_key = api_key
+        return _client
+
 
 def generate_embedding(text: str) -> Optional[List[float]]:
     """
     Generate an embedding vector for text using Google AI API.
 
+    Successful results are memoized per text (see _embedding_cache), so
+    repeated queries and tags cost one API call per process. Failures are not
+    cached.
+
     Args:
         text: Text to embed
 
@@ -31,16 +62,62 @@ def generate_embedding(text: str) -> Optional[List[float]]:
     if not api_key:
         return None
 
+    key = _cache_key(text, api_key)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
     try:
-        import google.genai as genai
-        client = genai.Client(api_key=api_key)
+        client = get_genai_client(api_key)
         response = client.models.embed_content(
             model=EMBEDDING_MODEL,
             contents=text
         )
-        return response.embeddings[0].values
+        values = list(response.embeddings[0].values)
     except Exception:
         return None
+    _cache_put(key, values)
+    return values
+
+
+# Embeddings memoized by generate_embedding() and generate_embeddings_batch(),
+# least recently used first. Keys are a 16-byte digest of the model name and
+# text (memory contents can be long) plus the API key; values are packed
+# doubles, a third of the size of a list of Python floats. Tool calls run in
+# several threads, and a concurrent move_to_end/popitem corrupts the LRU order,
+# so every access holds _embedding_cache_lock.
+_EMBEDDING_CACHE_SIZE = 4096
+_embedding_cache: "OrderedDict[Tuple[bytes, str], array]" = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+
+
+def _cache_key(text: str, api_key: str) -> Tuple[bytes, str]:
+    digest = hashlib.blake2b(f"{EMBEDDING_MODEL}\0{text}".encode('utf-8'), digest_size=16).digest()
+    return digest, api_key
+
+
+def _cache_get(key: Tuple[bytes, str]) -> Optional[List[float]]:
+    with _embedding_cache_lock:
+        values = _embedding_cache.get(key)
+        if values is None:
+            return None
+        _embedding_cache.move_to_end(key)
+    return values.tolist()
+
+
+def _cache_put(key: Tuple[bytes, str], embedding: List[float]) -> None:
+    values = array('d', embedding)
+    with _embedding_cache_lock:
+        _embedding_cache[key] = values
+        _embedding_cache.move_to_end(key)
+        if len(_embedding_cache) > _EMBEDDING_CACHE_SIZE:
+            _embedding_cache.popitem(last=False)
+
+
+# Batches generate_embeddings_batch() sends concurrently. The calls are
+# IO-bound, so threads overlap their latency; the pool size caps the number
+# of requests in flight against the API rate limit.
+EMBEDDING_WORKERS = int(os.getenv('FIRST_MCP_EMBEDDING_WORKERS', '4'))
 
 
 def generate_embeddings_batch(texts: List[str], batch_size: int = 20) -> List[Optional[List[float]]]:
@@ -49,6 +126,9 @@ def generate_embeddings_batch(texts: List[str], batch_size: int = 20) -> List[Op
 
     Much more efficient than calling generate_embedding() in a loop when
     processing many texts. Results are returned in the same order as the input.
+    Texts already in the embedding cache (e.g. content re-processed by
+    smart_tag_mapping) are not sent to the API again. Up to EMBEDDING_WORKERS
+    batches are in flight at once.
 
     Args:
         texts: List of texts to embed
@@ -62,26 +142,38 @@ def generate_embeddings_batch(texts: List[str], batch_size: int = 20) -> List[Op
     if not api_key:
         return [None] * len(texts)
 
-    results: List[Optional[List[float]]] = [None] * len(texts)
+    keys = [_cache_key(text, api_key) for text in texts]
+    results: List[Optional[List[float]]] = [_cache_get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
 
     try:
-        import google.genai as genai
-        client = genai.Client(api_key=api_key)
-
-        for batch_start in range(0, len(texts), batch_size):
-            batch = texts[batch_start:batch_start + batch_size]
-            try:
-                response = client.models.embed_content(
-                    model=EMBEDDING_MODEL,
-                    contents=batch
-                )
-                for j, emb in enumerate(response.embeddings):
-                    results[batch_start + j] = list(emb.values)
-            except Exception:
-                pass  # Leave None for this batch; caller handles missing entries
-
+        client = get_genai_client(api_key)
     except Exception:
-        pass
+        return results
+
+    def embed_batch(batch: List[int]) -> List[List[float]]:
+        try:
+            response = client.models.embed_content(
+                model=EMBEDDING_MODEL,
+                contents=[texts[i] for i in batch]
+            )
+            return [list(emb.values) for emb in response.embeddings]
+        except Exception:
+            return []  # Leave None for this batch; caller handles missing entries
+
+    batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+    if len(batches) == 1:
+        embedded = [embed_batch(batches[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, min(EMBEDDING_WORKERS, len(batches)))) as pool:
+            embedded = list(pool.map(embed_batch, batches))
+
+    for batch, values in zip(batches, embedded):
+        for i, embedding in zip(batch, values):
+            results[i] = embedding
+            _cache_put(keys[i], embedding)
 
     return results
 
@@ -124,6 +216,31 @@ def cosine_similarity(embedding1: List[float], embedding2: List[float]) -> float
         return 0.0
 
 
+def normalize_embedding(embedding: List[float]) -> List[float]:
+    """
+    Return the L2-normalized embedding (unchanged if empty or all zeros).
+
+    Stored tag embeddings are normalized at write time so that similarity
+    against them reduces to a dot product. Components are rounded to 9
+    decimals: that keeps float32 precision but serializes as ~11 characters
+    instead of the 17-20 a widened float32 needs, roughly halving the JSON the
+    tags database has to write and parse.
+
+    Args:
+        embedding: Embedding vector
+
+    Returns:
+        Unit-length embedding as a list of floats
+    """
+    import numpy as np
+
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    if vec.size == 0 or norm == 0:
+        return list(embedding)
+    return np.round((vec / norm).astype(np.float64), 9).tolist()
+
+
 def weighted_combine_embeddings(
     emb_primary: List[float],
     emb_context: List[float],
@@ -296,19 +413,33 @@ def rank_texts_by_similarity(query: str, candidates: List[str]) -> Dict[str, Any
     ranked = []
     failed = []
 
-    for i, candidate in enumerate(candidates):
-        emb = generate_embedding(candidate)
+    # Embed all candidates in batched calls, then score them with one matrix product
+    embedded = []
+    for i, (candidate, emb) in enumerate(zip(candidates, generate_embeddings_batch(candidates))):
         if emb is None:
             failed.append({"index": i, "text": candidate})
-            continue
-        score = cosine_similarity(query_embedding, emb)
-        ranked.append({
-            "index": i,
-            "text": candidate,
-            "similarity": round(score, 4)
-        })
-
-    ranked.sort(key=lambda x: x["similarity"], reverse=True)
+        elif len(emb) != len(query_embedding):
+            ranked.append({"index": i, "text": candidate, "similarity": 0.0})
+        else:
+            embedded.append((i, candidate, emb))
+
+    if embedded:
+        import numpy as np
+
+        matrix = np.array([emb for _, _, emb in embedded], dtype=np.float32)
+        query_vec = np.array(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vec)
+        scores = np.divide(matrix @ query_vec, norms, out=np.zeros(len(matrix), dtype=np.float32),
+                           where=norms > 0)
+        scores = np.round(np.clip(scores, 0.0, 1.0).astype(np.float64), 4)
+        for (i, candidate, _), score in zip(embedded, scores.tolist()):
+            ranked.append({
+                "index": i,
+                "text": candidate,
+                "similarity": score
+            })
+
+    ranked.sort(key=lambda x: (x["similarity"], -x["index"]), reverse=True)
 
     result = {
         "success": True,
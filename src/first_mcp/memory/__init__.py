@@ -47,7 +47,9 @@ v2.1.0: Advanced features return as optional extensions
   - Advanced semantic grouping
 """
 
-from .database import get_memory_tinydb, get_tags_tinydb, get_categories_tinydb, get_custom_tinydb
+from .database import (
+    get_memory_tinydb, get_tags_tinydb, get_categories_tinydb, get_custom_tinydb, memory_batch
+)
 from .memory_tools import (
     tinydb_memorize,
     tinydb_recall_memory, 
@@ -90,6 +92,7 @@ from .tag_enrichment import (
 __all__ = [
     # Database connections
     'get_memory_tinydb', 'get_tags_tinydb', 'get_categories_tinydb', 'get_custom_tinydb',
+    'memory_batch',
     
     # Core memory tools
     'tinydb_memorize', 'tinydb_recall_memory', 'tinydb_search_memories', 
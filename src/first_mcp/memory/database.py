@@ -1,51 +1,416 @@
 """
 TinyDB database connection management for memory system.
+
+Handles are shared per file path for the lifetime of the process. Opening a
+TinyDB parses the whole JSON file, so re-opening on every tool call made each
+call pay a full read (and each close() a full rewrite). The shared handle keeps
+the parsed data in CachingMiddleware; close() only flushes pending writes.
+
+Other processes (e.g. the first-mcp-enrich runner) write the same files, so
+each getter compares the file's stat signature with the one recorded at the
+last load/flush and re-opens the handle when the file changed underneath us.
+
+Inside ``with memory_batch():`` flushes are deferred: each handle is written
+at most once every FLUSH_THRESHOLD writes and once more when the block exits,
+so bulk ingestion does not rewrite every file after every tool call.
+
+Usage-count bumps on existing tags are deferred the same way outside a batch
+(see SharedTinyDB.write_deferred): they are by far the most common tags-db write,
+and each one would otherwise rewrite the whole embeddings-heavy file. A
+deferred write waits at most DEFERRED_FLUSH_SECONDS before it is flushed.
+
+Handles are shared by FastMCP's worker threads, so each carries an RLock
+(SharedTinyDB.lock) that table operations, flushes and the re-open check hold.
+
+Serialization uses orjson when it is installed (``pip install first-mcp[fast]``)
+and falls back to the stdlib json module otherwise; both produce files the
+other can read.
 """
 
+import atexit
+import functools
+import io
+import itertools
 import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
 from tinydb import TinyDB
 from tinydb.storages import JSONStorage
+from tinydb.table import Table
 from tinydb.middlewares import CachingMiddleware
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
 
-def get_memory_tinydb():
-    """Get TinyDB instance for memories."""
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) for `path`, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class FastJSONStorage(JSONStorage):
+    """
+    JSONStorage that parses/serializes with orjson when available.
+
+    Files are always read and written as UTF-8 so non-ASCII text written by
+    orjson round-trips regardless of the platform's locale encoding. With
+    orjson the bytes go straight through the file's binary buffer: the text
+    layer would otherwise decode the whole file to str on read and re-encode
+    orjson's output on write. numpy arrays (e.g. embeddings) serialize as
+    plain JSON lists.
+
+    The files are kept uncompressed. The server rewrites a whole file on every
+    flush, so gzip would put a compression pass on each tag registration. The
+    migration script and the legacy server also open these files as plain
+    TinyDB JSON. Embeddings are stored rounded (see normalize_embedding) to
+    keep the tags file small instead.
+    """
+
+    def __init__(self, path: str, **kwargs: Any) -> None:
+        kwargs.setdefault('encoding', 'utf-8')
+        super().__init__(path, **kwargs)
+
+    def read(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        if orjson is None:
+            return super().read()
+        self._handle.seek(0)
+        raw = self._handle.buffer.read()
+        if not raw:
+            return None
+        return orjson.loads(raw)
+
+    def write(self, data: Dict[str, Dict[str, Any]]) -> None:
+        if orjson is None:
+            super().write(data)
+            return
+        serialized = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        self._handle.seek(0)
+        try:
+            self._handle.buffer.write(serialized)
+        except io.UnsupportedOperation:
+            raise IOError(f'Cannot write to the database. Access mode is "{self._mode}"')
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._handle.truncate()
+
+
+class TrackedCachingMiddleware(CachingMiddleware):
+    """
+    CachingMiddleware that counts writes.
+
+    Every TinyDB table mutation is exactly one storage write, so derived
+    in-memory structures (see memory/index.py) can compare `generation`
+    with the value they were built at to detect writes they did not see.
+    `pending` counts the writes not yet flushed to disk.
+
+    `lock` serializes access to the cache between threads (see LockedTable).
+    """
+
+    def __init__(self, storage_cls) -> None:
+        super().__init__(storage_cls)
+        self.generation = 0
+        self.pending = 0
+        self.lock = threading.RLock()
+
+    def write(self, data) -> None:
+        self.generation += 1
+        self.pending += 1
+        super().write(data)
+
+    def flush(self) -> None:
+        super().flush()
+        self.pending = 0
+
+
+def _holding_storage_lock(method: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(method)
+    def locked(self: Table, *args: Any, **kwargs: Any) -> Any:
+        with self.storage.lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class LockedTable(Table):
+    """
+    Table whose operations hold the storage lock.
+
+    Without it two threads inserting at once can draw the same
+    _get_next_id(), and a flush can serialize the cache while another
+    thread is mutating it.
+    """
+
+    def __iter__(self) -> Iterator[Any]:
+        # Table.__iter__ is a generator that reads lazily; materialize under the lock
+        with self.storage.lock:
+            documents = list(super().__iter__())
+        return iter(documents)
+
+
+for _name in ('insert', 'insert_multiple', 'all', 'search', 'get', 'contains', 'update',
+              'update_multiple', 'upsert', 'remove', 'truncate', 'count', 'clear_cache', '__len__'):
+    setattr(LockedTable, _name, _holding_storage_lock(getattr(Table, _name)))
+
+
+class SharedTinyDB(TinyDB):
+    """
+    TinyDB handle that stays open between tool calls.
+
+    close() flushes pending writes to disk but keeps the handle (and its
+    in-memory cache) usable, so existing ``db = get_x(); ...; db.close()``
+    call sites keep working unchanged.
+
+    Tool calls run in several threads; `lock` (an RLock) is held by every
+    table operation and flush. Hold it explicitly around read-modify-write
+    sequences that must not interleave with other threads.
+    """
+
+    table_class = LockedTable
+    _load_ids = itertools.count()
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path, storage=TrackedCachingMiddleware(FastJSONStorage))
+        self.path = path
+        self.signature = _file_signature(path)
+        self.load_id = next(self._load_ids)
+        self._replays: List[Callable[['SharedTinyDB'], None]] = []
+        self._deferred_writes = 0
+
+    @property
+    def lock(self) -> 'threading.RLock':
+        return self.storage.lock
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        """
+        Changes whenever the data may have changed: on every write and on
+        every re-open after an external change. Usable as a cache key.
+        """
+        return self.load_id, self.storage.generation
+
+    def flush(self) -> None:
+        """
+        Write pending changes to disk (no-op when nothing changed).
+
+        Inside memory_batch() this only writes once FLUSH_THRESHOLD writes are pending.
+        """
+        with self.lock:
+            if _batch.depth and self.storage.pending < FLUSH_THRESHOLD:
+                _batch.handles[self.path] = self
+                return
+            self._flush_now()
+
+    def write_deferred(self, write: Callable[['SharedTinyDB'], None]) -> None:
+        """
+        Call `write(self)` and leave its writes pending instead of flushing them.
+
+        They reach disk with the next flush(), once FLUSH_THRESHOLD writes are
+        pending, or DEFERRED_FLUSH_SECONDS after the oldest deferred write,
+        whichever comes first. If another process changes the file first and
+        only deferred writes are pending, the stale cache is dropped and
+        `write` is called again on the re-opened handle, so the other
+        process's changes are not overwritten. A `write` that changed nothing
+        is not kept.
+        """
+        with self.lock:
+            before = self.storage.generation
+            write(self)
+            writes = self.storage.generation - before
+            if not writes:
+                return
+            if not self._replays:
+                timer = threading.Timer(DEFERRED_FLUSH_SECONDS, _flush_deferred, args=(self.path,))
+                timer.daemon = True
+                timer.start()
+            self._replays.append(write)
+            self._deferred_writes += writes
+            if self.storage.pending >= FLUSH_THRESHOLD:
+                self._flush_now()
+
+    def _only_deferred_pending(self) -> bool:
+        return self._deferred_writes > 0 and self.storage.pending == self._deferred_writes
+
+    def _flush_now(self) -> None:
+        with self.lock:
+            self.storage.flush()
+            self.signature = _file_signature(self.path)
+            self._replays.clear()
+            self._deferred_writes = 0
+
+    def close(self) -> None:
+        """Flush pending writes; the shared handle itself stays open."""
+        self.flush()
+
+    def release(self) -> None:
+        """Flush and really close the underlying file handle."""
+        with self.lock:
+            self.storage.close()
+            self._opened = False
+
+    def discard(self) -> None:
+        """Close the underlying file handle without writing pending changes."""
+        with self.lock:
+            self.storage.storage.close()
+            self._opened = False
+
+
+_handles: Dict[str, SharedTinyDB] = {}
+_handles_lock = threading.Lock()
+
+# Pending writes allowed per handle inside memory_batch() before a flush is forced.
+FLUSH_THRESHOLD = 50
+# Longest a write left pending by SharedTinyDB.write_deferred() waits for a flush.
+DEFERRED_FLUSH_SECONDS = 5.0
+
+
+class _BatchState(threading.local):
+    """
+    memory_batch() nesting depth and the handles whose flush it deferred.
+
+    Per thread: FastMCP runs sync tools in worker threads, and a batch open
+    in one of them must not hold back the flushes of other tool calls.
+    """
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.handles: Dict[str, SharedTinyDB] = {}
+
+
+_batch = _BatchState()
+
+
+def _get_shared_tinydb(db_path: str) -> SharedTinyDB:
+    """Return the shared handle for `db_path`, re-opening it if the file changed on disk."""
+    db_path = os.path.abspath(db_path)
+    with _handles_lock:
+        db = _handles.get(db_path)
+        replays: List[Callable[[SharedTinyDB], None]] = []
+        if db is not None:
+            with db.lock:
+                if db.signature != _file_signature(db_path):
+                    if db._only_deferred_pending():
+                        replays = list(db._replays)
+                        db.discard()
+                    else:
+                        db.release()
+                    db = None
+        if db is None:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            db = SharedTinyDB(db_path)
+            _handles[db_path] = db
+            for replay in replays:
+                db.write_deferred(replay)
+        return db
+
+
+def _flush_handle(db: SharedTinyDB) -> None:
+    """Write `db`'s pending changes now, whatever the batch state."""
+    if db._only_deferred_pending() and os.path.exists(db.path):
+        # Picks up (and replays onto) a rewrite by another process
+        db = _get_shared_tinydb(db.path)
+    db._flush_now()
+
+
+def _flush_deferred(path: str) -> None:
+    """
+    Timer callback: flush the deferred writes still pending on `path`'s handle.
+
+    Runs on the timer thread, so it only flushes under the handle's lock and
+    never re-opens: if the file changed on disk meanwhile, the next getter
+    call re-opens the handle and replays the deferred writes in its own thread.
+    """
+    with _handles_lock:
+        db = _handles.get(path)
+    if db is None:
+        return
+    with db.lock:
+        if db._deferred_writes and db._opened and db.signature == _file_signature(path):
+            db._flush_now()
+
+
+def flush_all_tinydb() -> None:
+    """Flush every shared handle, including writes deferred by memory_batch(). Registered with atexit."""
+    with _handles_lock:
+        handles = list(_handles.values())
+    for db in handles:
+        try:
+            _flush_handle(db)
+        except Exception as e:
+            print(f"✗ Failed to flush {db.path}: {e}", file=sys.stderr)
+
+
+atexit.register(flush_all_tinydb)
+
+
+def _data_file(filename: str) -> str:
     base_path = os.getenv('FIRST_MCP_DATA_PATH', os.getcwd())
-    db_path = os.path.join(base_path, 'tinydb_memories.json')
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    return TinyDB(db_path, storage=CachingMiddleware(JSONStorage))
+    return os.path.join(base_path, filename)
+
+
+def get_memory_tinydb() -> SharedTinyDB:
+    """Get TinyDB instance for memories."""
+    return _get_shared_tinydb(_data_file('tinydb_memories.json'))
 
 
-def get_tags_tinydb():
+def get_tags_tinydb() -> SharedTinyDB:
     """Get TinyDB instance for tags."""
-    base_path = os.getenv('FIRST_MCP_DATA_PATH', os.getcwd())
-    db_path = os.path.join(base_path, 'tinydb_tags.json')
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    return TinyDB(db_path, storage=CachingMiddleware(JSONStorage))
+    return _get_shared_tinydb(_data_file('tinydb_tags.json'))
 
 
-def get_categories_tinydb():
+def get_categories_tinydb() -> SharedTinyDB:
     """Get TinyDB instance for categories."""
-    base_path = os.getenv('FIRST_MCP_DATA_PATH', os.getcwd())
-    db_path = os.path.join(base_path, 'tinydb_categories.json')
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    return TinyDB(db_path, storage=CachingMiddleware(JSONStorage))
+    return _get_shared_tinydb(_data_file('tinydb_categories.json'))
 
 
-def get_enrichment_tinydb():
+def get_enrichment_tinydb() -> SharedTinyDB:
     """Get TinyDB instance for the tag enrichment register."""
-    base_path = os.getenv('FIRST_MCP_DATA_PATH', os.getcwd())
-    db_path = os.path.join(base_path, 'tinydb_enrichment.json')
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    return TinyDB(db_path, storage=CachingMiddleware(JSONStorage))
+    return _get_shared_tinydb(_data_file('tinydb_enrichment.json'))
 
 
-def get_custom_tinydb(db_name: str):
+def get_custom_tinydb(db_name: str) -> SharedTinyDB:
     """Get TinyDB instance for user-specified database."""
-    base_path = os.getenv('FIRST_MCP_DATA_PATH', os.getcwd())
     # Add .json extension if not present
     if not db_name.endswith('.json'):
         db_name = f'{db_name}.json'
-    db_path = os.path.join(base_path, db_name)
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    return TinyDB(db_path, storage=CachingMiddleware(JSONStorage))
\ No newline at end of file
+    return _get_shared_tinydb(_data_file(db_name))
+
+
+@contextmanager
+def memory_batch() -> Iterator[None]:
+    """
+    Defer flushes for a burst of writes (e.g. scripted tinydb_memorize calls).
+
+    Nested batches are allowed; the handles whose flush was deferred are
+    flushed when the outermost exits, and a failed write raises from there.
+    Only flushes made on the calling thread are deferred.
+    """
+    _batch.depth += 1
+    try:
+        yield
+    finally:
+        _batch.depth -= 1
+        if not _batch.depth:
+            handles = list(_batch.handles.values())
+            _batch.handles.clear()
+            for db in handles:
+                _flush_handle(db)
+
+
+@contextmanager
+def with_memory_db() -> Iterator[SharedTinyDB]:
+    """Yield the shared memories handle and flush any writes on exit."""
+    db = get_memory_tinydb()
+    try:
+        yield db
+    finally:
+        db.flush()
@@ -5,12 +5,16 @@ Generic TinyDB database tools for working with custom databases.
 import uuid
 import os
 import glob
+import json
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 from tinydb import Query
 
 from .database import get_custom_tinydb
 
+# Query root reused by every tool below
+_RECORD = Query()
+
 
 def tinydb_create_database(db_name: str, description: str = "") -> Dict[str, Any]:
     """
@@ -51,7 +55,8 @@ def tinydb_create_database(db_name: str, description: str = "") -> Dict[str, Any
         return {"error": str(e)}
 
 
-def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id: str = "") -> Dict[str, Any]:
+def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id: str = "",
+                      return_data: bool = False) -> Dict[str, Any]:
     """
     Store data in any TinyDB database in the data folder.
     
@@ -63,6 +68,9 @@ def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id:
         table: Table name within the database
         data: Data to store (dictionary)
         record_id: Optional specific ID for the record
+        return_data: Echo the stored record back in the response (default: False).
+            When False only its serialized size is returned, which keeps bulk
+            imports from paying for a second copy + JSON encode of every record.
         
     Returns:
         Dictionary with storage confirmation and record ID
@@ -71,13 +79,12 @@ def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id:
         custom_db = get_custom_tinydb(db_name)
         try:
             table_db = custom_db.table(table)
-            Record = Query()
             
             if record_id:
                 # Update existing record or create with specific ID
-                existing = table_db.search(Record.id == record_id)
+                existing = table_db.search(_RECORD.id == record_id)
                 if existing:
-                    table_db.update(data, Record.id == record_id)
+                    table_db.update(data, _RECORD.id == record_id)
                     action = "updated"
                 else:
                     data['id'] = record_id
@@ -92,14 +99,18 @@ def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id:
             
             custom_db.close()
             
-            return {
+            response = {
                 "success": True,
                 "database": db_name,
                 "table": table,
                 "record_id": record_id,
-                "action": action,
-                "data": data
+                "action": action
             }
+            if return_data:
+                response["data"] = data
+            else:
+                response["data_size"] = len(json.dumps(data, default=str))
+            return response
             
         except Exception as e:
             custom_db.close()
@@ -127,46 +138,38 @@ def tinydb_query_data(db_name: str, table: str, query_conditions: Dict[str, Any]
     """
     try:
         custom_db = get_custom_tinydb(db_name)
-        try:
-            table_db = custom_db.table(table)
-            Record = Query()
-            
-            # Build query
-            if query_conditions:
-                query = None
-                for field, value in query_conditions.items():
-                    condition = Record[field] == value
-                    if query is None:
-                        query = condition
-                    else:
-                        query = query & condition
-                        
-                results = table_db.search(query)
-            else:
-                results = table_db.all()
-            
-            # Sort results if specified
-            if sort_by and results:
-                results.sort(key=lambda x: x.get(sort_by, ''), reverse=reverse_sort)
-            
-            # Apply limit
-            limited_results = results[:limit]
-            
-            custom_db.close()
-            
-            return {
-                "success": True,
-                "database": db_name,
-                "table": table,
-                "query_conditions": query_conditions,
-                "results": limited_results,
-                "total_found": len(results),
-                "returned_count": len(limited_results)
-            }
-            
-        except Exception as e:
-            custom_db.close()
-            raise e
+        table_db = custom_db.table(table)
+        
+        # Build query
+        if query_conditions:
+            query = None
+            for field, value in query_conditions.items():
+                condition = _RECORD[field] == value
+                if query is None:
+                    query = condition
+                else:
+                    query = query & condition
+                    
+            results = table_db.search(query)
+        else:
+            results = table_db.all()
+        
+        # Sort results if specified
+        if sort_by and results:
+            results.sort(key=lambda x: x.get(sort_by, ''), reverse=reverse_sort)
+        
+        # Apply limit
+        limited_results = results[:limit]
+        
+        return {
+            "success": True,
+            "database": db_name,
+            "table": table,
+            "query_conditions": query_conditions,
+            "results": limited_results,
+            "total_found": len(results),
+            "returned_count": len(limited_results)
+        }
         
     except Exception as e:
         return {"error": str(e)}
@@ -189,14 +192,13 @@ def tinydb_update_data(db_name: str, table: str, record_id: str, updates: Dict[s
         custom_db = get_custom_tinydb(db_name)
         try:
             table_db = custom_db.table(table)
-            Record = Query()
             
             # Perform update
-            updated = table_db.update(updates, Record.id == record_id)
+            updated = table_db.update(updates, _RECORD.id == record_id)
             
             if updated:
                 # Get updated record
-                updated_record = table_db.search(Record.id == record_id)[0]
+                updated_record = table_db.search(_RECORD.id == record_id)[0]
                 custom_db.close()
                 return {
                     "success": True,
@@ -218,7 +220,8 @@ def tinydb_update_data(db_name: str, table: str, record_id: str, updates: Dict[s
         return {"error": str(e)}
 
 
-def tinydb_delete_data(db_name: str, table: str, record_id: str = "", query_conditions: Dict[str, Any] = {}) -> Dict[str, Any]:
+def tinydb_delete_data(db_name: str, table: str, record_id: str = "", query_conditions: Dict[str, Any] = {},
+                       record_ids: List[str] = []) -> Dict[str, Any]:
     """
     Delete records from any TinyDB database in the data folder.
     
@@ -227,6 +230,9 @@ def tinydb_delete_data(db_name: str, table: str, record_id: str = "", query_cond
         table: Table name
         record_id: ID of specific record to delete (optional)
         query_conditions: Conditions for bulk deletion (optional)
+        record_ids: List of record IDs to delete in one pass (optional).
+            Much cheaper than one call per ID: a single table scan and a
+            single file rewrite regardless of how many IDs are given.
         
     Returns:
         Dictionary with deletion confirmation
@@ -235,17 +241,20 @@ def tinydb_delete_data(db_name: str, table: str, record_id: str = "", query_cond
         custom_db = get_custom_tinydb(db_name)
         try:
             table_db = custom_db.table(table)
-            Record = Query()
             
             if record_id:
                 # Delete specific record by ID
-                deleted_count = len(table_db.remove(Record.id == record_id))
+                deleted_count = len(table_db.remove(_RECORD.id == record_id))
                 operation_type = "single_record"
+            elif record_ids:
+                # Delete a batch of records by ID
+                deleted_count = len(table_db.remove(_RECORD.id.one_of(list(record_ids))))
+                operation_type = "batch_deletion"
             elif query_conditions:
                 # Delete records matching conditions
                 query = None
                 for field, value in query_conditions.items():
-                    condition = Record[field] == value
+                    condition = _RECORD[field] == value
                     if query is None:
                         query = condition
                     else:
@@ -255,7 +264,7 @@ def tinydb_delete_data(db_name: str, table: str, record_id: str = "", query_cond
                 operation_type = "bulk_deletion"
             else:
                 custom_db.close()
-                return {"error": "Must provide either record_id or query_conditions"}
+                return {"error": "Must provide record_id, record_ids or query_conditions"}
             
             custom_db.close()
             
@@ -318,7 +327,6 @@ def tinydb_list_databases() -> Dict[str, Any]:
             try:
                 temp_db = get_custom_tinydb(filename.replace('.json', ''))
                 db_info["table_count"] = len(temp_db.tables())
-                temp_db.close()
             except:
                 db_info["table_count"] = 0
                 
@@ -374,7 +382,7 @@ def tinydb_get_database_info(db_name: str) -> Dict[str, Any]:
         
         for table_name in custom_db.tables():
             table_db = custom_db.table(table_name)
-            record_count = len(table_db.all())
+            record_count = len(table_db)
             total_records += record_count
             
             table_info = {
@@ -396,8 +404,6 @@ def tinydb_get_database_info(db_name: str) -> Dict[str, Any]:
                 
             tables.append(table_info)
         
-        custom_db.close()
-        
         info.update({
             "tables": tables,
             "table_count": len(tables),
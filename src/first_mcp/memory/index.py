@@ -0,0 +1,192 @@
+"""
+In-memory secondary indexes for the memories table.
+
+TinyDB has no indexes: ``Record.id == X`` scans every document, and the
+category/tag filters in search and list walk the whole table. MemoryIndex keeps
+hash maps from memory id, lower-cased category and tag to TinyDB doc_ids so
+those lookups only touch matching documents.
+
+The index lives next to the shared TinyDB handle (see database.py). Writes made
+through the index helpers keep it in sync incrementally; any other write to the
+memories file bumps the storage generation and the index is rebuilt lazily on
+the next get_memory_index() call.
+
+Building the index is also where legacy rows get their numeric expires_at_ts
+back-filled, since it is the one place that already walks the whole table.
+"""
+
+import sys
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from tinydb.table import Document, Table
+
+from .database import SharedTinyDB
+
+
+def expiry_timestamp(expires_at: Optional[str]) -> Optional[float]:
+    """
+    Unix timestamp for an ISO expiry string, or None if absent/unparsable.
+
+    Naive values are interpreted as local time, matching datetime.now().
+    fromisoformat accepts a trailing 'Z' natively since Python 3.11, so no
+    string rewriting is needed before parsing.
+    """
+    if not expires_at:
+        return None
+    try:
+        return datetime.fromisoformat(expires_at).timestamp()
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+class MemoryIndex:
+    """
+    Hash indexes over the memories table: id → doc_id, category/tag → {doc_id}.
+
+    tag_sets mirrors each document's tag list as a frozenset (doc_id → tags) so
+    membership and set-difference checks don't re-scan the stored JSON lists.
+
+    Tag strings are interned as documents are indexed: the JSON parser creates a
+    separate str for every occurrence of a tag, and the same few hundred tags
+    repeat across thousands of memories.
+    """
+
+    def __init__(self, db: SharedTinyDB) -> None:
+        self.db = db
+        self.table: Table = db.table('memories')
+        self.by_id: Dict[str, int] = {}
+        self.by_category: Dict[str, Set[int]] = {}
+        self.by_tag: Dict[str, Set[int]] = {}
+        self.tag_sets: Dict[int, FrozenSet[str]] = {}
+        self._all: Optional[List[Document]] = None
+        missing_ts = []
+        for doc in self.table.all():
+            self._add(doc.doc_id, doc)
+            if doc.get('expires_at') and 'expires_at_ts' not in doc:
+                missing_ts.append(doc)
+        if missing_ts:
+            self._backfill_expiry_timestamps(missing_ts)
+        self.generation = db.storage.generation
+
+    def _backfill_expiry_timestamps(self, docs: List[Document]) -> None:
+        """One-time migration: store expires_at_ts on rows written before it existed."""
+        for doc in docs:
+            self.table.update({'expires_at_ts': expiry_timestamp(doc['expires_at'])},
+                              doc_ids=[doc.doc_id])
+        self.db.flush()
+
+    # -- maintenance -------------------------------------------------------
+
+    def _add(self, doc_id: int, memory: Dict[str, Any]) -> None:
+        memory_id = memory.get('id')
+        if memory_id:
+            self.by_id[memory_id] = doc_id
+        self.by_category.setdefault((memory.get('category') or '').lower(), set()).add(doc_id)
+        tag_list = memory.get('tags')
+        if tag_list:
+            # In place, so the cached table data shares the interned strings too
+            tag_list[:] = [sys.intern(tag) for tag in tag_list]
+        tags = frozenset(tag_list or ())
+        self.tag_sets[doc_id] = tags
+        for tag in tags:
+            self.by_tag.setdefault(tag, set()).add(doc_id)
+
+    def _discard(self, doc_id: int, memory: Dict[str, Any]) -> None:
+        if self.by_id.get(memory.get('id')) == doc_id:
+            del self.by_id[memory['id']]
+        self.by_category.get((memory.get('category') or '').lower(), set()).discard(doc_id)
+        for tag in self.tag_sets.pop(doc_id, ()):
+            self.by_tag.get(tag, set()).discard(doc_id)
+
+    def _advance(self) -> bool:
+        """
+        Account for the single write just made by the caller.
+
+        Returns False (and marks the index stale) if other writes happened
+        since the index was last in sync.
+        """
+        self._all = None
+        if self.db.storage.generation == self.generation + 1:
+            self.generation += 1
+            return True
+        self.generation = -1
+        return False
+
+    def is_current(self) -> bool:
+        return self.generation == self.db.storage.generation
+
+    # -- lookups -----------------------------------------------------------
+
+    def all(self) -> List[Document]:
+        """
+        Every memory, in insertion order.
+
+        The list is built once and reused until the next write, so bursts of
+        searches don't re-copy the table. Callers must not mutate it.
+        """
+        if self._all is None:
+            self._all = self.table.all()
+        return self._all
+
+    def get(self, memory_id: str) -> Optional[Document]:
+        """Return the memory document with this id, or None."""
+        doc_id = self.by_id.get(memory_id)
+        if doc_id is None:
+            return None
+        return self.table.get(doc_id=doc_id)
+
+    def docs(self, doc_ids: Iterable[int]) -> List[Document]:
+        """Fetch documents by doc_id, in insertion order."""
+        get = self.table.get
+        return [doc for doc in (get(doc_id=d) for d in sorted(doc_ids)) if doc is not None]
+
+    def tags_of(self, memory: Document) -> FrozenSet[str]:
+        """The memory's tags as a frozenset."""
+        tags = self.tag_sets.get(memory.doc_id)
+        return tags if tags is not None else frozenset(memory.get('tags') or ())
+
+    def in_category(self, category: str) -> List[Document]:
+        """All memories whose category equals `category` (case-insensitive)."""
+        return self.docs(self.by_category.get(category.strip().lower(), ()))
+
+    def with_any_tag(self, tags: Iterable[str], category: str = "") -> List[Document]:
+        """Memories carrying at least one of `tags`, optionally within `category`."""
+        doc_ids = set().union(*(self.by_tag.get(tag, ()) for tag in tags))
+        if category:
+            doc_ids &= self.by_category.get(category.strip().lower(), set())
+        return self.docs(doc_ids)
+
+    # -- writes ------------------------------------------------------------
+
+    def insert(self, memory: Dict[str, Any]) -> int:
+        doc_id = self.table.insert(memory)
+        if self._advance():
+            self._add(doc_id, memory)
+        return doc_id
+
+    def update(self, existing: Document, updates: Dict[str, Any]) -> List[int]:
+        """Apply `updates` to an existing document; return the updated doc_ids."""
+        updated = self.table.update(updates, doc_ids=[existing.doc_id])
+        if self._advance():
+            self._discard(existing.doc_id, existing)
+            self._add(existing.doc_id, {**existing, **updates})
+        return updated
+
+    def remove(self, existing: Document) -> List[int]:
+        """Remove an existing document; return the removed doc_ids."""
+        removed = self.table.remove(doc_ids=[existing.doc_id])
+        if self._advance():
+            self._discard(existing.doc_id, existing)
+        return removed
+
+
+_index: Optional[MemoryIndex] = None
+
+
+def get_memory_index(db: SharedTinyDB) -> MemoryIndex:
+    """Return the index for the shared memories handle, rebuilding it if stale."""
+    global _index
+    if _index is None or _index.db is not db or not _index.is_current():
+        _index = MemoryIndex(db)
+    return _index
@@ -2,52 +2,102 @@
 Core memory management tools for the TinyDB memory system.
 """
 
+import heapq
+import re
 import sys
 import time
 import uuid
+from collections import Counter, OrderedDict
 from datetime import datetime
-from typing import Dict, Any, List
-from tinydb import Query
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
 
 
 def _log_search(msg: str) -> None:
     print(f"{time.monotonic():.3f} [search] {msg}", file=sys.stderr, flush=True)
 
-from .database import get_memory_tinydb, get_categories_tinydb
+from .database import get_memory_tinydb, get_tags_tinydb, get_categories_tinydb, with_memory_db
+from .index import MemoryIndex, get_memory_index, expiry_timestamp
 from .tag_tools import tinydb_register_tags, decrement_tag_usage
 from .semantic_search import find_similar_tags_internal, check_category_exists
 from .tag_scoring import build_tag_registry, score_memories_by_tags
 from .pagination import save_paginated_results
 
 
-def tinydb_update_category_usage(category: str) -> None:
-    """Update category usage statistics in TinyDB."""
+# Stored on memories for the expiry filters only; not part of any tool response
+_INTERNAL_FIELDS = ('expires_at_ts',)
+
+
+def _public_memory(memory: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a stored memory without the internal fields."""
+    return {k: v for k, v in memory.items() if k not in _INTERNAL_FIELDS}
+
+
+# Row filters specialised per search shape: the caller picks one up front so the
+# per-row comprehension carries no "is this filter active?" branches.
+
+def _filter_active(rows: Iterable[Dict[str, Any]], now_ts: float) -> List[Dict[str, Any]]:
+    """Rows that have not expired."""
+    return [m for m in rows
+            if (ts := m.get('expires_at_ts')) is None or now_ts <= ts]
+
+
+def _filter_active_matching(rows: Iterable[Dict[str, Any]], pattern: "re.Pattern[str]",
+                            now_ts: float) -> List[Dict[str, Any]]:
+    """Rows whose content matches `pattern` and that have not expired."""
+    match = pattern.match
+    return [m for m in rows
+            if match(m['content'])
+            and ((ts := m.get('expires_at_ts')) is None or now_ts <= ts)]
+
+
+# (categories db version, category name -> doc_id) as of the last write made here
+_category_doc_ids_cache: Tuple[Any, Dict[str, int]] = (None, {})
+
+
+def _category_doc_ids(categories_db) -> Dict[str, int]:
+    """Map of category name -> doc_id, rebuilt only when the categories database changed."""
+    version, doc_ids = _category_doc_ids_cache
+    if version != categories_db.version:
+        doc_ids = {}
+        for entry in categories_db.table('categories').all():
+            doc_ids.setdefault(entry.get('category'), entry.doc_id)
+    return doc_ids
+
+
+def tinydb_update_category_usage(category: str, now_iso: Optional[str] = None) -> None:
+    """
+    Update category usage statistics in TinyDB.
+
+    One dict lookup and one write against the shared handle; the flush is
+    deferred inside memory_batch(). `now_iso` defaults to the current time.
+    """
+    global _category_doc_ids_cache
     try:
         categories_db = get_categories_tinydb()
-        try:
-            categories_table = categories_db.table('categories')
-            Record = Query()
+        categories_table = categories_db.table('categories')
+        doc_ids = _category_doc_ids(categories_db)
+        
+        now_iso = now_iso or datetime.now().isoformat()
+        doc_id = doc_ids.get(category)
+        existing = categories_table.get(doc_id=doc_id) if doc_id is not None else None
+        if existing:
+            categories_table.update(
+                {'usage_count': existing.get('usage_count', 0) + 1,
+                 'last_used_at': now_iso},
+                doc_ids=[existing.doc_id]
+            )
+        else:
+            doc_ids[category] = categories_table.insert({
+                'category': category,
+                'usage_count': 1,
+                'created_at': now_iso,
+                'last_used_at': now_iso
+            })
             
-            existing = categories_table.search(Record.category == category)
-            if existing:
-                categories_table.update(
-                    {'usage_count': existing[0]['usage_count'] + 1,
-                     'last_used_at': datetime.now().isoformat()},
-                    Record.category == category
-                )
-            else:
-                category_data = {
-                    'category': category,
-                    'usage_count': 1,
-                    'created_at': datetime.now().isoformat(),
-                    'last_used_at': datetime.now().isoformat()
-                }
-                categories_table.insert(category_data)
-                
-            # Force flush to disk
-            categories_db.close()
-        except Exception:
-            categories_db.close()
+        _category_doc_ids_cache = (categories_db.version, doc_ids)
+        categories_db.flush()
             
     except Exception:
         pass  # Non-critical operation
@@ -72,9 +122,8 @@ def tinydb_memorize(content: str, tags: str = "", category: str = "",
         Dictionary with memory ID and storage confirmation
     """
     try:
-        memory_db = get_memory_tinydb()
-        try:
-            memories_table = memory_db.table('memories')
+        with with_memory_db() as memory_db:
+            index = get_memory_index(memory_db)
             
             # Create memory record
             memory_id = str(uuid.uuid4())
@@ -101,10 +150,10 @@ def tinydb_memorize(content: str, tags: str = "", category: str = "",
             
             # Validate expiration
             expires_val = expires_at.strip() if expires_at else None
+            expires_ts = None
             if expires_val:
-                try:
-                    datetime.fromisoformat(expires_val.replace('Z', '+00:00'))
-                except ValueError:
+                expires_ts = expiry_timestamp(expires_val)
+                if expires_ts is None:
                     return {"error": f"Invalid expiration date format: {expires_val}. Use ISO format."}
             
             # Create memory object with proper timestamps
@@ -117,23 +166,21 @@ def tinydb_memorize(content: str, tags: str = "", category: str = "",
                 "category": category_val,
                 "importance": importance,
                 "expires_at": expires_val,
+                "expires_at_ts": expires_ts,
                 "metadata": {}
             }
             
-            # Store in TinyDB
-            memories_table.insert(memory_data)
-            
-            # Force flush to disk
-            memory_db.close()
+            # Store in TinyDB (flushed when the with-block exits)
+            index.insert(memory_data)
             
             # Register tags if any
             tag_info = {}
             if tag_list:
-                tag_info = tinydb_register_tags(tag_list)
+                tag_info = tinydb_register_tags(tag_list, now)
                 
             # Update category usage if provided
             if category_val:
-                tinydb_update_category_usage(category_val)
+                tinydb_update_category_usage(category_val, now)
             
             return {
                 "success": True,
@@ -149,9 +196,6 @@ def tinydb_memorize(content: str, tags: str = "", category: str = "",
                 "tag_mapping": mapping_info,
                 "message": "Information memorized successfully with TinyDB"
             }
-        except Exception as e:
-            memory_db.close()
-            raise e
         
     except Exception as e:
         return {"error": str(e)}
@@ -169,38 +213,126 @@ def tinydb_recall_memory(memory_id: str) -> Dict[str, Any]:
     """
     try:
         memory_db = get_memory_tinydb()
-        try:
-            memories_table = memory_db.table('memories')
-            Record = Query()
-            
-            # Find memory by ID
-            results = memories_table.search(Record.id == memory_id)
-            
-            if results:
-                memory = results[0]
-                # Check if expired
-                if memory.get('expires_at'):
-                    expiry = datetime.fromisoformat(memory['expires_at'].replace('Z', '+00:00'))
-                    if datetime.now() > expiry:
-                        memory_db.close()
-                        return {"error": f"Memory {memory_id} has expired"}
-                        
-                memory_db.close()
-                return {
-                    "success": True,
-                    "memory": memory
-                }
-            else:
-                memory_db.close()
-                return {"error": f"Memory with ID {memory_id} not found"}
-        except Exception as e:
-            memory_db.close()
-            raise e
+        
+        # Find memory by ID
+        memory = get_memory_index(memory_db).get(memory_id)
+        
+        if memory is not None:
+            # Check if expired
+            expires_ts = memory.get('expires_at_ts')
+            if expires_ts is not None and time.time() > expires_ts:
+                return {"error": f"Memory {memory_id} has expired"}
+                    
+            return {
+                "success": True,
+                "memory": _public_memory(memory)
+            }
+        else:
+            return {"error": f"Memory with ID {memory_id} not found"}
             
     except Exception as e:
         return {"error": str(e)}
 
 
+def _rank_memories(index: MemoryIndex, tags: str, content_keywords: str, category: str,
+                   limit: int, semantic_search: bool) -> Tuple[List[Dict[str, Any]], str]:
+    """Filter and rank memories for a search; returns (top `limit` results, scoring method)."""
+    # Resolve the tag mode up front so tag filtering can run in the scan below.
+    # filter_tags stays None when tags are scored (or absent) rather than filtered.
+    scored_method = "none"
+    input_tags: List[str] = []
+    tag_registry = {}
+    filter_tags = None
+    if tags:
+        input_tags = [t.strip().lower() for t in tags.split(',') if t.strip()]
+
+        if semantic_search:
+            _log_search("building tag registry")
+            try:
+                tag_registry = build_tag_registry()
+            except Exception as e:
+                _log_search(f"build_tag_registry failed: {e}")
+                raise
+            _log_search(f"tag registry: {len(tag_registry)} tags")
+            if not tag_registry:
+                expanded = set(input_tags)
+                for t in input_tags:
+                    expanded.update(find_similar_tags_internal(t, limit=3, min_similarity=0.4))
+                filter_tags = frozenset(t.lower() for t in expanded)
+                scored_method = "string_expansion"
+        else:
+            filter_tags = frozenset(input_tags)
+            scored_method = "exact"
+
+    # All keywords must occur (any order, case-insensitive): one anchored
+    # lookahead per word, evaluated in a single regex match per memory.
+    query_words = content_keywords.split() if content_keywords else []
+    content_pattern = re.compile(
+        ''.join(f'(?=.*{re.escape(w)})' for w in query_words), re.IGNORECASE | re.DOTALL
+    ) if query_words else None
+
+    # Tag and category filters come straight from the inverted index; the
+    # single pass below only checks content keywords (if any) and expiry.
+    _log_search("loading memories from TinyDB")
+    if filter_tags is not None:
+        candidates = index.with_any_tag(filter_tags, category)
+    elif category:
+        candidates = index.in_category(category)
+    else:
+        candidates = index.all()
+    if content_pattern is not None:
+        all_memories = _filter_active_matching(candidates, content_pattern, time.time())
+    else:
+        all_memories = _filter_active(candidates, time.time())
+
+    _log_search(f"loaded {len(all_memories)} memories")
+
+    # Tag-based scoring (primary); filtered modes only need the limit applied
+    if filter_tags is not None:
+        filtered_results = all_memories[:limit]
+    elif tags:
+        _log_search("scoring memories")
+        try:
+            scored = score_memories_by_tags(input_tags, all_memories, tag_registry)
+        except Exception as e:
+            _log_search(f"score_memories_by_tags failed: {e}")
+            raise
+        filtered_results = [mem for (_, mem, _) in scored][:limit]
+        scored_method = "tag_scoring"
+        _log_search(f"scoring done: {len(filtered_results)} results")
+    else:
+        # Top-K by heap: O(N log limit) instead of sorting all N
+        filtered_results = heapq.nlargest(
+            limit, all_memories,
+            key=lambda x: (x.get('importance', 3), x.get('last_modified') or x.get('timestamp') or ''),
+        )
+        scored_method = "importance"
+
+    return filtered_results, scored_method
+
+
+_SEARCH_CACHE_SIZE = 128
+# cache key -> ((memories db version, tags db version), ranked results, scoring method)
+_search_cache: "OrderedDict[tuple, Tuple[tuple, List[Dict[str, Any]], str]]" = OrderedDict()
+
+
+def _search_cache_key(tags: str, content_keywords: str, category: str,
+                      limit: int, semantic_search: bool) -> tuple:
+    """Normalise search criteria so equivalent queries (case, spacing) share an entry."""
+    return (
+        tuple(t.strip().lower() for t in tags.split(',') if t.strip()),
+        tuple(w.lower() for w in content_keywords.split()),
+        category.strip().lower(),
+        limit,
+        semantic_search,
+    )
+
+
+def _all_active(rows: List[Dict[str, Any]], now_ts: float) -> bool:
+    """True if none of `rows` has expired since it was ranked."""
+    return all((ts := m.get('expires_at_ts')) is None or now_ts <= ts for m in rows)
+
+
 def tinydb_search_memories(tags: str = "", content_keywords: str = "", category: str = "",
                           limit: int = 50, semantic_search: bool = True,
                           page_size: int = 5, sort_by: str = "relevance") -> Dict[str, Any]:
@@ -219,154 +351,84 @@ def tinydb_search_memories(tags: str = "", content_keywords: str = "", category:
     _log_search(f"start tags={tags!r} semantic={semantic_search}")
     try:
         memory_db = get_memory_tinydb()
-        try:
-            memories_table = memory_db.table('memories')
-
-            # Validate category if provided
-            if category:
-                category_exists, category_error, existing_categories = check_category_exists(category)
-                if not category_exists:
-                    memory_db.close()
-                    return {
-                        "success": False,
-                        "error": category_error,
-                        "available_categories": existing_categories,
-                    }
-
-            # Load and filter expired memories
-            _log_search("loading memories from TinyDB")
-            current_time = datetime.now()
-            all_memories = []
-            for memory in memories_table.all():
-                if memory.get('expires_at'):
-                    try:
-                        expiry = datetime.fromisoformat(memory['expires_at'].replace('Z', '+00:00'))
-                        if current_time > expiry:
-                            continue
-                    except Exception:
-                        pass
-                all_memories.append(memory)
-
-            memory_db.close()
-            _log_search(f"loaded {len(all_memories)} memories")
-
-            # Content keyword filter
-            if content_keywords:
-                query_words = [w.lower().strip() for w in content_keywords.split() if w.strip()]
-                all_memories = [
-                    m for m in all_memories
-                    if all(w in m['content'].lower() for w in query_words)
-                ]
-
-            # Category filter
-            if category:
-                all_memories = [
-                    m for m in all_memories
-                    if (m.get('category') or '').lower() == category.strip().lower()
-                ]
-
-            # Tag-based scoring (primary) or legacy expansion (fallback)
-            scored_method = "none"
-            if tags:
-                input_tags = [t.strip().lower() for t in tags.split(',') if t.strip()]
-
-                if semantic_search:
-                    _log_search("building tag registry")
-                    try:
-                        tag_registry = build_tag_registry()
-                    except Exception as e:
-                        _log_search(f"build_tag_registry failed: {e}")
-                        raise
-                    _log_search(f"tag registry: {len(tag_registry)} tags")
-                    if tag_registry:
-                        _log_search("scoring memories")
-                        try:
-                            scored = score_memories_by_tags(input_tags, all_memories, tag_registry)
-                        except Exception as e:
-                            _log_search(f"score_memories_by_tags failed: {e}")
-                            raise
-                        filtered_results = [mem for (_, mem, _) in scored][:limit]
-                        scored_method = "tag_scoring"
-                        _log_search(f"scoring done: {len(filtered_results)} results")
-                    else:
-                        expanded = set(input_tags)
-                        for t in input_tags:
-                            expanded.update(find_similar_tags_internal(t, limit=3, min_similarity=0.4))
-                        filter_tags = [t.lower() for t in expanded]
-                        filtered_results = [
-                            m for m in all_memories
-                            if any(ft in m.get('tags', []) for ft in filter_tags)
-                        ][:limit]
-                        scored_method = "string_expansion"
-                else:
-                    filter_tags = input_tags
-                    filtered_results = [
-                        m for m in all_memories
-                        if any(ft in m.get('tags', []) for ft in filter_tags)
-                    ][:limit]
-                    scored_method = "exact"
-            else:
-                all_memories.sort(
-                    key=lambda x: (x.get('importance', 3), x.get('last_modified') or x.get('timestamp') or ''),
-                    reverse=True,
-                )
-                filtered_results = all_memories[:limit]
-                scored_method = "importance"
-
-            # Date sort override
-            if sort_by in ("date_desc", "date_asc"):
-                filtered_results.sort(
-                    key=lambda m: m.get('last_modified') or m.get('timestamp') or '',
-                    reverse=(sort_by == "date_desc"),
-                )
-                scored_method = "tag_filter_date_sorted" if tags else "date_sorted"
+        index = get_memory_index(memory_db)
 
-            total_found = len(filtered_results)
-            first_page = filtered_results[:page_size]
-            has_more = total_found > page_size
+        # Validate category if provided
+        if category:
+            category_exists, category_error, existing_categories = check_category_exists(category)
+            if not category_exists:
+                return {
+                    "success": False,
+                    "error": category_error,
+                    "available_categories": existing_categories,
+                }
 
-            next_page_token = None
-            if has_more:
-                _log_search("saving paginated results")
-                try:
-                    next_page_token = save_paginated_results(
-                        all_results=filtered_results,
-                        page_size=page_size,
-                        query_info={
-                            "content_keywords": content_keywords, "tags": tags, "category": category,
-                            "limit": limit, "semantic_search": semantic_search,
-                            "page_size": page_size, "sort_by": sort_by,
-                        },
-                    )
-                except Exception as e:
-                    _log_search(f"save_paginated_results failed: {e}")
-                    raise
-                _log_search("pagination saved")
-
-            _log_search(f"returning {len(first_page)} memories, method={scored_method}")
-            return {
-                "success": True,
-                "memories": first_page,
-                "total_found": total_found,
-                "returned_count": len(first_page),
-                "has_more": has_more,
-                "next_page_token": next_page_token,
-                "scoring_method": scored_method,
-                "search_criteria": {
-                    "content_keywords": content_keywords,
-                    "tags": tags,
-                    "category": category,
-                    "limit": limit,
-                    "page_size": page_size,
-                    "semantic_search": semantic_search,
-                    "sort_by": sort_by,
-                },
-            }
+        # Repeated searches with the same normalised criteria reuse the ranked
+        # results while neither the memories nor the tags have changed.
+        cache_key = _search_cache_key(tags, content_keywords, category, limit, semantic_search)
+        versions = (memory_db.version, get_tags_tinydb().version)
+        cached = _search_cache.get(cache_key)
+        if cached is not None and cached[0] == versions and _all_active(cached[1], time.time()):
+            _log_search("search cache hit")
+            _search_cache.move_to_end(cache_key)
+            filtered_results, scored_method = list(cached[1]), cached[2]
+        else:
+            filtered_results, scored_method = _rank_memories(
+                index, tags, content_keywords, category, limit, semantic_search)
+            _search_cache[cache_key] = (versions, list(filtered_results), scored_method)
+            if len(_search_cache) > _SEARCH_CACHE_SIZE:
+                _search_cache.popitem(last=False)
+
+        # Date sort override
+        if sort_by in ("date_desc", "date_asc"):
+            filtered_results.sort(
+                key=lambda m: m.get('last_modified') or m.get('timestamp') or '',
+                reverse=(sort_by == "date_desc"),
+            )
+            scored_method = "tag_filter_date_sorted" if tags else "date_sorted"
+
+        filtered_results = [_public_memory(m) for m in filtered_results]
+        total_found = len(filtered_results)
+        first_page = filtered_results[:page_size]
+        has_more = total_found > page_size
+
+        next_page_token = None
+        if has_more:
+            _log_search("saving paginated results")
+            try:
+                next_page_token = save_paginated_results(
+                    all_results=filtered_results,
+                    page_size=page_size,
+                    query_info={
+                        "content_keywords": content_keywords, "tags": tags, "category": category,
+                        "limit": limit, "semantic_search": semantic_search,
+                        "page_size": page_size, "sort_by": sort_by,
+                    },
+                )
+            except Exception as e:
+                _log_search(f"save_paginated_results failed: {e}")
+                raise
+            _log_search("pagination saved")
 
-        except Exception as e:
-            _log_search(f"inner exception: {e}")
-            memory_db.close()
-            raise e
+        _log_search(f"returning {len(first_page)} memories, method={scored_method}")
+        return {
+            "success": True,
+            "memories": first_page,
+            "total_found": total_found,
+            "returned_count": len(first_page),
+            "has_more": has_more,
+            "next_page_token": next_page_token,
+            "scoring_method": scored_method,
+            "search_criteria": {
+                "content_keywords": content_keywords,
+                "tags": tags,
+                "category": category,
+                "limit": limit,
+                "page_size": page_size,
+                "semantic_search": semantic_search,
+                "sort_by": sort_by,
+            },
+        }
 
     except Exception as e:
         _log_search(f"outer exception: {e}")
@@ -386,74 +448,50 @@ def tinydb_list_memories(limit: int = 100, page_size: int = 10,
     """
     try:
         memory_db = get_memory_tinydb()
-        try:
-            memories_table = memory_db.table('memories')
-            all_memories = memories_table.all()
-
-            current_time = datetime.now()
-            active_memories = []
-            for memory in all_memories:
-                if memory.get('expires_at'):
-                    try:
-                        expiry = datetime.fromisoformat(memory['expires_at'].replace('Z', '+00:00'))
-                        if current_time > expiry:
-                            continue
-                    except Exception:
-                        pass
-                active_memories.append(memory)
-
-            memory_db.close()
-
-            # Category filter
-            if category:
-                active_memories = [
-                    m for m in active_memories
-                    if (m.get('category') or '').lower() == category.strip().lower()
-                ]
-
-            if sort_by in ("date_desc", "date_asc"):
-                active_memories.sort(
-                    key=lambda m: m.get('last_modified') or m.get('timestamp') or '',
-                    reverse=(sort_by == "date_desc"),
-                )
-            else:
-                active_memories.sort(
-                    key=lambda x: (x.get('importance', 3), x.get('last_modified') or x.get('timestamp') or ''),
-                    reverse=True,
-                )
-
-            capped = active_memories[:limit]
-            total_active = len(capped)
-            first_page = capped[:page_size]
-            has_more = total_active > page_size
-
-            next_page_token = None
-            if has_more:
-                next_page_token = save_paginated_results(
-                    all_results=capped,
-                    page_size=page_size,
-                    query_info={"limit": limit, "page_size": page_size,
-                                "category": category, "sort_by": sort_by},
-                )
+        index = get_memory_index(memory_db)
+        all_memories = index.in_category(category) if category else index.all()
+
+        active_memories = _filter_active(all_memories, time.time())
+
+        # Top-K by heap (stable, same order as sort + slice)
+        if sort_by in ("date_desc", "date_asc"):
+            select = heapq.nlargest if sort_by == "date_desc" else heapq.nsmallest
+            capped = select(limit, active_memories,
+                            key=lambda m: m.get('last_modified') or m.get('timestamp') or '')
+        else:
+            capped = heapq.nlargest(
+                limit, active_memories,
+                key=lambda x: (x.get('importance', 3), x.get('last_modified') or x.get('timestamp') or ''),
+            )
+
+        capped = [_public_memory(m) for m in capped]
+        total_active = len(capped)
+        first_page = capped[:page_size]
+        has_more = total_active > page_size
+
+        next_page_token = None
+        if has_more:
+            next_page_token = save_paginated_results(
+                all_results=capped,
+                page_size=page_size,
+                query_info={"limit": limit, "page_size": page_size,
+                            "category": category, "sort_by": sort_by},
+            )
 
-            return {
-                "success": True,
-                "memories": first_page,
-                "total_active": total_active,
-                "returned_count": len(first_page),
-                "has_more": has_more,
-                "next_page_token": next_page_token,
-                "search_criteria": {
-                    "category": category,
-                    "sort_by": sort_by,
-                    "limit": limit,
-                    "page_size": page_size,
-                },
-            }
-
-        except Exception as e:
-            memory_db.close()
-            raise e
+        return {
+            "success": True,
+            "memories": first_page,
+            "total_active": total_active,
+            "returned_count": len(first_page),
+            "has_more": has_more,
+            "next_page_token": next_page_token,
+            "search_criteria": {
+                "category": category,
+                "sort_by": sort_by,
+                "limit": limit,
+                "page_size": page_size,
+            },
+        }
 
     except Exception as e:
         return {"error": str(e)}
@@ -476,63 +514,56 @@ def tinydb_update_memory(memory_id: str, content: str = "", tags: str = "",
         Dictionary with update confirmation
     """
     try:
-        memory_db = get_memory_tinydb()
-        try:
-            memories_table = memory_db.table('memories')
-            Record = Query()
+        with with_memory_db() as memory_db:
+            index = get_memory_index(memory_db)
             
             # Find existing memory
-            existing = memories_table.search(Record.id == memory_id)
-            if not existing:
-                memory_db.close()
+            existing = index.get(memory_id)
+            if existing is None:
                 return {"error": f"Memory with ID {memory_id} not found"}
                 
-            # Prepare updates
+            # Prepare updates; the memory, its tags and its category share one timestamp
             updates = {}
+            now = datetime.now().isoformat()
             
             if content.strip():
                 updates['content'] = content.strip()
                 
             if tags.strip():
                 tag_list = [tag.strip().lower() for tag in tags.split(',') if tag.strip()]
-                old_tag_set = set(existing[0].get('tags', []))
-                new_tag_set = set(tag_list)
-                removed_tags = list(old_tag_set - new_tag_set)
+                removed_tags = list(index.tags_of(existing).difference(tag_list))
                 updates['tags'] = tag_list
                 if tag_list:
-                    tinydb_register_tags(tag_list)
+                    tinydb_register_tags(tag_list, now)
                 if removed_tags:
                     decrement_tag_usage(removed_tags)
                     
             if category.strip():
                 updates['category'] = category.strip()
-                tinydb_update_category_usage(category.strip())
+                tinydb_update_category_usage(category.strip(), now)
                 
             if importance > 0:
                 updates['importance'] = importance
                 
             if expires_at.strip():
-                try:
-                    datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
-                    updates['expires_at'] = expires_at.strip()
-                except ValueError:
-                    memory_db.close()
+                expires_ts = expiry_timestamp(expires_at.strip())
+                if expires_ts is None:
                     return {"error": f"Invalid expiration date format: {expires_at}"}
+                updates['expires_at'] = expires_at.strip()
+                updates['expires_at_ts'] = expires_ts
             
             if not updates:
-                memory_db.close()
                 return {"error": "No valid updates provided"}
             
             # Always update the last_modified timestamp
-            updates['last_modified'] = datetime.now().isoformat()
+            updates['last_modified'] = now
                 
             # Perform update
-            updated_count = memories_table.update(updates, Record.id == memory_id)
+            updated_count = index.update(existing, updates)
             
             if updated_count:
-                # Get updated record
-                updated_record = memories_table.search(Record.id == memory_id)[0]
-                memory_db.close()
+                # The stored record is exactly existing + updates; no need to re-read it
+                updated_record = {**existing, **updates}
                 # Re-queue for enrichment when tags change
                 if 'tags' in updates:
                     try:
@@ -543,16 +574,12 @@ def tinydb_update_memory(memory_id: str, content: str = "", tags: str = "",
                 return {
                     "success": True,
                     "memory_id": memory_id,
-                    "updated_fields": list(updates.keys()),
-                    "memory": updated_record
+                    "updated_fields": [k for k in updates if k not in _INTERNAL_FIELDS],
+                    "memory": _public_memory(updated_record)
                 }
             else:
-                memory_db.close()
                 return {"error": "Update failed"}
                 
-        except Exception as e:
-            memory_db.close()
-            raise e
             
     except Exception as e:
         return {"error": str(e)}
@@ -569,23 +596,19 @@ def tinydb_delete_memory(memory_id: str) -> Dict[str, Any]:
         Dictionary with deletion confirmation
     """
     try:
-        memory_db = get_memory_tinydb()
-        try:
-            memories_table = memory_db.table('memories')
-            Record = Query()
+        with with_memory_db() as memory_db:
+            index = get_memory_index(memory_db)
             
             # Check if memory exists
-            existing = memories_table.search(Record.id == memory_id)
-            if not existing:
-                memory_db.close()
+            existing = index.get(memory_id)
+            if existing is None:
                 return {"error": f"Memory with ID {memory_id} not found"}
                 
             # Delete the memory
-            deleted_count = memories_table.remove(Record.id == memory_id)
+            deleted_count = index.remove(existing)
             
             if deleted_count:
-                deleted_tags = existing[0].get('tags', [])
-                memory_db.close()
+                deleted_tags = existing.get('tags', [])
                 if deleted_tags:
                     decrement_tag_usage(deleted_tags)
                 try:
@@ -596,16 +619,12 @@ def tinydb_delete_memory(memory_id: str) -> Dict[str, Any]:
                 return {
                     "success": True,
                     "memory_id": memory_id,
-                    "deleted_memory": existing[0],
+                    "deleted_memory": _public_memory(existing),
                     "message": "Memory deleted successfully"
                 }
             else:
-                memory_db.close()
                 return {"error": "Deletion failed"}
                 
-        except Exception as e:
-            memory_db.close()
-            raise e
             
     except Exception as e:
         return {"error": str(e)}
@@ -620,7 +639,7 @@ def tinydb_memory_stats() -> Dict[str, Any]:
     """
     try:
         memory_db = get_memory_tinydb()
-        memories_table = memory_db.table('memories')
+        index = get_memory_index(memory_db)
         
         from .database import get_tags_tinydb, get_categories_tinydb
         tags_db = get_tags_tinydb()
@@ -629,39 +648,28 @@ def tinydb_memory_stats() -> Dict[str, Any]:
         categories_table = categories_db.table('categories')
         
         # Get all memories
-        all_memories = memories_table.all()
+        all_memories = index.all()
         
-        # Count active vs expired
-        current_time = datetime.now()
-        active_count = 0
-        expired_count = 0
+        total = len(all_memories)
         
-        importance_dist = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        category_dist = {}
+        # Count active vs expired (no/unparsable expiry -> NaN -> active)
+        expires = np.fromiter(
+            (ts if ts is not None else np.nan
+             for ts in (m.get('expires_at_ts') for m in all_memories)),
+            dtype=np.float64, count=total)
+        expired_count = int((expires < time.time()).sum())
+        active_count = total - expired_count
         
-        for memory in all_memories:
-            # Check expiration
-            if memory.get('expires_at'):
-                try:
-                    expiry = datetime.fromisoformat(memory['expires_at'].replace('Z', '+00:00'))
-                    if current_time <= expiry:
-                        active_count += 1
-                    else:
-                        expired_count += 1
-                except:
-                    active_count += 1  # Keep if date parsing fails
-            else:
-                active_count += 1
-                
-            # Count importance distribution
-            importance = memory.get('importance', 3)
-            if importance in importance_dist:
-                importance_dist[importance] += 1
-                
-            # Count category distribution
-            category = memory.get('category')
-            if category:
-                category_dist[category] = category_dist.get(category, 0) + 1
+        # Importance distribution; values outside 1-5 land in bin 0 and are ignored
+        importance = np.fromiter(
+            (imp if imp in (1, 2, 3, 4, 5) else 0
+             for imp in (m.get('importance', 3) for m in all_memories)),
+            dtype=np.int8, count=total)
+        counts = np.bincount(importance, minlength=6)
+        importance_dist = dict(zip(range(1, 6), counts[1:6].tolist()))
+        
+        # Category distribution
+        category_dist = dict(Counter(m['category'] for m in all_memories if m.get('category')))
         
         # Get tag statistics
         all_tags = tags_table.all()
@@ -673,7 +681,7 @@ def tinydb_memory_stats() -> Dict[str, Any]:
         
         return {
             "success": True,
-            "total_memories": len(all_memories),
+            "total_memories": total,
             "active_memories": active_count,
             "expired_memories": expired_count,
             "importance_distribution": importance_dist,
@@ -1,101 +1,569 @@
 """
 Semantic search functionality for memory system.
+
+The stacked tag-embedding matrix is also persisted as a float32 .npy sidecar
+next to tinydb_tags.json, named after a fingerprint of the embedded rows
+(tinydb_tags.embeddings.<fingerprint>.f32.npy). The fingerprint hashes the tag
+order and each row's embedding_generated_at stamp and normalized flag, which
+every embedding write sets, so it is computed without touching the embedding
+lists; only rows without a stamp are hashed by their components. A fresh
+process, or a rebuild after a usage-count-only change, memory-maps the sidecar
+and uses it as the matrix (the pages are shared with other processes) instead
+of stacking and normalising its own copy. The JSON file stays the source of
+truth.
+
+Large vocabularies (ANN_MIN_TAGS and up) are searched through an HNSW index
+when hnswlib is installed (``pip install first-mcp[fast]``); otherwise, and for
+smaller vocabularies, the exact matvec is used.
 """
 
-from typing import List, Tuple, Dict, Any
+import bisect
+import hashlib
+import os
+from functools import lru_cache
+from typing import List, Optional, Tuple, Dict, Any
+
+import numpy as np
+
 from .database import get_tags_tinydb, get_categories_tinydb
-from ..embeddings import generate_embedding as _generate_embedding, cosine_similarity as _cosine_similarity
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    hnswlib = None
+    HNSWLIB_AVAILABLE = False
+from ..embeddings import generate_embedding as _generate_embedding, generate_embeddings_batch as _generate_embeddings_batch
 
 
 def find_similar_tags_internal(query: str, limit: int = 5, min_similarity: float = 0.3) -> List[str]:
     """
     Internal helper to find similar tags using embeddings. Used by tinydb_search_memories for semantic expansion.
     Returns list of similar tag names, not the full MCP tool response format.
+
+    Results are memoized per tag-vocabulary version, so repeated searches skip
+    the query embedding call; any write to the tags database invalidates them.
+    When the query cannot be embedded the string-ladder result is returned
+    uncached, so a transient API error is retried on the next search.
     """
     try:
-        tags_db = get_tags_tinydb()
-        tags_table = tags_db.table('tags')
-        
-        all_tags = tags_table.all()
-        if not all_tags:
-            tags_db.close()
-            return []
-        
-        # Generate embedding for query
-        query_embedding = _generate_embedding(query)
-        similar_tags = []
-        
-        # Use embeddings if available
-        if query_embedding:
-            for tag_entry in all_tags:
-                tag_embedding = tag_entry.get('embedding', [])
-                if tag_embedding and len(tag_embedding) > 0:
-                    # Calculate embedding similarity
-                    similarity = _cosine_similarity(query_embedding, tag_embedding)
-                    
-                    if similarity >= min_similarity:
-                        similar_tags.append({
-                            "tag": tag_entry.get('tag', ''),
-                            "similarity": similarity,
-                            "usage_count": tag_entry.get('usage_count', 0)
-                        })
-        
-        # Fallback to string similarity if no embeddings available
-        if not similar_tags:
-            query_lower = query.lower().strip()
-            for tag_entry in all_tags:
-                tag = tag_entry.get('tag', '')
-                similarity = 0.0
-                
-                if query_lower in tag.lower():
-                    similarity = 0.8
-                elif any(word in tag.lower() for word in query_lower.split()):
-                    similarity = 0.6
-                elif any(word in query_lower for word in tag.lower().split()):
-                    similarity = 0.4
-                    
-                if similarity >= min_similarity:
-                    similar_tags.append({
-                        "tag": tag,
-                        "similarity": similarity,
-                        "usage_count": tag_entry.get('usage_count', 0)
-                    })
-        
-        # Sort by similarity first, then usage count
-        similar_tags.sort(key=lambda x: (x['similarity'], x['usage_count']), reverse=True)
-        tags_db.close()
-        
-        # Return just the tag names for internal use
-        return [tag_info["tag"] for tag_info in similar_tags[:limit]]
-        
+        try:
+            return list(_find_similar_tags_cached(query, limit, min_similarity, get_tags_tinydb().version))
+        except _EmbeddingUnavailable:
+            return [entry["tag"] for entry in _string_tag_entries(query, limit, min_similarity)]
     except Exception:
         return []
 
 
+def _load_tag_matrix(all_tags: List[Dict[str, Any]], dims: int,
+                     sidecar_base: Optional[str] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Stack tag embeddings into an L2-normalised float32 matrix.
+
+    Returns (names, usage_counts, matrix) with one row per tag. Tags without an
+    embedding of `dims` floats are skipped — cosine_similarity scores those 0.
+    Rows stored with normalized=True are already unit length; legacy rows are
+    normalised here.
+
+    With `sidecar_base`, the matrix is read from / written to the float32
+    sidecar when its fingerprint matches the embedded rows; a matrix read from
+    it is a read-only memory map, and the embedding lists are not read at all.
+    """
+    rows = [t for t in all_tags if len(t.get('embedding') or ()) == dims]
+    names = [t.get('tag', '') for t in rows]
+    usage = np.fromiter((t.get('usage_count', 0) for t in rows), dtype=np.int64, count=len(rows))
+
+    fingerprint = _matrix_fingerprint(sidecar_base, rows, dims) if sidecar_base else None
+    if fingerprint:
+        stored = _matrix_by_fingerprint.get(fingerprint)
+        if stored is None:
+            stored = _read_matrix_sidecar(sidecar_base, fingerprint, (len(rows), dims))
+        if stored is not None:
+            _remember_matrix(fingerprint, stored)
+            return names, usage, stored
+
+    matrix = np.asarray([t['embedding'] for t in rows], dtype=np.float32).reshape(len(rows), dims)
+    legacy = np.fromiter((not t.get('normalized') for t in rows), dtype=bool, count=len(rows))
+    if legacy.any():
+        norms = np.linalg.norm(matrix[legacy], axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix[legacy] /= norms
+
+    if fingerprint:
+        _write_matrix_sidecar(sidecar_base, fingerprint, matrix)
+        _remember_matrix(fingerprint, matrix)
+    return names, usage, matrix
+
+
+# fingerprint -> matrix of the most recent load. Usage-count and last-used
+# writes change the tags-db version but not the fingerprint, so the rebuild
+# they trigger only re-reads names and usage and keeps this matrix.
+_matrix_by_fingerprint: Dict[str, np.ndarray] = {}
+
+
+def _remember_matrix(fingerprint: str, matrix: np.ndarray) -> None:
+    if fingerprint not in _matrix_by_fingerprint:
+        _matrix_by_fingerprint.clear()
+        _matrix_by_fingerprint[fingerprint] = matrix
+
+
+def _matrix_fingerprint(base: str, rows: List[Dict[str, Any]], dims: int) -> str:
+    """
+    Short hash of what determines the matrix of the tags file at `base`: tag
+    order, normalisation and when each embedding was generated.
+
+    Every embedding write stamps embedding_generated_at, so the stamps stand
+    in for the embedding components without reading them. Rows without a
+    stamp (legacy or written by hand) are hashed by their components.
+    """
+    digest = hashlib.sha1(f"{base}\0{dims}\0{len(rows)}\n".encode())
+    for t in rows:
+        stamp = t.get('embedding_generated_at')
+        digest.update(f"{t.get('tag', '')}\0{stamp or ''}\0{bool(t.get('normalized'))}\n".encode())
+        if not stamp:
+            digest.update(np.asarray(t['embedding'], dtype=np.float32).tobytes())
+    return digest.hexdigest()[:20]
+
+
+def _read_matrix_sidecar(base: str, fingerprint: str, shape: Tuple[int, int]) -> Optional[np.ndarray]:
+    """Memory-mapped float32 matrix from the sidecar for this fingerprint, or None if there is none."""
+    try:
+        stored = np.load(f"{base}.{fingerprint}.f32.npy", mmap_mode='r')
+        if stored.shape != shape or stored.dtype != np.float32:
+            return None
+        return stored
+    except (OSError, ValueError):
+        return None
+
+
+def _write_matrix_sidecar(base: str, fingerprint: str, matrix: np.ndarray) -> None:
+    """Persist the float32 matrix (best effort) and remove sidecars of older fingerprints."""
+    path = f"{base}.{fingerprint}.f32.npy"
+    try:
+        tmp = f"{base}.{os.getpid()}.tmp.npy"
+        np.save(tmp, matrix)
+        os.replace(tmp, path)
+        directory, prefix = os.path.split(base)
+        for name in os.listdir(directory or '.'):
+            stale = os.path.join(directory, name)
+            if name.startswith(prefix + '.') and name.endswith(('.f16.npy', '.f32.npy')) and stale != path:
+                os.remove(stale)
+    except OSError:
+        pass
+
+
+# The matrix is float32 on purpose: NumPy dispatches float32 matvecs to BLAS,
+# while int8 matmuls run in its generic integer loop (and accumulate in int8
+# unless upcast), so an int8-quantized scan would be slower, not faster.
+# Upcasting the int8 rows to int32/float32 per query to avoid that costs a
+# full-size temporary, which is more memory traffic than the float32 scan it
+# replaces. Large vocabularies are served by the HNSW index instead.
+
+# (tags db version, dims) -> (names, usage_counts, matrix); holds the current version only
+_tag_matrix_cache: Dict[Tuple[Tuple[int, int], int], Tuple[List[str], np.ndarray, np.ndarray]] = {}
+# Same keys -> tag name -> row, built on the first usage update that needs it
+_tag_matrix_positions: Dict[Tuple[Tuple[int, int], int], Dict[str, int]] = {}
+
+
+def get_tag_matrix(dims: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    _load_tag_matrix() over the tags table, cached until the tags database changes.
+
+    Keyed on the shared handle's version, so tag registration and rewrites by
+    the enrichment runner invalidate it without explicit hooks. Usage-count
+    updates made through tag_tools are patched in instead (_carry_usage_update).
+    """
+    tags_db = get_tags_tinydb()
+    key = (tags_db.version, dims)
+    cached = _tag_matrix_cache.get(key)
+    if cached is None:
+        _tag_matrix_cache.clear()
+        _tag_matrix_positions.clear()
+        sidecar_base = os.path.splitext(tags_db.path)[0] + '.embeddings'
+        cached = _tag_matrix_cache[key] = _load_tag_matrix(tags_db.table('tags').all(), dims,
+                                                           sidecar_base)
+    return cached
+
+
+# Vocabularies at least this large use the HNSW index (when hnswlib is installed).
+# Below it the exact matvec is already sub-millisecond, so an index only adds build time.
+ANN_MIN_TAGS = int(os.getenv('FIRST_MCP_ANN_MIN_TAGS', '5000'))
+# Search breadth of the HNSW index; hnswlib widens it to k when a query asks for more.
+ANN_EF = 64
+# (matrix, hnswlib.Index) for the current matrix only
+_ann_cache: Tuple[Optional[np.ndarray], Any] = (None, None)
+
+
+def _ann_index(matrix: np.ndarray) -> Any:
+    """
+    HNSW inner-product index over the normalised matrix.
+
+    Keyed on the matrix object rather than the db version: _load_tag_matrix
+    keeps one matrix per fingerprint (tag order and embeddings), so
+    usage-count-only writes reuse the index instead of rebuilding it.
+    """
+    global _ann_cache
+    cached_matrix, index = _ann_cache
+    if cached_matrix is not matrix:
+        index = hnswlib.Index(space='ip', dim=matrix.shape[1])
+        index.init_index(max_elements=len(matrix), ef_construction=200, M=16)
+        index.add_items(matrix, np.arange(len(matrix)))
+        index.set_ef(ANN_EF)
+        _ann_cache = (matrix, index)
+    return index
+
+
+def uses_ann_index(tag_count: int) -> bool:
+    """
+    Whether a vocabulary of `tag_count` embedded tags is searched through the
+    HNSW index, which only returns the nearest candidates, not every match.
+    """
+    return HNSWLIB_AVAILABLE and tag_count >= ANN_MIN_TAGS
+
+
+def _similar_rows(matrix: np.ndarray, query_unit: np.ndarray,
+                  min_similarity: float, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (row indices, similarities) of matrix rows scoring at least min_similarity.
+
+    With the HNSW index (uses_ann_index) only the max(4 * limit, 16) nearest
+    rows are candidates, so further matches may be missing.
+    """
+    if uses_ann_index(len(matrix)):
+        k = min(len(matrix), max(limit * 4, 16))
+        index = _ann_index(matrix)
+        labels, distances = index.knn_query(query_unit, k=k)
+        idx = labels[0].astype(np.intp)
+        sims = np.clip(1.0 - distances[0], 0.0, 1.0)  # 'ip' distance is 1 - dot
+    else:
+        sims = np.clip(matrix @ query_unit, 0.0, 1.0)
+        idx = np.arange(len(matrix))
+    keep = sims >= min_similarity
+    return idx[keep], sims[keep]
+
+
+# (tags db version, tag names, usage counts, last-used times, joined lower-cased
+#  names, name start offsets, word -> rows inverted index, longest indexed word,
+#  tag name -> row or None until a usage update needs it)
+_tag_strings_cache: Tuple[Any, ...] = (None,) * 9
+
+# Separates the lower-cased names in the joined buffer; a needle without it
+# can never match across two names.
+_NAME_SEPARATOR = '\0'
+
+
+def _rows_containing(haystack: str, starts: List[int], needle: str) -> List[int]:
+    """
+    Rows whose name contains needle, from the names joined into one buffer.
+
+    Each str.find is a single C-level scan; after a hit the search resumes at
+    the next name, so the loop runs once per matching row, not once per tag.
+    """
+    if not starts or _NAME_SEPARATOR in needle:
+        return []
+    rows = []
+    pos = haystack.find(needle)
+    while pos >= 0:
+        row = bisect.bisect_right(starts, pos) - 1
+        rows.append(row)
+        if row + 1 == len(starts):
+            break
+        pos = haystack.find(needle, starts[row + 1])
+    return rows
+
+
+def _rows_with_word_in(query_lower: str, word_rows: Dict[str, List[int]], max_len: int) -> List[int]:
+    """
+    Rows having a name word that is a substring of the query.
+
+    Tag words contain no whitespace, so they can only occur inside a single
+    query token; every substring of each token (up to the longest indexed
+    word) is looked up in the inverted index instead of scanning all words.
+    """
+    hits = set()
+    for token in set(query_lower.split()):
+        for i in range(len(token)):
+            for j in range(i + 1, min(len(token), i + max_len) + 1):
+                rows = word_rows.get(token[i:j])
+                if rows:
+                    hits.update(rows)
+    return list(hits)
+
+
+def _string_scores(query: str, haystack: str, starts: List[int],
+                   word_rows: Dict[str, List[int]], max_len: int,
+                   min_similarity: float = 0.0) -> np.ndarray:
+    """
+    String-similarity ladder used when no embeddings are available, for every tag.
+
+    0.8 if the query is a substring of the tag, 0.6 if any query word is,
+    0.4 if any tag word is a substring of the query, else 0.0. Each rung is
+    resolved to the exact set of rows it applies to (see _rows_containing and
+    _rows_with_word_in), so the cost follows the number of matches rather
+    than the size of the vocabulary. Rungs scoring below min_similarity are
+    not evaluated at all; their rows are left at 0.0.
+    """
+    query_lower = query.lower().strip()
+    scores = np.zeros(len(starts))
+    if min_similarity <= 0.4:
+        scores[_rows_with_word_in(query_lower, word_rows, max_len)] = 0.4
+    if min_similarity <= 0.6:
+        for word in set(query_lower.split()):
+            scores[_rows_containing(haystack, starts, word)] = 0.6
+    if min_similarity <= 0.8:
+        scores[_rows_containing(haystack, starts, query_lower)] = 0.8
+    return scores
+
+
+def _string_columns(lower_names: List[str]) -> Tuple[str, List[int], Dict[str, List[int]], int]:
+    """Joined names, their start offsets, the word -> rows index and the longest word."""
+    starts = []
+    offset = 0
+    word_rows: Dict[str, List[int]] = {}
+    for i, name in enumerate(lower_names):
+        starts.append(offset)
+        offset += len(name) + len(_NAME_SEPARATOR)
+        for word in set(name.split()):
+            word_rows.setdefault(word, []).append(i)
+    return (_NAME_SEPARATOR.join(lower_names), starts, word_rows,
+            max(map(len, word_rows), default=0))
+
+
+def find_similar_tags_by_string(query: str, min_similarity: float,
+                                limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Tags scoring at least min_similarity on the string ladder, as
+    {"tag", "similarity", "usage_count", "last_used"} entries ordered by
+    similarity, then usage count (first `limit` only, if given).
+
+    The tag columns (names, usage counts, last-used times, the joined
+    lower-cased names and a word -> rows index) are extracted once per
+    tags-db version, so a query does no per-tag Python work.
+    """
+    return _string_matches(query, min_similarity, limit)[0]
+
+
+def _string_matches(query: str, min_similarity: float,
+                    limit: Optional[int]) -> Tuple[List[Dict[str, Any]], int]:
+    """find_similar_tags_by_string() entries plus the number of tags that matched in total."""
+    global _tag_strings_cache
+    tags_db = get_tags_tinydb()
+    if _tag_strings_cache[0] != tags_db.version:
+        rows = tags_db.table('tags').all()
+        tag_names = [t.get('tag', '') for t in rows]
+        _tag_strings_cache = (
+            tags_db.version, tag_names,
+            np.fromiter((t.get('usage_count', 0) for t in rows), dtype=np.int64, count=len(rows)),
+            [t.get('last_used_at', '') for t in rows],
+            *_string_columns([name.lower() for name in tag_names]),
+            None,
+        )
+    (_, tag_names, usage, last_used, haystack, starts, word_rows, max_word_len, _) = _tag_strings_cache
+
+    scores = _string_scores(query, haystack, starts, word_rows, max_word_len, min_similarity)
+    idx = np.flatnonzero(scores >= min_similarity)  # every tag when min_similarity <= 0
+    scores = scores[idx]
+    order = _top_rows(scores, usage[idx], len(idx) if limit is None else limit)
+    return ([{"tag": tag_names[i], "similarity": score, "usage_count": int(usage[i]),
+              "last_used": last_used[i]}
+             for i, score in zip(idx[order].tolist(), scores[order].tolist())],
+            len(idx))
+
+
+def _row_positions(names: List[str]) -> Optional[Dict[str, int]]:
+    """Tag name -> row, or None when a name occurs twice (the row to patch is ambiguous)."""
+    positions = {name: i for i, name in enumerate(names)}
+    return positions if len(positions) == len(names) else None
+
+
+def _carry_usage_update(version_before: Tuple[int, int], version_after: Tuple[int, int],
+                        usage_by_tag: Dict[str, int], last_used_at: Optional[str] = None) -> None:
+    """
+    Move the cached tag columns across a write that only changed usage counts.
+
+    The tag matrix and the string-ladder columns store names, usage counts and
+    last-used times as parallel arrays, so the new values are assigned to the
+    affected rows and the entries re-keyed to version_after, instead of being
+    rebuilt from the whole table on the next query. Columns cached at any
+    other version are left to be rebuilt as usual.
+    """
+    global _tag_strings_cache
+    for key in [key for key in _tag_matrix_cache if key[0] == version_before]:
+        names, usage, matrix = _tag_matrix_cache.pop(key)
+        positions = _tag_matrix_positions.pop(key, None) or _row_positions(names)
+        if positions is None:
+            continue
+        usage = usage.copy()
+        for tag, count in usage_by_tag.items():
+            row = positions.get(tag)
+            if row is not None:
+                usage[row] = count
+        new_key = (version_after, key[1])
+        _tag_matrix_cache[new_key] = (names, usage, matrix)
+        _tag_matrix_positions[new_key] = positions
+
+    if _tag_strings_cache[0] != version_before:
+        return
+    (_, tag_names, usage, last_used, *columns, positions) = _tag_strings_cache
+    positions = positions or _row_positions(tag_names)
+    if positions is None:
+        _tag_strings_cache = (None,) * 9
+        return
+    usage = usage.copy()
+    if last_used_at:
+        last_used = list(last_used)
+    for tag, count in usage_by_tag.items():
+        row = positions.get(tag)
+        if row is not None:
+            usage[row] = count
+            if last_used_at:
+                last_used[row] = last_used_at
+    _tag_strings_cache = (version_after, tag_names, usage, last_used, *columns, positions)
+
+
+def _top_rows(sims: np.ndarray, usage: np.ndarray, limit: int) -> np.ndarray:
+    """
+    Positions of the `limit` best entries: similarity first, then usage count
+    (both descending).
+
+    np.partition finds the limit-th best similarity in linear time, so only the
+    entries at or above it (ties included) are sorted.
+    """
+    if limit <= 0:
+        return np.empty(0, dtype=np.intp)
+    if len(sims) > limit:
+        kth = np.partition(sims, len(sims) - limit)[len(sims) - limit]
+        pos = np.flatnonzero(sims >= kth)
+    else:
+        pos = np.arange(len(sims))
+    return pos[np.lexsort((-usage[pos], -sims[pos]))][:limit]
+
+
+def top_tag_entries(names: List[str], usage: np.ndarray, idx: np.ndarray,
+                    sims: np.ndarray, limit: int) -> List[Dict[str, Any]]:
+    """
+    {"tag", "similarity", "usage_count"} entries for the `limit` best of tag
+    matrix rows `idx` scoring `sims`, similarity first, then usage count.
+    """
+    return [{"tag": names[idx[j]], "similarity": round(float(sims[j]), 4),
+             "usage_count": int(usage[idx[j]])}
+            for j in _top_rows(sims, usage[idx], limit)]
+
+
+def _string_tag_entries(query: str, limit: int, min_similarity: float) -> List[Dict[str, Any]]:
+    """Result entries from the string ladder, similarity first, then usage count."""
+    return [{"tag": entry["tag"], "similarity": entry["similarity"], "usage_count": entry["usage_count"]}
+            for entry in find_similar_tags_by_string(query, min_similarity, limit)]
+
+
+class _EmbeddingUnavailable(Exception):
+    """The query embedding could not be generated; its result must not be cached."""
+
+
+@lru_cache(maxsize=1024)
+def _find_similar_tags_cached(query: str, limit: int, min_similarity: float,
+                              vocab_version: Tuple[int, int]) -> Tuple[str, ...]:
+    """
+    Body of find_similar_tags_internal; vocab_version is only a cache key.
+
+    Raises _EmbeddingUnavailable instead of caching a fallback when the query
+    embedding call fails.
+    """
+    if not len(get_tags_tinydb().table('tags')):
+        return ()
+    
+    # Generate embedding for query
+    query_embedding = _generate_embedding(query)
+    if not query_embedding:
+        raise _EmbeddingUnavailable(query)
+    similar_tags = []
+    
+    # One matvec against the cached tag matrix
+    names, usage, matrix = get_tag_matrix(len(query_embedding))
+    query_vec = np.asarray(query_embedding, dtype=np.float32)
+    query_norm = np.linalg.norm(query_vec)
+    if names and query_norm > 0:
+        idx, sims = _similar_rows(matrix, query_vec / query_norm, min_similarity, limit)
+        similar_tags = top_tag_entries(names, usage, idx, sims, limit)
+    
+    # Fallback to string similarity if no embedded tag matched
+    if not similar_tags:
+        similar_tags = _string_tag_entries(query, limit, min_similarity)
+    
+    # Return just the tag names for internal use
+    return tuple(tag_info["tag"] for tag_info in similar_tags)
+
+
+def find_similar_tags_batch(queries: List[str], limit: int = 5,
+                            min_similarity: float = 0.3) -> List[List[Dict[str, Any]]]:
+    """
+    Similar existing tags for several queries at once (as in tinydb_find_similar_tags).
+
+    The queries are embedded in one batched call and scored against the cached
+    tag matrix with a single matrix product. A query whose embedding failed, or
+    that matches nothing, falls back to the string ladder.
+    Returns one list per query of {"tag", "similarity", "usage_count"}, best first.
+    """
+    results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+    if not queries or not len(get_tags_tinydb().table('tags')):
+        return results
+
+    embeddings = _generate_embeddings_batch(list(queries))
+    by_dims: Dict[int, List[int]] = {}
+    for i, emb in enumerate(embeddings):
+        if emb:
+            by_dims.setdefault(len(emb), []).append(i)
+
+    for dims, rows in by_dims.items():
+        names, usage, matrix = get_tag_matrix(dims)
+        if not names:
+            continue
+        query_matrix = np.asarray([embeddings[i] for i in rows], dtype=np.float32)
+        norms = np.linalg.norm(query_matrix, axis=1, keepdims=True)
+        norms[norms == 0] = np.inf  # zero vectors score 0
+        scores = np.clip((query_matrix / norms) @ matrix.T, 0.0, 1.0)
+        for row, sims in zip(rows, scores):
+            idx = np.flatnonzero(sims >= min_similarity)
+            results[row] = top_tag_entries(names, usage, idx, sims[idx], limit)
+
+    for i, query in enumerate(queries):
+        if not results[i]:
+            results[i] = _string_tag_entries(query, limit, min_similarity)
+    return results
+
+
+# Category names as of a categories-db version: (version, names, lower-cased set)
+_category_cache: Tuple[Any, List[str], frozenset] = (None, [], frozenset())
+
+
 def check_category_exists(category: str) -> Tuple[bool, str, List[str]]:
     """
     Check if a category exists and return error info if not.
     Returns (exists: bool, error_message: str, existing_categories: list)
+
+    The category names are cached until the categories database changes, so
+    the check is a set lookup rather than a table scan.
     """
+    global _category_cache
     try:
         categories_db = get_categories_tinydb()
-        categories_table = categories_db.table('categories')
+        version, existing_cats, lower_cats = _category_cache
+        if version != categories_db.version:
+            existing_cats = [cat.get('category', '') for cat in categories_db.table('categories').all()
+                             if cat.get('category')]
+            lower_cats = frozenset(cat.lower() for cat in existing_cats)
+            _category_cache = (categories_db.version, existing_cats, lower_cats)
         
-        all_categories = categories_table.all()
-        categories_db.close()
-        
-        if not all_categories:
+        if not existing_cats:
             return False, "No categories exist in database", []
         
-        existing_cats = [cat.get('category', '') for cat in all_categories if cat.get('category')]
-        
         # Check for exact match (case insensitive)
-        if category.lower() in [cat.lower() for cat in existing_cats if cat]:
-            return True, "", existing_cats
+        if category.lower() in lower_cats:
+            return True, "", list(existing_cats)
         
         # Category doesn't exist
         error_msg = f"Category '{category}' not found. Available categories: {', '.join(existing_cats)}"
-        return False, error_msg, existing_cats
+        return False, error_msg, list(existing_cats)
         
     except Exception as e:
-        return False, f"Error checking categories: {str(e)}", []
\ No newline at end of file
+        return False, f"Error checking categories: {str(e)}", []
@@ -32,18 +32,23 @@ from typing import Any, Dict, List, Optional
 
 _PROMPTS_DIR = pathlib.Path(__file__).parent.parent / 'prompts'
 
+import numpy as np
 from pydantic import BaseModel
 from tinydb import Query
 
 from .database import get_memory_tinydb, get_tags_tinydb, get_enrichment_tinydb
-from .tag_tools import increment_tag_usage, decrement_tag_usage
-from ..embeddings import cosine_similarity as _cosine_similarity, EMBEDDING_MODEL
+from .semantic_search import get_tag_matrix, top_tag_entries
+from .tag_scoring import build_tag_registry
+from .tag_tools import increment_tag_usage, decrement_tag_usage, get_tag_doc_id, insert_tags
+from ..embeddings import EMBEDDING_MODEL, normalize_embedding, get_genai_client, generate_embeddings_batch
 
 
 ENRICHMENT_LLM_MODEL = os.getenv('FIRST_MCP_ENRICHMENT_MODEL', 'gemini-2.5-flash')
 MIN_TAGS_PER_MEMORY = int(os.getenv('FIRST_MCP_MIN_TAGS', '2'))
 REPLACEMENT_SIMILARITY_THRESHOLD = 0.85
 
+_RECORD = Query()
+
 
 def _log(msg: str) -> None:
     entry = f"{datetime.now().isoformat()} {msg}\n"
@@ -97,8 +102,7 @@ def remove_from_enrichment_register(memory_id: str) -> None:
     """
     db = get_enrichment_tinydb()
     table = db.table('enriched')
-    Record = Query()
-    table.remove(Record.memory_id == memory_id)
+    table.remove(_RECORD.memory_id == memory_id)
     db.close()
 
 
@@ -107,12 +111,10 @@ def get_unenriched_memory_ids(limit: int) -> List[str]:
     memory_db = get_memory_tinydb()
     memories_table = memory_db.table('memories')
     all_memories = memories_table.all()
-    memory_db.close()
 
     enrich_db = get_enrichment_tinydb()
     enrich_table = enrich_db.table('enriched')
     enriched_ids = {r['memory_id'] for r in enrich_table.all()}
-    enrich_db.close()
 
     return [m['id'] for m in all_memories if m.get('id') not in enriched_ids][:limit]
 
@@ -123,44 +125,35 @@ def get_unenriched_memory_ids(limit: int) -> List[str]:
 
 def _get_tag_meta(tag_name: str) -> Optional[Dict[str, Any]]:
     """Return the full tag record for `tag_name`, or None if not found."""
-    tags_db = get_tags_tinydb()
-    tags_table = tags_db.table('tags')
-    Record = Query()
-    results = tags_table.search(Record.tag == tag_name)
-    tags_db.close()
-    return results[0] if results else None
+    doc_id = get_tag_doc_id(tag_name)
+    return get_tags_tinydb().table('tags').get(doc_id=doc_id) if doc_id is not None else None
 
 
-def _register_new_tags_sync(client: "genai.Client", new_tags: List[str]) -> None:
+def _register_new_tags_sync(new_tags: List[str]) -> None:
     """Register brand-new tags with embeddings. Synchronous — call from a thread."""
     if not new_tags:
         return
 
-    tags_db = get_tags_tinydb()
-    tags_table = tags_db.table('tags')
-    truly_new = [t for t in new_tags if not tags_table.search(Query().tag == t)]
-    tags_db.close()
+    truly_new = [t for t in dict.fromkeys(new_tags) if get_tag_doc_id(t) is None]
 
     if not truly_new:
         return
 
     now = datetime.now().isoformat()
-    tags_db = get_tags_tinydb()
-    tags_table = tags_db.table('tags')
-
-    for tag in truly_new:
-        try:
-            resp = client.models.embed_content(model=EMBEDDING_MODEL, contents=tag)
-            embedding: List[float] = list(resp.embeddings[0].values)
+    records = []
+    for tag, raw in zip(truly_new, generate_embeddings_batch(truly_new)):
+        if raw:
+            embedding: List[float] = normalize_embedding(raw)
             extra: Dict[str, Any] = {
+                'normalized': True,
                 'embedding_generated_at': now,
                 'embedding_model': EMBEDDING_MODEL,
             }
-        except Exception:
+        else:
             embedding = []
             extra = {}
 
-        tags_table.insert({
+        records.append({
             'tag': tag,
             'usage_count': 1,
             'created_at': now,
@@ -169,7 +162,8 @@ def _register_new_tags_sync(client: "genai.Client", new_tags: List[str]) -> None
             **extra,
         })
 
-    tags_db.close()
+    insert_tags(records)
+    get_tags_tinydb().close()
 
 
 # ---------------------------------------------------------------------------
@@ -183,12 +177,15 @@ def _replacement_passes_guardrail(old_tag: str, new_tag: str) -> bool:
     if not old_meta or not new_meta:
         return False
 
-    old_emb = old_meta.get('embedding', [])
-    new_emb = new_meta.get('embedding', [])
-    if not old_emb or not new_emb:
+    # Unit-length rows of the cached tag matrix: the cosine is one dot product
+    # instead of two list -> array conversions and two norms per call
+    registry = build_tag_registry()
+    old_vec = registry.get(old_tag)
+    new_vec = registry.get(new_tag)
+    if old_vec is None or new_vec is None or old_vec.shape != new_vec.shape:
         return False
 
-    if _cosine_similarity(old_emb, new_emb) < REPLACEMENT_SIMILARITY_THRESHOLD:
+    if float(old_vec @ new_vec) < REPLACEMENT_SIMILARITY_THRESHOLD:
         return False
 
     return new_meta.get('usage_count', 0) > old_meta.get('usage_count', 0)
@@ -198,6 +195,39 @@ def _replacement_passes_guardrail(old_tag: str, new_tag: str) -> bool:
 # Prompt builder
 # ---------------------------------------------------------------------------
 
+def _similar_tag_map(tags: List[str], min_similarity: float = 0.55,
+                     limit: int = 6) -> Dict[str, List[Dict]]:
+    """
+    Up to `limit` most similar other registry tags for each of `tags`.
+
+    Scores come from the cached, normalised tag matrix (semantic_search): one
+    matrix product per embedding size instead of a cosine_similarity() call
+    for every (memory tag, registry tag) pair. Tags without an embedding map
+    to an empty list.
+    """
+    similar_map: Dict[str, List[Dict]] = {tag: [] for tag in tags}
+    wanted = set(tags)
+    by_dims: Dict[int, List[str]] = {}
+    for record in get_tags_tinydb().table('tags').all():
+        tag = record.get('tag')
+        if tag in wanted and record.get('embedding'):
+            wanted.discard(tag)
+            by_dims.setdefault(len(record['embedding']), []).append(tag)
+
+    for dims, group in by_dims.items():
+        names, usage, matrix = get_tag_matrix(dims)
+        position = {name: i for i, name in enumerate(names)}
+        group = [tag for tag in group if tag in position]
+        if not group:
+            continue
+        name_array = np.array(names, dtype=object)
+        scores = np.clip(matrix[[position[tag] for tag in group]] @ matrix.T, 0.0, 1.0)
+        for tag, sims in zip(group, scores):
+            idx = np.flatnonzero((sims >= min_similarity) & (name_array != tag))
+            similar_map[tag] = top_tag_entries(names, usage, idx, sims[idx], limit)
+    return similar_map
+
+
 def _build_prompt(mem: Dict[str, Any], similar_map: Dict[str, List[Dict]]) -> str:
     template = (_PROMPTS_DIR / 'tag_enrichment.md').read_text(encoding='utf-8')
     header = template.format(min_tags=MIN_TAGS_PER_MEMORY)
@@ -239,7 +269,6 @@ def enrich_single(memory_id: str) -> Dict[str, Any]:
     import importlib
     try:
         _log("[enrich_single] importing google.genai...")
-        genai = importlib.import_module('google.genai')
         genai_types = importlib.import_module('google.genai.types')
         _log("[enrich_single] import done")
     except ImportError:
@@ -252,54 +281,22 @@ def enrich_single(memory_id: str) -> Dict[str, Any]:
     # Load memory
     _log("[enrich_single] loading memory from TinyDB")
     db = get_memory_tinydb()
-    rows = db.table('memories').search(Query().id == memory_id)
-    db.close()
+    rows = db.table('memories').search(_RECORD.id == memory_id)
 
     if not rows:
         return {'success': False, 'error': f'Memory {memory_id} not found'}
 
     mem = rows[0]
 
-    # Build similar_map: load full tag registry and compute cosine similarity
+    # Build similar_map from the cached tag-embedding matrix
     _log("[enrich_single] loading tag registry")
-    tags_db = get_tags_tinydb()
-    all_tag_records = tags_db.table('tags').all()
-    tags_db.close()
-
-    registry = {
-        r['tag']: {
-            'embedding': r.get('embedding', []),
-            'usage_count': r.get('usage_count', 0),
-        }
-        for r in all_tag_records
-        if r.get('tag') and r.get('embedding')
-    }
-
-    similar_map: Dict[str, List[Dict]] = {}
-    for tag in mem.get('tags', []):
-        tag_emb = registry.get(tag, {}).get('embedding', [])
-        if not tag_emb:
-            similar_map[tag] = []
-            continue
-        candidates = []
-        for other_tag, other_data in registry.items():
-            if other_tag == tag:
-                continue
-            sim = _cosine_similarity(tag_emb, other_data['embedding'])
-            if sim >= 0.55:
-                candidates.append({
-                    'tag': other_tag,
-                    'similarity': round(sim, 4),
-                    'usage_count': other_data['usage_count'],
-                })
-        candidates.sort(key=lambda x: (x['similarity'], x['usage_count']), reverse=True)
-        similar_map[tag] = candidates[:6]
+    similar_map = _similar_tag_map(mem.get('tags', []))
 
     _log("[enrich_single] similar_map built")
     prompt = _build_prompt(mem, similar_map)
 
     _log("[enrich_single] calling Gemini API")
-    client = genai.Client(api_key=api_key)
+    client = get_genai_client(api_key)
     response = client.models.generate_content(
         model=ENRICHMENT_LLM_MODEL,
         contents=prompt,
@@ -354,7 +351,7 @@ def enrich_single(memory_id: str) -> Dict[str, Any]:
             added += len(to_add_existing)
 
         if patch.add_new:
-            _register_new_tags_sync(client, patch.add_new)
+            _register_new_tags_sync(patch.add_new)
             for tag in patch.add_new:
                 if tag not in tags:
                     tags.append(tag)
@@ -365,7 +362,7 @@ def enrich_single(memory_id: str) -> Dict[str, Any]:
         if tags != original_tags:
             memories_table.update(
                 {'tags': tags, 'last_modified': datetime.now().isoformat()},
-                Query().id == memory_id,
+                _RECORD.id == memory_id,
             )
 
         mark_enriched(memory_id, tags_added)
@@ -9,8 +9,36 @@ TODO:
 - Handle edge cases for malformed input
 """
 
+import heapq
 from typing import List, Dict, Any, Tuple
-from .tag_tools import tinydb_find_similar_tags, _generate_embedding, _cosine_similarity
+
+import numpy as np
+
+from .semantic_search import find_similar_tags_batch
+from .tag_tools import _generate_embeddings_batch
+
+
+def _content_similarities(content_embedding: List[float],
+                          tag_embeddings: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Cosine similarity of each embedded tag to the content, in one matrix product.
+
+    Tags whose embedding failed are left out; tags embedded with a different
+    dimension score 0.0, matching cosine_similarity().
+    """
+    dims = len(content_embedding)
+    sims = {tag: 0.0 for tag, emb in tag_embeddings.items() if emb}
+    same_dims = [tag for tag in sims if len(tag_embeddings[tag]) == dims]
+    if not same_dims:
+        return sims
+    
+    matrix = np.asarray([tag_embeddings[tag] for tag in same_dims], dtype=np.float32)
+    query = np.asarray(content_embedding, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    norms[norms == 0] = np.inf  # zero vectors score 0
+    scores = np.clip((matrix @ query) / norms, 0.0, 1.0)
+    sims.update(zip(same_dims, scores.tolist()))
+    return sims
 
 
 def smart_tag_mapping(input_tags: List[str], content: str, max_tags: int = 3) -> Dict[str, Any]:
@@ -39,45 +67,39 @@ def smart_tag_mapping(input_tags: List[str], content: str, max_tags: int = 3) ->
     
     # Step 1: Process each input tag
     final_tags = []
+    final_set = set()  # mirrors final_tags for O(1) duplicate checks
     candidates = []  # (tag, similarity_score, source_info)
     mapping_log = []
     auto_replacements = 0
     
     try:
-        for input_tag in input_tags:
-            input_tag = input_tag.strip().lower()
-            if not input_tag:
-                continue
-                
-            # Find similar existing tags
-            similar_result = tinydb_find_similar_tags(input_tag, limit=5, min_similarity=0.7)
-            
-            if similar_result.get('success') and similar_result.get('similar_tags'):
-                similar_tags = similar_result['similar_tags']
+        # Find similar existing tags for every input tag in one batched lookup
+        cleaned_tags = [tag.strip().lower() for tag in input_tags]
+        cleaned_tags = [tag for tag in cleaned_tags if tag]
+        similar_by_tag = find_similar_tags_batch(cleaned_tags, limit=5, min_similarity=0.7)
+        
+        for input_tag, similar_tags in zip(cleaned_tags, similar_by_tag):
+            if similar_tags:
+                # Results are sorted by similarity, so only the best one can auto-replace (>0.9)
+                best = similar_tags[0]
+                similarity = best.get('similarity', 0)
+                existing_tag = best.get('tag', '')
                 
-                # Check for auto-replacement (>0.9 similarity)
-                auto_replaced = False
-                for similar in similar_tags:
-                    similarity = similar.get('similarity', 0)
-                    existing_tag = similar.get('tag', '')
-                    
-                    if similarity > 0.9:
-                        # Auto-replace with most similar existing tag
+                if similarity > 0.9:
+                    # Auto-replace with most similar existing tag
+                    if existing_tag not in final_set:
+                        final_set.add(existing_tag)
                         final_tags.append(existing_tag)
-                        mapping_log.append(f"Auto-replaced '{input_tag}' → '{existing_tag}' (similarity: {similarity:.3f})")
-                        auto_replacements += 1
-                        auto_replaced = True
-                        break
-                
-                if not auto_replaced:
-                    # Add to candidates if >0.75 similarity
+                    mapping_log.append(f"Auto-replaced '{input_tag}' → '{existing_tag}' (similarity: {similarity:.3f})")
+                    auto_replacements += 1
+                else:
+                    # Add to candidates if >0.75 similarity, stopping at the first that isn't
                     for similar in similar_tags:
                         similarity = similar.get('similarity', 0)
-                        existing_tag = similar.get('tag', '')
-                        usage_count = similar.get('usage_count', 0)
-                        
-                        if similarity > 0.75:
-                            candidates.append((existing_tag, similarity, f"similar to '{input_tag}'", usage_count))
+                        if similarity <= 0.75:
+                            break
+                        candidates.append((similar.get('tag', ''), similarity,
+                                           f"similar to '{input_tag}'", similar.get('usage_count', 0)))
                     
                     # Also add original tag as candidate with lower priority
                     candidates.append((input_tag, 0.5, "original", 0))
@@ -89,16 +111,20 @@ def smart_tag_mapping(input_tags: List[str], content: str, max_tags: int = 3) ->
         remaining_slots = max_tags - len(final_tags)
         
         if remaining_slots > 0 and candidates:
-            # Generate content embedding for similarity comparison
-            content_embedding = _generate_embedding(content)
+            # Embed the content and every distinct candidate tag in one batched call
+            candidate_tags = list(dict.fromkeys(c[0] for c in candidates))
+            embeddings = _generate_embeddings_batch([content] + candidate_tags)
+            content_embedding = embeddings[0]
             
             if content_embedding:
+                content_sims = _content_similarities(content_embedding,
+                                                     dict(zip(candidate_tags, embeddings[1:])))
+                
                 # Score candidates based on content similarity
                 scored_candidates = []
                 for tag, tag_similarity, source, usage in candidates:
-                    tag_embedding = _generate_embedding(tag)
-                    if tag_embedding:
-                        content_similarity = _cosine_similarity(content_embedding, tag_embedding)
+                    if tag in content_sims:
+                        content_similarity = content_sims[tag]
                         # Combined score: tag similarity + content similarity + usage bonus
                         usage_bonus = min(usage * 0.01, 0.1)  # Small bonus for frequently used tags
                         combined_score = (tag_similarity * 0.4) + (content_similarity * 0.5) + usage_bonus
@@ -107,19 +133,21 @@ def smart_tag_mapping(input_tags: List[str], content: str, max_tags: int = 3) ->
                         # Fallback to tag similarity only
                         scored_candidates.append((tag, tag_similarity, source, tag_similarity, 0))
                 
-                # Sort by combined score and take top candidates
-                scored_candidates.sort(key=lambda x: x[1], reverse=True)
+                # Take the top candidates by combined score (no full sort needed)
+                top_candidates = heapq.nlargest(remaining_slots, scored_candidates, key=lambda x: x[1])
                 
-                for tag, combined_score, source, tag_sim, content_sim in scored_candidates[:remaining_slots]:
-                    if tag not in final_tags:  # Avoid duplicates
+                for tag, combined_score, source, tag_sim, content_sim in top_candidates:
+                    if tag not in final_set:  # Avoid duplicates
+                        final_set.add(tag)
                         final_tags.append(tag)
                         if source != "original":
                             mapping_log.append(f"Selected '{tag}' (content sim: {content_sim:.3f}, {source})")
             else:
                 # Fallback: sort by tag similarity and usage
-                candidates.sort(key=lambda x: (x[1], x[3]), reverse=True)
-                for tag, similarity, source, usage in candidates[:remaining_slots]:
-                    if tag not in final_tags:
+                top_candidates = heapq.nlargest(remaining_slots, candidates, key=lambda x: (x[1], x[3]))
+                for tag, similarity, source, usage in top_candidates:
+                    if tag not in final_set:
+                        final_set.add(tag)
                         final_tags.append(tag)
                         if source != "original":
                             mapping_log.append(f"Selected '{tag}' (fallback, {source})")
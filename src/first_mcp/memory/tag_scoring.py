@@ -26,68 +26,71 @@ This makes retrieval robust to vocabulary mismatch ("scheduling" finds
 equally-relevant candidates.
 """
 
-import math
 import time as _time
 from typing import Any, Dict, List, Optional, Tuple
 
-from ..embeddings import generate_embedding as _generate_embedding, cosine_similarity as _cosine_similarity
+import numpy as np
+
+from ..embeddings import generate_embeddings_batch as _generate_embeddings_batch, cosine_similarity as _cosine_similarity
 from .database import get_tags_tinydb
+from .semantic_search import get_tag_matrix
 
 IMPORTANCE_WEIGHT = 0.333
-_REGISTRY_CACHE_TTL = 300  # seconds
 
-# Cache stores pre-converted numpy arrays so scoring avoids repeated Python-list
-# → numpy conversion (each 3072-float conversion holds the GIL for ~100 µs).
-_registry_cache: Optional[Dict[str, "_np.ndarray"]] = None
-_registry_cache_loaded_at: float = 0.0
+# Registry of the tags-db version it was built at, as numpy rows so scoring
+# avoids repeated Python-list → numpy conversion (each 3072-float conversion
+# holds the GIL for ~100 µs).
+_registry_cache: Optional[Dict[str, np.ndarray]] = None
+_registry_cache_version: Any = None
 
 
-def build_tag_registry() -> Dict[str, "_np.ndarray"]:
+def build_tag_registry() -> Dict[str, np.ndarray]:
     """
-    Load all tags that have stored embeddings into a dict of numpy arrays.
+    Map every tag that has a stored embedding to its (unit-length) float32 row.
 
-    Embeddings are converted from Python lists to numpy float32 arrays once at
-    cache-load time.  Subsequent scoring calls receive pre-converted arrays, so
-    cosine_similarity only does a fast array copy (~1 µs) instead of a Python-
-    object iteration (~100 µs per 3072-float list).
+    Rows come from semantic_search.get_tag_matrix(), one matrix per embedding
+    size, so the registry shares the cached matrix (and its float32 sidecar)
+    instead of converting each tag's JSON list itself. The registry is kept
+    until the tags database changes; usage-count writes made through tag_tools
+    carry it over (_carry_tag_registry), since they leave the rows as they are.
 
-    Caches the result for _REGISTRY_CACHE_TTL seconds.  Call
-    warm_tag_registry_cache() at server startup to pay the I/O + conversion cost
-    before mcp.run() so tool calls are never blocked by this work.
+    Call warm_tag_registry_cache() at server startup to pay the I/O + conversion
+    cost before mcp.run() so tool calls are never blocked by this work.
 
     Returns:
         {tag_name: np.ndarray float32} — only entries with non-empty embeddings.
     """
     import sys
-    import numpy as _np
-    global _registry_cache, _registry_cache_loaded_at
-
-    now = _time.monotonic()
-    if _registry_cache is not None and now - _registry_cache_loaded_at < _REGISTRY_CACHE_TTL:
-        print(f"{now:.3f} [tag_registry] cache hit ({len(_registry_cache)} tags)", file=sys.stderr, flush=True)
-        return _registry_cache
-    print(f"{now:.3f} [tag_registry] cold load (cache={'None' if _registry_cache is None else 'expired'})", file=sys.stderr, flush=True)
+    global _registry_cache, _registry_cache_version
 
     try:
         tags_db = get_tags_tinydb()
-        tags_table = tags_db.table('tags')
-        all_tags = tags_table.all()
-        tags_db.close()
-
-        registry: Dict[str, "_np.ndarray"] = {}
-        for entry in all_tags:
-            tag = entry.get('tag', '')
-            emb = entry.get('embedding', [])
-            if tag and emb and len(emb) > 0:
-                registry[tag] = _np.array(emb, dtype=_np.float32)
+        now = _time.monotonic()
+        if _registry_cache is not None and _registry_cache_version == tags_db.version:
+            print(f"{now:.3f} [tag_registry] cache hit ({len(_registry_cache)} tags)", file=sys.stderr, flush=True)
+            return _registry_cache
+        print(f"{now:.3f} [tag_registry] cold load (cache={'None' if _registry_cache is None else 'stale'})", file=sys.stderr, flush=True)
+
+        sizes = {len(emb) for emb in (t.get('embedding') for t in tags_db.table('tags').all()) if emb}
+        registry: Dict[str, np.ndarray] = {}
+        for dims in sorted(sizes):
+            names, _, matrix = get_tag_matrix(dims)
+            registry.update((name, row) for name, row in zip(names, matrix) if name)
 
         _registry_cache = registry
-        _registry_cache_loaded_at = _time.monotonic()
+        _registry_cache_version = tags_db.version
         return registry
     except Exception:
         return {}
 
 
+def _carry_tag_registry(version_before: Any, version_after: Any) -> None:
+    """Keep the registry across a write that changed only usage counts (its rows are unaffected)."""
+    global _registry_cache_version
+    if _registry_cache is not None and _registry_cache_version == version_before:
+        _registry_cache_version = version_after
+
+
 def warm_tag_registry_cache() -> int:
     """
     Pre-load the tag registry into memory.  Call once at server startup, before
@@ -106,6 +109,13 @@ def invalidate_tag_registry_cache() -> None:
     _registry_cache = None
 
 
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    """Row-normalise a float32 matrix; all-zero rows stay zero (similarity 0)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix, dtype=np.float32), where=norms > 0)
+
+
 def score_memories_by_tags(
     query_tags: List[str],
     all_memories: List[Dict[str, Any]],
@@ -125,19 +135,22 @@ def score_memories_by_tags(
         Returns [] when no query-tag embeddings are resolvable.
     """
     import sys
-    import numpy as _np
     t0 = _time.monotonic()
 
     # Resolve embeddings for query tags (registry first, on-the-fly fallback).
     # Registry values are already numpy arrays; API fallback returns a list — convert once here.
-    qt_embeddings: Dict[str, "_np.ndarray"] = {}
+    # Query tags missing from the registry are embedded together in one batched call.
+    unknown = [qt for qt in dict.fromkeys(query_tags) if tag_registry.get(qt) is None]
+    if unknown:
+        print(f"{_time.monotonic():.3f} [scoring] {len(unknown)} qt not in registry, calling API", file=sys.stderr, flush=True)
+    fetched = dict(zip(unknown, _generate_embeddings_batch(unknown))) if unknown else {}
+    qt_embeddings: Dict[str, np.ndarray] = {}
     for qt in query_tags:
         emb = tag_registry.get(qt)
         if emb is None:
-            print(f"{_time.monotonic():.3f} [scoring] qt={qt!r} not in registry, calling API", file=sys.stderr, flush=True)
-            raw = _generate_embedding(qt)
+            raw = fetched.get(qt)
             if raw:
-                emb = _np.array(raw, dtype=_np.float32)
+                emb = np.array(raw, dtype=np.float32)
         else:
             print(f"{_time.monotonic():.3f} [scoring] qt={qt!r} found in registry (numpy)", file=sys.stderr, flush=True)
         if emb is not None:
@@ -150,33 +163,29 @@ def score_memories_by_tags(
     qt_list = list(qt_embeddings.keys())
     print(f"{_time.monotonic():.3f} [scoring] first pass: {len(all_memories)} memories × {len(qt_list)} query tags", file=sys.stderr, flush=True)
 
-    # First pass: raw_scores[qt][i] = best cosine sim between qt and memory[i]'s tags
-    raw_scores: Dict[str, List[float]] = {qt: [] for qt in qt_list}
-
-    for memory in all_memories:
-        mem_embs = [
-            tag_registry[mt]
-            for mt in memory.get('tags', [])
-            if mt in tag_registry
-        ]
-        for qt in qt_list:
-            qt_emb = qt_embeddings[qt]
-            if mem_embs:
-                # Direct numpy dot products — no np.array() re-conversion since
-                # both qt_emb and each mt_emb are already float32 numpy arrays.
-                qt_norm = _np.linalg.norm(qt_emb)
-                if qt_norm == 0:
-                    best = 0.0
-                else:
-                    sims = []
-                    for mt_emb in mem_embs:
-                        mt_norm = _np.linalg.norm(mt_emb)
-                        sim = 0.0 if mt_norm == 0 else float(_np.dot(qt_emb, mt_emb) / (qt_norm * mt_norm))
-                        sims.append(max(0.0, min(1.0, sim)))
-                    best = max(sims)
-            else:
-                best = 0.0
-            raw_scores[qt].append(best)
+    # First pass: raw_scores[q, i] = best cosine sim between qt_list[q] and
+    # memory[i]'s tags.  Each query tag and each registry tag used by a
+    # candidate is normalised once, all pairs are scored with one clipped
+    # matrix product per embedding size (mismatched sizes score 0), and each
+    # memory then takes the max over its own tag columns.
+    mem_tags = list(dict.fromkeys(
+        mt for memory in all_memories for mt in memory.get('tags', []) if mt in tag_registry
+    ))
+    column = {mt: j for j, mt in enumerate(mem_tags)}
+    pair_sims = np.zeros((len(qt_list), len(mem_tags)), dtype=np.float32)
+    for dims in {len(emb) for emb in qt_embeddings.values()}:
+        q_rows = [q for q, qt in enumerate(qt_list) if len(qt_embeddings[qt]) == dims]
+        t_cols = [j for j, mt in enumerate(mem_tags) if len(tag_registry[mt]) == dims]
+        if t_cols:
+            q_unit = _unit_rows(np.stack([qt_embeddings[qt_list[q]] for q in q_rows]))
+            t_unit = _unit_rows(np.stack([tag_registry[mem_tags[j]] for j in t_cols]))
+            pair_sims[np.ix_(q_rows, t_cols)] = np.clip(q_unit @ t_unit.T, 0.0, 1.0)
+
+    raw_scores = np.zeros((len(qt_list), len(all_memories)), dtype=np.float64)
+    for i, memory in enumerate(all_memories):
+        cols = [column[mt] for mt in memory.get('tags', []) if mt in column]
+        if cols:
+            raw_scores[:, i] = pair_sims[:, cols].max(axis=1)
 
     print(f"{_time.monotonic():.3f} [scoring] first pass done ({_time.monotonic()-t0:.3f}s total so far)", file=sys.stderr, flush=True)
 
@@ -184,19 +193,11 @@ def score_memories_by_tags(
     # When std ≈ 0 (single candidate or all scores identical) the formula collapses
     # to the mean itself and the strict > check would exclude everything.  Use a
     # fixed midpoint instead so a well-matched memory still registers as a hit.
-    thresholds: Dict[str, float] = {}
-    for qt in qt_list:
-        scores = raw_scores[qt]
-        if not scores:
-            thresholds[qt] = 0.75
-            continue
-        mean = sum(scores) / len(scores)
-        variance = sum((s - mean) ** 2 for s in scores) / len(scores)
-        std = math.sqrt(variance)
-        if std < 1e-9:
-            thresholds[qt] = 0.5
-        else:
-            thresholds[qt] = mean + 0.5 * std
+    if all_memories:
+        std = raw_scores.std(axis=1)
+        thresholds = np.where(std < 1e-9, 0.5, raw_scores.mean(axis=1) + 0.5 * std)
+    else:
+        thresholds = np.full(len(qt_list), 0.75)
 
     print(f"{_time.monotonic():.3f} [scoring] second pass", file=sys.stderr, flush=True)
 
@@ -205,9 +206,9 @@ def score_memories_by_tags(
     for i, memory in enumerate(all_memories):
         tag_score = 0.0
         matched: List[str] = []
-        for qt in qt_list:
-            s = raw_scores[qt][i]
-            if s > thresholds[qt]:
+        for q, qt in enumerate(qt_list):
+            s = float(raw_scores[q, i])
+            if s > thresholds[q]:
                 tag_score += s * s
                 matched.append(qt)
         if tag_score > 0:
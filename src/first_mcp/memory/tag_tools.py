@@ -2,55 +2,233 @@
 Tag management tools for memory system.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import os
+import time
+
+import numpy as np
 from tinydb import Query
 from .database import get_tags_tinydb
-from ..embeddings import generate_embedding as _generate_embedding, cosine_similarity as _cosine_similarity, GENAI_AVAILABLE, EMBEDDING_MODEL, generate_embeddings_batch as _generate_embeddings_batch
+from .semantic_search import get_tag_matrix, uses_ann_index, _carry_usage_update, _similar_rows, _string_matches, _top_rows
+from .tag_scoring import _carry_tag_registry
+from ..embeddings import generate_embedding as _generate_embedding, GENAI_AVAILABLE, EMBEDDING_MODEL, generate_embeddings_batch as _generate_embeddings_batch, normalize_embedding
+
+# Module-level query root: conditions built from it are immutable values, so
+# one instance serves every call instead of a fresh Query() per function
+_RECORD = Query()
+
+
+# (epoch second, its ISO timestamp) for _now_iso()
+_now_cache: Tuple[int, str] = (0, '')
+
+
+def _now_iso() -> str:
+    """
+    Current local time as an ISO string at second resolution, for tag
+    bookkeeping (created_at / last_used_at).
+
+    The string is formatted once per second rather than on every usage bump.
+    """
+    global _now_cache
+    second = int(time.time())
+    if second != _now_cache[0]:
+        _now_cache = (second, datetime.fromtimestamp(second).isoformat())
+    return _now_cache[1]
+
+
+# (tags db version, tag name -> doc_id) as of the last tag write made here
+_tag_doc_ids_cache: Tuple[Any, Dict[str, int]] = (None, {})
+
+
+def _tag_doc_ids(tags_db) -> Dict[str, int]:
+    """
+    Map of tag name -> doc_id, so registering or counting a tag is a dict
+    lookup instead of a Record.tag == tag scan of the whole table.
+
+    Rebuilt only when the tags database changed since _remember_tag_doc_ids();
+    callers that insert tags add them to the returned map before remembering it.
+    """
+    version, doc_ids = _tag_doc_ids_cache
+    if version != tags_db.version:
+        doc_ids = {}
+        for entry in tags_db.table('tags').all():
+            doc_ids.setdefault(entry.get('tag'), entry.doc_id)
+    return doc_ids
+
+
+def _remember_tag_doc_ids(tags_db, doc_ids: Dict[str, int]) -> None:
+    global _tag_doc_ids_cache
+    _tag_doc_ids_cache = (tags_db.version, doc_ids)
+
+
+def get_tag_doc_id(tag: str) -> Optional[int]:
+    """doc_id of `tag` in the shared tags table, or None if it is not registered."""
+    tags_db = get_tags_tinydb()
+    doc_ids = _tag_doc_ids(tags_db)
+    _remember_tag_doc_ids(tags_db, doc_ids)
+    return doc_ids.get(tag)
+
+
+def insert_tags(records: List[Dict[str, Any]]) -> None:
+    """
+    Insert new tag records into the shared tags table in one write, keeping
+    the tag -> doc_id map current. The caller flushes the handle.
+    """
+    if not records:
+        return
+    tags_db = get_tags_tinydb()
+    doc_ids = _tag_doc_ids(tags_db)
+    names = [record['tag'] for record in records]
+    doc_ids.update(zip(names, tags_db.table('tags').insert_multiple(records)))
+    _remember_tag_doc_ids(tags_db, doc_ids)
+
+
+# (tags db version, doc_ids of tags without an embedding)
+_unembedded_cache: Tuple[Any, List[int]] = (None, [])
+
+
+def _unembedded_doc_ids(tags_db) -> List[int]:
+    """
+    doc_ids of tags with no stored embedding.
+
+    The tag matrix (get_tag_matrix) holds only the embedded rows; this is its
+    complement, partitioned once per tags-db version so coverage stats and
+    missing-embedding generation do not test every tag's embedding each call.
+    """
+    global _unembedded_cache
+    version, doc_ids = _unembedded_cache
+    if version != tags_db.version:
+        doc_ids = [entry.doc_id for entry in tags_db.table('tags').all() if not entry.get('embedding')]
+        _unembedded_cache = (tags_db.version, doc_ids)
+    return doc_ids
+
+
+def _usage_counts(tags_table, doc_ids: Dict[str, int], tag_names: List[str],
+                  delta: int) -> Dict[int, int]:
+    """
+    New usage_count per doc_id after adding `delta` once for every occurrence
+    of a registered tag in `tag_names` (floored at 0). Unknown tags are skipped.
+    """
+    counts: Dict[int, int] = {}
+    for tag in tag_names:
+        doc_id = doc_ids.get(tag)
+        if doc_id is None:
+            continue
+        if doc_id not in counts:
+            existing = tags_table.get(doc_id=doc_id)
+            if existing is None:
+                continue
+            counts[doc_id] = existing['usage_count']
+        counts[doc_id] = max(0, counts[doc_id] + delta)
+    return counts
+
+
+def _update_tags(tags_table, doc_ids: List[int], updates: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Apply per-tag field updates ({tag: fields}) to the tag documents `doc_ids`
+    in a single table write.
+
+    One update() call per tag would re-read and re-write the whole table each
+    time; with a callable, TinyDB visits just these doc_ids in one pass.
+    """
+    if not updates:
+        return
+    tags_table.update(lambda doc: doc.update(updates[doc.get('tag', '')]), doc_ids=doc_ids)
+
+
+def _bump_usage(tags_db, tag_names: List[str], delta: int, now_iso: Optional[str]) -> None:
+    """Add `delta` to the usage counts of registered tags (and stamp last_used_at if given)."""
+    doc_ids = _tag_doc_ids(tags_db)
+    tags_table = tags_db.table('tags')
+    counts = _usage_counts(tags_table, doc_ids, tag_names, delta)
+    _write_usage_counts(tags_db, tags_table, doc_ids, tag_names, counts, now_iso)
+    _remember_tag_doc_ids(tags_db, doc_ids)
+
+
+def _write_usage_counts(tags_db, tags_table, doc_ids: Dict[str, int], tag_names: List[str],
+                        counts: Dict[int, int], now_iso: Optional[str]) -> None:
+    """
+    Store new usage counts ({doc_id: count}, stamping last_used_at if given)
+    in one table write.
+
+    Only usage fields change, so the caches keyed on the tags-db version are
+    carried across the write instead of being rebuilt from the whole table.
+    """
+    global _unembedded_cache
+    if not counts:
+        return
+    stamp = {'last_used_at': now_iso} if now_iso else {}
+    before = tags_db.version
+    tag_counts = {tag: counts[doc_ids[tag]] for tag in tag_names if doc_ids.get(tag) in counts}
+    _update_tags(tags_table, list(counts),
+                 {tag: {'usage_count': count, **stamp} for tag, count in tag_counts.items()})
+    if _unembedded_cache[0] == before:
+        _unembedded_cache = (tags_db.version, _unembedded_cache[1])
+    _carry_tag_registry(before, tags_db.version)
+    _carry_usage_update(before, tags_db.version, tag_counts, now_iso)
+
+
+def _bump_usage_deferred(tag_names: List[str], delta: int, now_iso: Optional[str] = None) -> None:
+    """
+    _bump_usage() on the shared tags handle without rewriting the file.
+
+    A usage bump changes two small fields, but a flush rewrites every tag and
+    its embedding; the bump stays in the handle's cache until the next flush,
+    at most DEFERRED_FLUSH_SECONDS later (see SharedTinyDB.write_deferred).
+    """
+    get_tags_tinydb().write_deferred(lambda db: _bump_usage(db, tag_names, delta, now_iso))
 
 
-def tinydb_register_tags(tag_list: List[str]) -> Dict[str, Any]:
-    """Register tags in TinyDB tags database with embeddings."""
+def tinydb_register_tags(tag_list: List[str], now_iso: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Register tags in TinyDB tags database with embeddings.
+
+    `now_iso` lets a caller stamp the tags with the timestamp of the record
+    they belong to; by default the current time is used.
+    """
     try:
         tags_db = get_tags_tinydb()
-        try:
-            tags_table = tags_db.table('tags')
-            Record = Query()
-            
-            registered = []
-            for tag in tag_list:
-                # Check if tag already exists
-                existing = tags_table.search(Record.tag == tag)
-                if existing:
-                    # Update usage count
-                    tags_table.update(
-                        {'usage_count': existing[0]['usage_count'] + 1,
-                         'last_used_at': datetime.now().isoformat()},
-                        Record.tag == tag
-                    )
-                    registered.append(f"Updated: {tag}")
-                else:
-                    # Store tag without embedding — the enrichment loop (first-mcp-enrich)
-                    # generates embeddings asynchronously. Generating inline here stacks
-                    # one API call per new tag on the hot path of tinydb_memorize, which
-                    # pushes the total response time past the MCP tool-call timeout.
-                    tag_data = {
-                        'tag': tag,
-                        'usage_count': 1,
-                        'created_at': datetime.now().isoformat(),
-                        'last_used_at': datetime.now().isoformat(),
-                        'embedding': []
-                    }
-                    tags_table.insert(tag_data)
-                    registered.append(f"Created: {tag} (embedding deferred to enrichment loop)")
-                    
-            # Force flush to disk
-            tags_db.close()
-            return {"registered_tags": registered}
-        except Exception as e:
-            tags_db.close()
-            raise e
+        tags_table = tags_db.table('tags')
+        doc_ids = _tag_doc_ids(tags_db)
+        
+        registered = []
+        now_iso = now_iso or _now_iso()
+        # Existing tags get their usage counts bumped and new ones are collected,
+        # so the whole list costs one update and one insert_multiple
+        counts = _usage_counts(tags_table, doc_ids, tag_list, 1)
+        new_tags: Dict[str, Dict[str, Any]] = {}
+        for tag in tag_list:
+            if doc_ids.get(tag) in counts:
+                registered.append(f"Updated: {tag}")
+            elif tag in new_tags:
+                new_tags[tag]['usage_count'] += 1
+                registered.append(f"Updated: {tag}")
+            else:
+                # Store tag without embedding — the enrichment loop (first-mcp-enrich)
+                # generates embeddings asynchronously. Generating inline here stacks
+                # one API call per new tag on the hot path of tinydb_memorize, which
+                # pushes the total response time past the MCP tool-call timeout.
+                new_tags[tag] = {
+                    'tag': tag,
+                    'usage_count': 1,
+                    'created_at': now_iso,
+                    'last_used_at': now_iso,
+                    'embedding': []
+                }
+                registered.append(f"Created: {tag} (embedding deferred to enrichment loop)")
+        
+        if new_tags:
+            _write_usage_counts(tags_db, tags_table, doc_ids, tag_list, counts, now_iso)
+            doc_ids.update(zip(new_tags, tags_table.insert_multiple(list(new_tags.values()))))
+            _remember_tag_doc_ids(tags_db, doc_ids)
+            # The shared handle stays open; flush() persists (deferred inside memory_batch).
+            # New tags go out promptly so the enrichment runner picks them up.
+            tags_db.flush()
+        else:
+            # Only usage counts change; no need to rewrite the file for that
+            tags_db.write_deferred(lambda db: _bump_usage(db, tag_list, 1, now_iso))
+        return {"registered_tags": registered}
         
     except Exception as e:
         return {"error": f"Tag registration failed: {str(e)}"}
@@ -74,7 +252,10 @@ def tinydb_find_similar_tags(query: str, limit: int = 5, min_similarity: float =
         min_similarity: Minimum similarity score 0.0-1.0 (default: 0.3)
         
     Returns:
-        Dictionary with similar tags, similarity scores, and usage statistics
+        Dictionary with similar tags, similarity scores, and usage statistics.
+        total_found counts every match, except on very large vocabularies
+        searched through the approximate index, where it counts the matches
+        among the nearest candidates and total_found_approximate is True.
         
     Examples:
         - query="python" might return ["programming", "development", "coding"]
@@ -85,10 +266,7 @@ def tinydb_find_similar_tags(query: str, limit: int = 5, min_similarity: float =
         tags_db = get_tags_tinydb()
         tags_table = tags_db.table('tags')
 
-        all_tags = tags_table.all()
-        tags_db.close()
-
-        if not all_tags:
+        if not len(tags_table):
             return {
                 "success": True,
                 "similar_tags": [],
@@ -99,52 +277,46 @@ def tinydb_find_similar_tags(query: str, limit: int = 5, min_similarity: float =
         query_embedding = _generate_embedding(query)
 
         similar_tags = []
+        total_found = 0
+        total_found_approximate = False
 
-        # Use embeddings if available for both query and tags
+        # Use embeddings if available: one matvec against the cached, normalised
+        # tag matrix (for very large vocabularies the HNSW candidates are counted)
         if query_embedding:
-            for tag_entry in all_tags:
-                tag_embedding = tag_entry.get('embedding', [])
-                if tag_embedding and len(tag_embedding) > 0:
-                    similarity = _cosine_similarity(query_embedding, tag_embedding)
-                    if similarity >= min_similarity:
-                        similar_tags.append({
-                            "tag": tag_entry.get('tag', ''),
-                            "similarity": round(similarity, 4),
-                            "usage_count": tag_entry.get('usage_count', 0),
-                            "last_used": tag_entry.get('last_used_at', ''),
-                            "method": "embedding"
-                        })
-
-        # Fallback to string similarity if no embeddings available
-        if not similar_tags:
-            query_lower = query.lower().strip()
-            for tag_entry in all_tags:
-                tag = tag_entry.get('tag', '')
-                similarity = 0.0
-
-                if query_lower in tag.lower():
-                    similarity = 0.8
-                elif any(word in tag.lower() for word in query_lower.split()):
-                    similarity = 0.6
-                elif any(word in query_lower for word in tag.lower().split()):
-                    similarity = 0.4
-
-                if similarity >= min_similarity:
+            names, usage, matrix = get_tag_matrix(len(query_embedding))
+            query_vec = np.asarray(query_embedding, dtype=np.float32)
+            query_norm = np.linalg.norm(query_vec)
+            if names and query_norm > 0:
+                idx, sims = _similar_rows(matrix, query_vec / query_norm, min_similarity, limit)
+                total_found = len(idx)
+                total_found_approximate = uses_ann_index(len(names))
+                doc_ids = _tag_doc_ids(tags_db)
+                for j in _top_rows(np.round(sims, 4), usage[idx], limit):
+                    tag = names[idx[j]]
+                    doc_id = doc_ids.get(tag)
+                    tag_entry = tags_table.get(doc_id=doc_id) if doc_id is not None else None
                     similar_tags.append({
                         "tag": tag,
-                        "similarity": similarity,
-                        "usage_count": tag_entry.get('usage_count', 0),
-                        "last_used": tag_entry.get('last_used_at', ''),
-                        "method": "string"
+                        "similarity": round(float(sims[j]), 4),
+                        "usage_count": int(usage[idx[j]]),
+                        "last_used": (tag_entry or {}).get('last_used_at', ''),
+                        "method": "embedding"
                     })
+                _remember_tag_doc_ids(tags_db, doc_ids)
 
-        similar_tags.sort(key=lambda x: (x['similarity'], x['usage_count']), reverse=True)
+        # Fallback to string similarity if no embeddings available
+        if not total_found:
+            # Only the top `limit` entries are built; the rest are just counted
+            matches, total_found = _string_matches(query, min_similarity, limit)
+            similar_tags = [{**entry, "method": "string"} for entry in matches]
+            total_found_approximate = False
 
         return {
             "success": True,
             "query": query,
-            "similar_tags": similar_tags[:limit],
-            "total_found": len(similar_tags)
+            "similar_tags": similar_tags,
+            "total_found": total_found,
+            "total_found_approximate": total_found_approximate
         }
 
     except Exception as e:
@@ -161,12 +333,11 @@ def tinydb_generate_missing_embeddings() -> Dict[str, Any]:
     try:
         tags_db = get_tags_tinydb()
         tags_table = tags_db.table('tags')
-        Record = Query()
         
         # Find tags without embeddings
-        tags_without_embeddings = tags_table.search(
-            (Record.embedding == []) | (~Record.embedding.exists())
-        )
+        tags_without_embeddings = [tag_record for tag_record in
+                                   (tags_table.get(doc_id=doc_id) for doc_id in _unembedded_doc_ids(tags_db))
+                                   if tag_record is not None]
         
         if not tags_without_embeddings:
             return {
@@ -177,30 +348,27 @@ def tinydb_generate_missing_embeddings() -> Dict[str, Any]:
                 "failed": 0
             }
         
-        generated = 0
-        failed = 0
-        failed_tags = []
+        tag_names = [tag_record.get('tag', '') for tag_record in tags_without_embeddings]
         
-        for tag_record in tags_without_embeddings:
-            tag_name = tag_record.get('tag', '')
-            
-            # Generate embedding
-            embedding = _generate_embedding(tag_name)
-            
+        # Embed all missing tags in batched API calls, then write them in one table update
+        embeddings = _generate_embeddings_batch(tag_names)
+        now_iso = datetime.now().isoformat()
+        updates = {}
+        failed_tags = []
+        for tag_record, tag_name, embedding in zip(tags_without_embeddings, tag_names, embeddings):
             if embedding:
-                # Update the tag with embedding
-                tags_table.update(
-                    {
-                        'embedding': embedding,
-                        'embedding_generated_at': datetime.now().isoformat(),
-                        'embedding_model': EMBEDDING_MODEL
-                    },
-                    Record.tag == tag_name
-                )
-                generated += 1
+                updates[tag_name] = {
+                    'embedding': normalize_embedding(embedding),
+                    'normalized': True,
+                    'embedding_generated_at': now_iso,
+                    'embedding_model': EMBEDDING_MODEL
+                }
             else:
-                failed += 1
                 failed_tags.append(tag_name)
+        _update_tags(tags_table, [tag_record.doc_id for tag_record in tags_without_embeddings
+                                  if tag_record.get('tag', '') in updates], updates)
+        generated = len(updates)
+        failed = len(failed_tags)
         
         tags_db.close()
         
@@ -231,12 +399,9 @@ def tinydb_embedding_stats() -> Dict[str, Any]:
     try:
         tags_db = get_tags_tinydb()
         tags_table = tags_db.table('tags')
-        Record = Query()
         
-        total_tags = len(tags_table.all())
-        tags_with_embeddings = len(tags_table.search(
-            Record.embedding.exists() & (Record.embedding != [])
-        ))
+        total_tags = len(tags_table)
+        tags_with_embeddings = total_tags - len(_unembedded_doc_ids(tags_db))
         
         coverage_percent = (tags_with_embeddings / max(total_tags, 1)) * 100
         
@@ -259,18 +424,7 @@ def increment_tag_usage(tag_names: List[str]) -> None:
     """Bump usage_count by 1 for each tag in `tag_names` that exists in the registry."""
     if not tag_names:
         return
-    tags_db = get_tags_tinydb()
-    tags_table = tags_db.table('tags')
-    Record = Query()
-    now = datetime.now().isoformat()
-    for tag in tag_names:
-        existing = tags_table.search(Record.tag == tag)
-        if existing:
-            tags_table.update(
-                {'usage_count': existing[0]['usage_count'] + 1, 'last_used_at': now},
-                Record.tag == tag,
-            )
-    tags_db.close()
+    _bump_usage_deferred(tag_names, 1, _now_iso())
 
 
 def decrement_tag_usage(tag_names: List[str]) -> None:
@@ -281,15 +435,7 @@ def decrement_tag_usage(tag_names: List[str]) -> None:
     """
     if not tag_names:
         return
-    tags_db = get_tags_tinydb()
-    tags_table = tags_db.table('tags')
-    Record = Query()
-    for tag in tag_names:
-        existing = tags_table.search(Record.tag == tag)
-        if existing:
-            new_count = max(0, existing[0]['usage_count'] - 1)
-            tags_table.update({'usage_count': new_count}, Record.tag == tag)
-    tags_db.close()
+    _bump_usage_deferred(tag_names, -1)
 
 
 def tinydb_get_all_tags() -> Dict[str, Any]:
@@ -358,13 +504,11 @@ def regenerate_all_tag_embeddings(batch_size: int = 20) -> Dict[str, Any]:
     try:
         tags_db = get_tags_tinydb()
         tags_table = tags_db.table('tags')
-        Record = Query()
 
         all_tags = tags_table.all()
         total = len(all_tags)
 
         if not total:
-            tags_db.close()
             return {"success": True, "message": "No tags found.", "processed": 0, "updated": 0, "failed": 0}
 
         tag_names = [t.get('tag', '') for t in all_tags]
@@ -377,20 +521,21 @@ def regenerate_all_tag_embeddings(batch_size: int = 20) -> Dict[str, Any]:
         failed_tags = []
         now = datetime.now().isoformat()
 
-        for tag_name, embedding in zip(tag_names, embeddings):
+        updates = {}
+        for tag_record, tag_name, embedding in zip(all_tags, tag_names, embeddings):
             if embedding and len(embedding) == EMBEDDING_DIMENSIONS:
-                tags_table.update(
-                    {
-                        'embedding': embedding,
-                        'embedding_generated_at': now,
-                        'embedding_model': EMBEDDING_MODEL
-                    },
-                    Record.tag == tag_name
-                )
+                updates[tag_name] = {
+                    'embedding': normalize_embedding(embedding),
+                    'normalized': True,
+                    'embedding_generated_at': now,
+                    'embedding_model': EMBEDDING_MODEL
+                }
                 updated += 1
             else:
                 failed += 1
                 failed_tags.append(tag_name)
+        _update_tags(tags_table, [tag_record.doc_id for tag_record in all_tags
+                                  if tag_record.get('tag', '') in updates], updates)
 
         tags_db.close()
         print(f"Done. Updated: {updated}/{total}, Failed: {failed}", file=sys.stderr)
@@ -429,10 +574,8 @@ def check_and_migrate_tag_embeddings() -> Dict[str, Any]:
     try:
         tags_db = get_tags_tinydb()
         tags_table = tags_db.table('tags')
-        Record = Query()
 
-        tags_with_model = tags_table.search(Record.embedding_model.exists())
-        tags_db.close()
+        tags_with_model = tags_table.search(_RECORD.embedding_model.exists())
 
         if not tags_with_model:
             return {
@@ -647,7 +647,8 @@ def tinydb_create_database(db_name: str, description: str = "") -> Dict[str, Any
 
 
 @mcp.tool()
-def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id: str = "") -> Dict[str, Any]:
+def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id: str = "",
+                      return_data: bool = False) -> Dict[str, Any]:
     """
     Store data in any TinyDB database in the data folder.
 
@@ -656,11 +657,15 @@ def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id:
         table: Table name within the database
         data: Data to store (dictionary)
         record_id: Optional specific ID for the record
+        return_data: Echo the stored record in the response (default: False,
+            returns only data_size)
 
     Returns:
         Dictionary with storage confirmation and record ID
     """
-    return add_server_timestamp(_tinydb_store_data(db_name=db_name, table=table, data=data, record_id=record_id))
+    return add_server_timestamp(_tinydb_store_data(
+        db_name=db_name, table=table, data=data, record_id=record_id, return_data=return_data,
+    ))
 
 
 @mcp.tool()
@@ -709,7 +714,8 @@ def tinydb_update_data(db_name: str, table: str, record_id: str, updates: Dict[s
 
 @mcp.tool()
 def tinydb_delete_data(db_name: str, table: str, record_id: str = "",
-                      query_conditions: Dict[str, Any] = {}) -> Dict[str, Any]:
+                      query_conditions: Dict[str, Any] = {},
+                      record_ids: List[str] = []) -> Dict[str, Any]:
     """
     Delete records from any TinyDB database in the data folder.
 
@@ -718,12 +724,14 @@ def tinydb_delete_data(db_name: str, table: str, record_id: str = "",
         table: Table name
         record_id: ID of specific record to delete (optional)
         query_conditions: Conditions for bulk deletion (optional)
+        record_ids: List of record IDs to delete in a single pass (optional)
 
     Returns:
         Dictionary with deletion confirmation
     """
     return add_server_timestamp(
-        _tinydb_delete_data(db_name=db_name, table=table, record_id=record_id, query_conditions=query_conditions)
+        _tinydb_delete_data(db_name=db_name, table=table, record_id=record_id,
+                            query_conditions=query_conditions, record_ids=record_ids)
     )
 
 
@@ -936,8 +944,7 @@ def _check_and_initialize_fresh_install():
         from .memory import tinydb_memorize as _mem, get_memory_tinydb
         memory_db = get_memory_tinydb()
         memories_table = memory_db.table('memories')
-        is_fresh = len(memories_table.all()) == 0
-        memory_db.close()
+        is_fresh = len(memories_table) == 0
 
         if not is_fresh:
             return
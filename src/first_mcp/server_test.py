@@ -503,7 +503,8 @@ def tinydb_create_database(db_name: str, description: str = "") -> Dict[str, Any
 
 
 @mcp.tool()
-def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id: str = "") -> Dict[str, Any]:
+def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id: str = "",
+                      return_data: bool = False) -> Dict[str, Any]:
     """
     Store data in any TinyDB database in the data folder.
 
@@ -512,9 +513,12 @@ def tinydb_store_data(db_name: str, table: str, data: Dict[str, Any], record_id:
         table: Table name within the database
         data: Data to store (dictionary)
         record_id: Optional specific ID for the record
+        return_data: Echo the stored record in the response (default: False)
     """
     from .memory import tinydb_store_data as _tinydb_store_data
-    return add_server_timestamp(_tinydb_store_data(db_name=db_name, table=table, data=data, record_id=record_id))
+    return add_server_timestamp(_tinydb_store_data(
+        db_name=db_name, table=table, data=data, record_id=record_id, return_data=return_data,
+    ))
 
 
 @mcp.tool()
@@ -559,7 +563,8 @@ def tinydb_update_data(db_name: str, table: str, record_id: str, updates: Dict[s
 
 @mcp.tool()
 def tinydb_delete_data(db_name: str, table: str, record_id: str = "",
-                      query_conditions: Dict[str, Any] = {}) -> Dict[str, Any]:
+                      query_conditions: Dict[str, Any] = {},
+                      record_ids: List[str] = []) -> Dict[str, Any]:
     """
     Delete records from any TinyDB database in the data folder.
 
@@ -568,10 +573,12 @@ def tinydb_delete_data(db_name: str, table: str, record_id: str = "",
         table: Table name
         record_id: ID of specific record to delete (optional)
         query_conditions: Conditions for bulk deletion (optional)
+        record_ids: List of record IDs to delete in a single pass (optional)
     """
     from .memory import tinydb_delete_data as _tinydb_delete_data
     return add_server_timestamp(
-        _tinydb_delete_data(db_name=db_name, table=table, record_id=record_id, query_conditions=query_conditions)
+        _tinydb_delete_data(db_name=db_name, table=table, record_id=record_id,
+                            query_conditions=query_conditions, record_ids=record_ids)
     )
 
 
@@ -24,8 +24,8 @@ from pathlib import Path
 import numpy as np
 from tinydb import TinyDB
 from tinydb.middlewares import CachingMiddleware
-from tinydb.storages import JSONStorage
 
+from ..memory.database import FastJSONStorage
 from .protocols import MemoryRecord, TagRecord
 from .sqlite_storage import SQLiteStorageStrategy
 
@@ -37,10 +37,15 @@ DB_FILENAME = "first_mcp_memory.db"
 # ---------------------------------------------------------------------------
 
 def _read_table(json_path: Path, table_name: str) -> list[dict]:
-    """Return all records from a named TinyDB table, or [] if the file is absent."""
+    """
+    Return all records from a named TinyDB table, or [] if the file is absent.
+
+    Parsed with the server's FastJSONStorage (orjson when installed), so the
+    embedding-heavy tags file loads as fast here as it does in the server.
+    """
     if not json_path.exists():
         return []
-    db = TinyDB(str(json_path), storage=CachingMiddleware(JSONStorage))
+    db = TinyDB(str(json_path), storage=CachingMiddleware(FastJSONStorage))
     try:
         return [dict(r) for r in db.table(table_name).all()]
     finally:
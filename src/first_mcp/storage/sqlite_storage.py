@@ -272,14 +272,14 @@ class SQLiteStorageStrategy:
 
     def link_tags_to_memory(self, tag_names: list[str], memory_id: str) -> None:
         with self._lock:
-            for name in tag_names:
-                self._conn.execute(
-                    "INSERT OR IGNORE INTO tags(name) VALUES (?)", (name,)
-                )
-                self._conn.execute(
-                    "INSERT OR IGNORE INTO tag_memory_links(tag_name, memory_id) VALUES (?, ?)",
-                    (name, memory_id),
-                )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tags(name) VALUES (?)",
+                [(name,) for name in tag_names],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tag_memory_links(tag_name, memory_id) VALUES (?, ?)",
+                [(name, memory_id) for name in tag_names],
+            )
             self._conn.commit()
 
     def get_tags_for_memory(self, memory_id: str) -> list[str]:
@@ -343,38 +343,34 @@ class SQLiteStorageStrategy:
         if qnorm == 0:
             return []
 
-        scored: list[tuple[str, float]] = []
-        for row in tag_rows:
-            tv = _from_blob(row["old_embedding"])
-            if tv is None:
-                continue
-            tnorm = np.linalg.norm(tv)
-            if tnorm == 0:
-                continue
-            sim = float(np.dot(qv, tv) / (qnorm * tnorm))
-            scored.append((row["name"], 1.0 - sim))  # distance = 1 − similarity
-
-        scored.sort(key=lambda x: x[1])
-        return scored[:top_k]
+        # Stack the BLOBs into one matrix and score every tag with a single matvec
+        rows = [r for r in tag_rows if len(r["old_embedding"]) == qdim * 4]
+        if not rows:
+            return []
+        matrix = np.frombuffer(b"".join(r["old_embedding"] for r in rows),
+                               dtype=np.float32).reshape(len(rows), qdim)
+        norms = np.linalg.norm(matrix, axis=1)
+        nonzero = np.flatnonzero(norms)
+        distances = 1.0 - (matrix[nonzero] @ qv) / (norms[nonzero] * qnorm)  # distance = 1 − similarity
+        order = np.argsort(distances, kind="stable")[:top_k]
+        return [(rows[nonzero[i]]["name"], float(distances[i])) for i in order]
 
     def increment_tag_usage(self, tag_names: list[str]) -> None:
         """Increment usage_count by 1 for each named tag."""
         with self._lock:
-            for name in tag_names:
-                self._conn.execute(
-                    "UPDATE tags SET usage_count = usage_count + 1 WHERE name = ?",
-                    (name,),
-                )
+            self._conn.executemany(
+                "UPDATE tags SET usage_count = usage_count + 1 WHERE name = ?",
+                [(name,) for name in tag_names],
+            )
             self._conn.commit()
 
     def decrement_tag_usage(self, tag_names: list[str]) -> None:
         """Decrement usage_count by 1 (floor 0) for each named tag."""
         with self._lock:
-            for name in tag_names:
-                self._conn.execute(
-                    "UPDATE tags SET usage_count = MAX(0, usage_count - 1) WHERE name = ?",
-                    (name,),
-                )
+            self._conn.executemany(
+                "UPDATE tags SET usage_count = MAX(0, usage_count - 1) WHERE name = ?",
+                [(name,) for name in tag_names],
+            )
             self._conn.commit()
 
     def unlink_all_tags_from_memory(self, memory_id: str) -> list[str]:
@@ -12,14 +12,130 @@ Terms of Service Requirements:
 - Cache responses and respect Expires headers
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+from collections import OrderedDict
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 import json
 import os
-import sys
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
 
-class WeatherAPI:
+# requests (via urllib3) decodes Brotli responses only when one of these is
+# importable, so "br" is advertised only then (pip install first-mcp[fast])
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+
+class _TokenBucket:
+    """
+    Thread-safe token bucket: `rate` requests per second with bursts up to `capacity`.
+    
+    acquire() sleeps just long enough for a token instead of letting the
+    request go out and be rejected with HTTP 429.
+    """
+    
+    def __init__(self, capacity: int = 20, rate: float = 20.0):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, n: int = 1) -> None:
+        """Take `n` tokens, sleeping until they are available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            # Take the tokens now (possibly going negative) so concurrent
+            # callers queue up behind this one instead of all waking together
+            self.tokens -= n
+            wait = max(0.0, -self.tokens / self.rate)
+        if wait:
+            time.sleep(wait)
+    
+    def penalize(self) -> None:
+        """Drain the bucket after the server rejected a request (HTTP 429)."""
+        with self._lock:
+            self.tokens = min(self.tokens - self.rate, -1.0)
+
+
+class _RateLimitedClient:
+    """Base for API clients whose requests go through a class-level _TokenBucket."""
+    
+    _bucket: _TokenBucket
+    MAX_RETRIES = 3
+    # Keep-alive connections kept per client; above geocode_many()'s worker count
+    POOL_SIZE = 32
+    
+    def _new_session(self) -> Any:
+        """
+        requests.Session whose connection pool fits concurrent callers.
+        
+        Connection errors and 5xx responses are retried by urllib3 with a
+        short back-off. 429 is left to _rate_limited_get, which also slows
+        down the token bucket.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_maxsize=self.POOL_SIZE,
+            max_retries=Retry(total=self.MAX_RETRIES, backoff_factor=0.2,
+                              status_forcelist=(500, 502, 503, 504), raise_on_status=False),
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def _rate_limited_get(self, url: str, **kwargs: Any) -> Any:
+        """
+        session.get() behind the shared token bucket.
+        
+        A 429 response drains the bucket and is retried up to MAX_RETRIES
+        times with jittered exponential back-off; the last response is
+        returned either way.
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._bucket.acquire()
+            response = self.session.get(url, **kwargs)
+            if response.status_code != 429 or attempt == self.MAX_RETRIES:
+                return response
+            self._bucket.penalize()
+            time.sleep((2 ** attempt) * (0.5 + random.random() / 2))
+    
+    @staticmethod
+    def _parse_json(response: Any) -> Any:
+        """Decode a JSON response body, with orjson when it is installed."""
+        if orjson is None:
+            return response.json()
+        return orjson.loads(response.content)
+
+
+# WeatherAPI._cache value: (expires epoch, parsed JSON, ETag, Last-Modified, current conditions)
+_ForecastEntry = Tuple[float, Dict[str, Any], Optional[str], Optional[str], Optional[Dict[str, Any]]]
+
+
+class WeatherAPI(_RateLimitedClient):
     """
     Yr.no weather API client following their terms of service.
     
@@ -28,6 +144,18 @@ class WeatherAPI:
     
     BASE_URL = "https://api.met.no/weatherapi"
     
+    # Forecasts shared by all clients (the tools create one per call), keyed by
+    # rounded (lat, lon): (expires epoch, parsed JSON, ETag, Last-Modified,
+    # current conditions extracted from the JSON).
+    # Least recently used first; expired entries are dropped on insert.
+    _CACHE_SIZE = 256
+    _cache: "OrderedDict[Tuple[float, float], _ForecastEntry]" = OrderedDict()
+    _cache_lock = threading.Lock()
+    
+    # Shared by all clients so the Terms of Service cap of 20 requests/second
+    # holds across tool calls and threads
+    _bucket = _TokenBucket(capacity=20, rate=20.0)
+    
     def __init__(self, user_agent: str = "FirstMCP/1.0 (test application)"):
         """
         Initialize weather API client.
@@ -35,12 +163,11 @@ class WeatherAPI:
         Args:
             user_agent: User-Agent string with app name and contact info
         """
-        import requests
         self.user_agent = user_agent
-        self.session = requests.Session()
+        self.session = self._new_session()
         self.session.headers.update({
             'User-Agent': self.user_agent,
-            'Accept-Encoding': 'gzip'
+            'Accept-Encoding': 'br, gzip' if BROTLI_AVAILABLE else 'gzip'
         })
     
     def _round_coordinates(self, lat: float, lon: float) -> tuple[float, float]:
@@ -70,32 +197,112 @@ class WeatherAPI:
         Raises:
             requests.RequestException: If API request fails
         """
+        return self._forecast_entry(lat, lon)[1]
+    
+    def _forecast_entry(self, lat: float, lon: float) -> _ForecastEntry:
+        """
+        Cache entry for the forecast at given coordinates, fetching or
+        revalidating it when it has expired.
+        
+        Args:
+            lat: Latitude
+            lon: Longitude
+            
+        Returns:
+            (expires epoch, parsed JSON, ETag, Last-Modified, current conditions)
+        """
         lat, lon = self._round_coordinates(lat, lon)
         
+        # Serve from cache until the Expires time the API gave us
+        key = (lat, lon)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached:
+                self._cache.move_to_end(key)
+        if cached and time.time() < cached[0]:
+            return cached
+        
         url = f"{self.BASE_URL}/locationforecast/2.0/compact"
         params = {
             'lat': lat,
             'lon': lon
         }
         
+        # Revalidate a stale entry instead of downloading it again
+        headers = {}
+        if cached:
+            if cached[2]:
+                headers['If-None-Match'] = cached[2]
+            if cached[3]:
+                headers['If-Modified-Since'] = cached[3]
+        
         try:
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            # Store expires header for caching info
-            expires = response.headers.get('Expires')
-            if expires:
-                print(f"API response expires: {expires}", file=sys.stderr)
+            response = self._rate_limited_get(url, params=params, headers=headers, timeout=10)
+            if cached and response.status_code == 304:
+                data, current = cached[1], cached[4]
+            else:
+                response.raise_for_status()
+                data = self._parse_json(response)
+                current = self._current_conditions(data)
             
-            return response.json()
+            entry = (
+                self._expires_epoch(response.headers.get('Expires')),
+                data,
+                response.headers.get('ETag') or (cached[2] if cached else None),
+                response.headers.get('Last-Modified') or (cached[3] if cached else None),
+                current,
+            )
+            self._store(key, entry)
+            return entry
             
         except Exception as e:
             raise Exception(f"Weather API request failed: {e}")
     
+    @classmethod
+    def _store(cls, key: Tuple[float, float], entry: _ForecastEntry) -> None:
+        """
+        Cache a forecast entry, dropping expired entries and then the least
+        recently used ones beyond _CACHE_SIZE.
+        
+        Args:
+            key: Rounded (lat, lon)
+            entry: (expires epoch, parsed JSON, ETag, Last-Modified, current conditions)
+        """
+        now = time.time()
+        with cls._cache_lock:
+            for stale in [k for k, cached in cls._cache.items() if cached[0] <= now]:
+                del cls._cache[stale]
+            cls._cache[key] = entry
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > cls._CACHE_SIZE:
+                cls._cache.popitem(last=False)
+    
+    @staticmethod
+    def _expires_epoch(expires: Optional[str]) -> float:
+        """
+        Parse an Expires header into a Unix timestamp (0.0 if missing or invalid).
+        
+        Args:
+            expires: HTTP-date value of the Expires header
+            
+        Returns:
+            Expiry time in seconds since the epoch
+        """
+        if not expires:
+            return 0.0
+        try:
+            return parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+    
     def get_current_weather(self, lat: float, lon: float) -> Dict[str, Any]:
         """
         Get current weather conditions for given coordinates.
         
+        The conditions are extracted once per downloaded forecast and cached
+        in the forecast's entry; while the forecast is served from cache, so
+        are they.
+        
         Args:
             lat: Latitude
             lon: Longitude
@@ -103,14 +310,37 @@ class WeatherAPI:
         Returns:
             Current weather data with simplified format
         """
-        forecast_data = self.get_forecast(lat, lon)
+        current = self._forecast_entry(lat, lon)[4]
+        
+        if current is None:
+            return {"error": "No weather data available"}
+        
+        return {
+            "location": {
+                "latitude": lat,
+                "longitude": lon
+            },
+            **current,
+            "attribution": "Weather data provided by MET Norway under CC BY 4.0 license"
+        }
+    
+    @staticmethod
+    def _current_conditions(forecast_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Extract the current conditions from a forecast.
         
+        Args:
+            forecast_data: Parsed locationforecast response
+            
+        Returns:
+            Conditions of the first time period, or None if there is none
+        """
         # Extract current conditions from the forecast
         properties = forecast_data.get('properties', {})
         timeseries = properties.get('timeseries', [])
         
         if not timeseries:
-            return {"error": "No weather data available"}
+            return None
         
         # Get the first (current) time period
         current = timeseries[0]
@@ -122,10 +352,6 @@ class WeatherAPI:
         details = next_1h.get('details', {})
         
         return {
-            "location": {
-                "latitude": lat,
-                "longitude": lon
-            },
             "time": current.get('time'),
             "temperature": instant_details.get('air_temperature'),
             "humidity": instant_details.get('relative_humidity'),
@@ -135,18 +361,20 @@ class WeatherAPI:
             "cloud_cover": instant_details.get('cloud_area_fraction'),
             "precipitation_1h": details.get('precipitation_amount'),
             "weather_symbol": summary.get('symbol_code'),
-            "attribution": "Weather data provided by MET Norway under CC BY 4.0 license"
         }
 
 
-class GeocodingAPI:
+class GeocodingAPI(_RateLimitedClient):
     """
     OpenWeatherMap geocoding API client.
     
     Requires OPENWEATHERMAPORG_API_KEY environment variable.
     """
     
-    BASE_URL = "http://api.openweathermap.org/geo/1.0"
+    BASE_URL = "https://api.openweathermap.org/geo/1.0"
+    
+    # Free plan: 60 calls/minute, shared by all clients and geocode_many() workers
+    _bucket = _TokenBucket(capacity=60, rate=1.0)
     
     def __init__(self, api_key: Optional[str] = None):
         """
@@ -155,12 +383,11 @@ class GeocodingAPI:
         Args:
             api_key: OpenWeatherMap API key (or uses env var)
         """
-        import requests
         self.api_key = api_key or os.getenv('OPENWEATHERMAPORG_API_KEY')
         if not self.api_key:
             raise ValueError("OpenWeatherMap API key required. Set OPENWEATHERMAPORG_API_KEY environment variable.")
 
-        self.session = requests.Session()
+        self.session = self._new_session()
     
     def geocode(self, location: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
@@ -184,14 +411,40 @@ class GeocodingAPI:
         }
         
         try:
-            response = self.session.get(url, params=params, timeout=10)
+            response = self._rate_limited_get(url, params=params, timeout=10)
             response.raise_for_status()
             
-            return response.json()
+            return self._parse_json(response)
             
         except Exception as e:
             raise Exception(f"Geocoding API request failed: {e}")
     
+    def geocode_many(self, locations: List[str], limit: int = 5,
+                     max_workers: int = 8) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Geocode several locations concurrently over the shared session.
+        
+        Requests overlap instead of running back to back, while the token
+        bucket keeps the combined rate within the API limit.
+        
+        Args:
+            locations: Location names (duplicates are looked up once)
+            limit: Maximum number of results per location (1-5)
+            max_workers: Maximum number of concurrent requests
+            
+        Returns:
+            Dictionary of location name -> geocode() results, in input order
+            
+        Raises:
+            Exception: If any lookup fails
+        """
+        unique = list(dict.fromkeys(locations))
+        if not unique:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as pool:
+            results = list(pool.map(lambda location: self.geocode(location, limit), unique))
+        return dict(zip(unique, results))
+    
     def get_coordinates(self, location: str) -> Optional[tuple[float, float]]:
         """
         Get the first matching coordinates for a location.
@@ -94,57 +94,49 @@ class TestParseChapterMarkdown(unittest.TestCase):
         for text in texts:
             self.assertFalse(text.startswith('#'))
 
+    def test_crlf_and_plain_number_lines(self):
+        verses = parse_chapter_markdown("# Ruth\r\n## 2\r\n1 And Naomi had a relative\r\n2. And Ruth said\r\n", "Ruth")
+        self.assertEqual(verses, [("Ruth", 2, 1, "And Naomi had a relative"), ("Ruth", 2, 2, "And Ruth said")])
+
 
 class TestBibleLookupParseReference(unittest.TestCase):
     """Test BibleLookup.parse_reference() for all supported formats."""
 
-    def setUp(self):
-        self.lookup = BibleLookup()
-
-    def test_single_verse(self):
-        ref = self.lookup.parse_reference("John 3:16")
-        self.assertEqual(ref.book, "John")
-        self.assertEqual(ref.start_chapter, 3)
-        self.assertEqual(ref.start_verse, 16)
-        self.assertEqual(ref.end_verse, 16)
-
-    def test_verse_range(self):
-        ref = self.lookup.parse_reference("Gen 1:1-3")
-        self.assertEqual(ref.book, "Genesis")
-        self.assertEqual(ref.start_verse, 1)
-        self.assertEqual(ref.end_verse, 3)
-
-    def test_full_chapter(self):
-        ref = self.lookup.parse_reference("Ps 23")
-        self.assertEqual(ref.book, "Psalms")
-        self.assertEqual(ref.start_chapter, 23)
-        self.assertIsNone(ref.start_verse)
-
-    def test_chapter_range(self):
-        ref = self.lookup.parse_reference("Gen 1-4")
-        self.assertEqual(ref.book, "Genesis")
-        self.assertEqual(ref.start_chapter, 1)
-        self.assertEqual(ref.end_chapter, 4)
-        self.assertIsNone(ref.start_verse)
+    @classmethod
+    def setUpClass(cls):
+        cls.lookup = BibleLookup()
+
+    # (reference, expected str(), expected BibleReference fields)
+    CASES = [
+        ("John 3:16", "John 3:16",  # single verse
+         {"book": "John", "start_chapter": 3, "start_verse": 16, "end_verse": 16}),
+        ("Gen 1:1-3", "Genesis 1:1-3",  # verse range
+         {"book": "Genesis", "start_chapter": 1, "start_verse": 1, "end_verse": 3}),
+        ("Ps 23", "Psalms 23",  # full chapter
+         {"book": "Psalms", "start_chapter": 23, "end_chapter": 23, "start_verse": None}),
+        ("Gen 1-4", "Genesis 1-4",  # chapter range
+         {"book": "Genesis", "start_chapter": 1, "end_chapter": 4, "start_verse": None}),
+    ]
+
+    def test_supported_formats(self):
+        for text, expected_str, fields in self.CASES:
+            with self.subTest(reference=text):
+                ref = self.lookup.parse_reference(text)
+                self.assertEqual(str(ref), expected_str)
+                for name, value in fields.items():
+                    self.assertEqual(getattr(ref, name), value, name)
 
     def test_invalid_format_raises(self):
         with self.assertRaises(ValueError):
             self.lookup.parse_reference("not a reference")
 
-    def test_str_representation_single_verse(self):
-        ref = self.lookup.parse_reference("John 3:16")
-        self.assertEqual(str(ref), "John 3:16")
-
-    def test_str_representation_chapter(self):
-        ref = self.lookup.parse_reference("Ps 23")
-        self.assertEqual(str(ref), "Psalms 23")
-
 
 class TestBookNameNormalization(unittest.TestCase):
     """Test that abbreviations map to canonical book names."""
 
-    def setUp(self):
-        self.lookup = BibleLookup()
+    @classmethod
+    def setUpClass(cls):
+        cls.lookup = BibleLookup()
 
     def _normalize(self, name):
         return self.lookup.normalize_book_name(name)
@@ -181,6 +173,10 @@ class TestBookNameNormalization(unittest.TestCase):
         self.assertEqual(self._normalize("JOHN"), self._normalize("john"))
         self.assertEqual(self._normalize("GENESIS"), self._normalize("genesis"))
 
+    def test_canonical_names_case_insensitive(self):
+        self.assertEqual(self._normalize("ii_samuel"), "II_Samuel")
+        self.assertEqual(self._normalize("SONG_OF_SOLOMON"), "Song_of_Solomon")
+
     def test_all_canonical_ot_books_present(self):
         """Every canonical OT book name should round-trip through normalization."""
         for book in CANONICAL_OT_BOOKS:
@@ -197,8 +193,9 @@ class TestBookNameNormalization(unittest.TestCase):
 class TestVersionValidation(unittest.TestCase):
     """Test version gate in BibleLookup."""
 
-    def setUp(self):
-        self.lookup = BibleLookup()
+    @classmethod
+    def setUpClass(cls):
+        cls.lookup = BibleLookup()
 
     def test_esv_is_supported(self):
         self.assertIn("ESV", SUPPORTED_VERSIONS)
@@ -219,8 +216,9 @@ class TestVersionValidation(unittest.TestCase):
 class TestMultiReferenceHandling(unittest.TestCase):
     """Test semicolon-separated multi-reference parsing (no network needed)."""
 
-    def setUp(self):
-        self.lookup = BibleLookup()
+    @classmethod
+    def setUpClass(cls):
+        cls.lookup = BibleLookup()
 
     def test_parse_each_part(self):
         """Each semicolon-separated part should parse independently."""
@@ -0,0 +1,668 @@
+#!/usr/bin/env python3
+"""
+Data Processing Layer Tests — Shared TinyDB handles and memory index
+(memory/database.py, memory/index.py)
+
+Covers:
+  - One handle per file, reused across getter calls
+  - close() flushes to disk but keeps the handle usable
+  - Handle is re-opened when another process rewrites the file
+  - MemoryIndex id/category/tag lookups stay in sync with writes
+
+All tests use a temp FIRST_MCP_DATA_PATH. No API key required.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+
+class TestSharedTinyDB(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_data_path = os.environ.get('FIRST_MCP_DATA_PATH')
+        os.environ['FIRST_MCP_DATA_PATH'] = self.test_dir
+        from first_mcp.memory import database
+        self.database = database
+
+    def tearDown(self):
+        if self.original_data_path:
+            os.environ['FIRST_MCP_DATA_PATH'] = self.original_data_path
+        elif 'FIRST_MCP_DATA_PATH' in os.environ:
+            del os.environ['FIRST_MCP_DATA_PATH']
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _read_file(self, filename):
+        with open(os.path.join(self.test_dir, filename), encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_same_handle_returned(self):
+        """Repeated getter calls return the same handle for the same file."""
+        self.assertIs(self.database.get_memory_tinydb(), self.database.get_memory_tinydb())
+
+    def test_different_files_get_different_handles(self):
+        self.assertIsNot(self.database.get_memory_tinydb(), self.database.get_tags_tinydb())
+
+    def test_close_flushes_and_keeps_handle_open(self):
+        """close() writes to disk; the handle still works afterwards."""
+        db = self.database.get_memory_tinydb()
+        db.table('memories').insert({'id': 'a'})
+        db.close()
+        data = self._read_file('tinydb_memories.json')
+        self.assertEqual(len(data['memories']), 1)
+
+        db.table('memories').insert({'id': 'b'})
+        db.close()
+        self.assertIs(db, self.database.get_memory_tinydb())
+        self.assertEqual(len(self._read_file('tinydb_memories.json')['memories']), 2)
+
+    def test_external_write_triggers_reload(self):
+        """A file rewritten by another process is picked up on the next get."""
+        db = self.database.get_memory_tinydb()
+        db.table('memories').insert({'id': 'a'})
+        db.flush()
+
+        path = os.path.join(self.test_dir, 'tinydb_memories.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'memories': {'1': {'id': 'a'}, '2': {'id': 'external'}}}, f)
+
+        fresh = self.database.get_memory_tinydb()
+        ids = {m['id'] for m in fresh.table('memories').all()}
+        self.assertEqual(ids, {'a', 'external'})
+
+    def test_deferred_write_replayed_after_external_write(self):
+        """A deferred write is re-applied on top of another process's rewrite, not over it."""
+        db = self.database.get_memory_tinydb()
+        db.table('memories').insert({'id': 'a', 'n': 0})
+        db.flush()
+
+        def bump(handle):
+            handle.table('memories').update({'n': 1})
+
+        db.write_deferred(bump)
+        self.assertEqual(list(self._read_file('tinydb_memories.json')['memories'].values())[0]['n'], 0)
+
+        path = os.path.join(self.test_dir, 'tinydb_memories.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'memories': {'1': {'id': 'a', 'n': 0}, '2': {'id': 'external', 'n': 0}}}, f)
+
+        fresh = self.database.get_memory_tinydb()
+        self.assertEqual({m['id']: m['n'] for m in fresh.table('memories').all()},
+                         {'a': 1, 'external': 1})
+        fresh.flush()
+        self.assertEqual(len(self._read_file('tinydb_memories.json')['memories']), 2)
+
+    def test_deferred_write_flushed_after_time_limit(self):
+        """A deferred write reaches disk DEFERRED_FLUSH_SECONDS later without another flush()."""
+        db = self.database.get_memory_tinydb()
+        db.table('memories').insert({'id': 'a', 'n': 0})
+        db.flush()
+
+        original = self.database.DEFERRED_FLUSH_SECONDS
+        self.database.DEFERRED_FLUSH_SECONDS = 0.05
+        try:
+            db.write_deferred(lambda handle: handle.table('memories').update({'n': 1}))
+        finally:
+            self.database.DEFERRED_FLUSH_SECONDS = original
+
+        deadline = time.monotonic() + 5
+        while db._replays and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(list(self._read_file('tinydb_memories.json')['memories'].values())[0]['n'], 1)
+
+    def test_deferred_write_that_changed_nothing_is_not_kept(self):
+        """A write_deferred() call that wrote nothing registers no replay."""
+        db = self.database.get_memory_tinydb()
+        db.write_deferred(lambda handle: None)
+        self.assertEqual(db._replays, [])
+        self.assertFalse(db._only_deferred_pending())
+
+    def test_regular_write_not_dropped_by_external_write(self):
+        """An unflushed insert next to deferred writes is flushed, not discarded, on re-open."""
+        db = self.database.get_memory_tinydb()
+        db.table('memories').insert({'id': 'a', 'n': 0})
+        db.flush()
+
+        def bump(handle):
+            handle.table('memories').update({'n': 1})
+
+        db.write_deferred(bump)
+        db.write_deferred(lambda handle: None)
+        with self.database.memory_batch():
+            db.table('memories').insert({'id': 'b', 'n': 0})
+            db.flush()
+            self.assertFalse(db._only_deferred_pending())
+
+            path = os.path.join(self.test_dir, 'tinydb_memories.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'memories': {'1': {'id': 'a', 'n': 0}}}, f)
+
+            fresh = self.database.get_memory_tinydb()
+            self.assertIn('b', {m['id'] for m in fresh.table('memories').all()})
+
+    def test_non_ascii_round_trip(self):
+        """Files are written as UTF-8 whichever JSON backend is active."""
+        db = self.database.get_memory_tinydb()
+        db.table('memories').insert({'id': 'ø', 'content': 'Blåbærsyltetøy'})
+        db.flush()
+        data = self._read_file('tinydb_memories.json')
+        self.assertEqual(list(data['memories'].values())[0]['content'], 'Blåbærsyltetøy')
+
+    def test_shrinking_write_truncates_file(self):
+        """A smaller rewrite leaves no trailing bytes of the previous contents."""
+        db = self.database.get_memory_tinydb()
+        table = db.table('memories')
+        table.insert({'id': 'long', 'content': 'æ' * 500})
+        db.flush()
+        table.truncate()
+        table.insert({'id': 'short'})
+        db.flush()
+        data = self._read_file('tinydb_memories.json')
+        self.assertEqual([m['id'] for m in data['memories'].values()], ['short'])
+
+    def test_memory_batch_defers_flush_until_exit(self):
+        path = os.path.join(self.test_dir, 'tinydb_memories.json')
+        with self.database.memory_batch():
+            db = self.database.get_memory_tinydb()
+            db.table('memories').insert({'id': 'a'})
+            db.close()
+            self.assertFalse(os.path.exists(path) and os.path.getsize(path))
+            self.assertIs(db, self.database.get_memory_tinydb())
+        self.assertEqual([m['id'] for m in self._read_file('tinydb_memories.json')['memories'].values()], ['a'])
+
+    def test_memory_batch_flushes_at_threshold(self):
+        db = self.database.get_memory_tinydb()
+        table = db.table('memories')
+        with self.database.memory_batch():
+            for i in range(self.database.FLUSH_THRESHOLD):
+                table.insert({'id': str(i)})
+            db.close()
+            self.assertEqual(len(self._read_file('tinydb_memories.json')['memories']),
+                             self.database.FLUSH_THRESHOLD)
+
+    def test_memory_batch_does_not_defer_other_threads(self):
+        """A batch open in one thread leaves flushes made on other threads alone."""
+        db = self.database.get_memory_tinydb()
+        with self.database.memory_batch():
+            def store():
+                db.table('memories').insert({'id': 'other'})
+                db.close()
+            worker = threading.Thread(target=store)
+            worker.start()
+            worker.join()
+            self.assertEqual([m['id'] for m in self._read_file('tinydb_memories.json')['memories'].values()],
+                             ['other'])
+
+    def test_concurrent_inserts_get_distinct_doc_ids(self):
+        """Tool threads sharing a handle never draw the same doc_id."""
+        table = self.database.get_memory_tinydb().table('memories')
+        errors = []
+
+        def store(n):
+            try:
+                for i in range(50):
+                    table.insert({'id': f'{n}-{i}'})
+            except Exception as e:
+                errors.append(e)
+
+        workers = [threading.Thread(target=store, args=(n,)) for n in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len({doc.doc_id for doc in table.all()}), 200)
+
+    def test_memory_batch_exit_raises_write_errors(self):
+        db = self.database.get_memory_tinydb()
+        db.table('memories').insert({'id': 'a'})
+
+        def fail():
+            raise IOError('disk full')
+
+        db._flush_now = fail
+        try:
+            with self.assertRaises(IOError):
+                with self.database.memory_batch():
+                    db.close()
+        finally:
+            del db._flush_now
+            db.flush()
+
+    def test_with_memory_db_flushes_on_exit(self):
+        with self.database.with_memory_db() as db:
+            db.table('memories').insert({'id': 'ctx'})
+        data = self._read_file('tinydb_memories.json')
+        self.assertEqual([m['id'] for m in data['memories'].values()], ['ctx'])
+
+
+class TestMemoryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_data_path = os.environ.get('FIRST_MCP_DATA_PATH')
+        os.environ['FIRST_MCP_DATA_PATH'] = self.test_dir
+        from first_mcp.memory.database import get_memory_tinydb
+        from first_mcp.memory.index import get_memory_index
+        self.db = get_memory_tinydb()
+        self.get_index = get_memory_index
+
+    def tearDown(self):
+        if self.original_data_path:
+            os.environ['FIRST_MCP_DATA_PATH'] = self.original_data_path
+        elif 'FIRST_MCP_DATA_PATH' in os.environ:
+            del os.environ['FIRST_MCP_DATA_PATH']
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _insert(self, mid, category=None, tags=()):
+        self.get_index(self.db).insert({'id': mid, 'category': category, 'tags': list(tags)})
+
+    def test_get_by_id(self):
+        self._insert('a')
+        self._insert('b')
+        self.assertEqual(self.get_index(self.db).get('b')['id'], 'b')
+        self.assertIsNone(self.get_index(self.db).get('missing'))
+
+    def test_in_category_is_case_insensitive_and_ordered(self):
+        self._insert('a', category='Projects')
+        self._insert('b', category='facts')
+        self._insert('c', category='projects')
+        ids = [m['id'] for m in self.get_index(self.db).in_category(' PROJECTS ')]
+        self.assertEqual(ids, ['a', 'c'])
+
+    def test_with_any_tag_unions_and_narrows_by_category(self):
+        self._insert('a', category='facts', tags=['x'])
+        self._insert('b', category='projects', tags=['y'])
+        self._insert('c', category='facts', tags=['x', 'y'])
+        self._insert('d', category='facts', tags=['z'])
+        index = self.get_index(self.db)
+        self.assertEqual([m['id'] for m in index.with_any_tag({'x', 'y'})], ['a', 'b', 'c'])
+        self.assertEqual([m['id'] for m in index.with_any_tag({'y'}, 'Facts')], ['c'])
+        self.assertEqual(index.with_any_tag({'missing'}), [])
+
+    def test_update_moves_category_and_tags(self):
+        self._insert('a', category='facts', tags=['x'])
+        index = self.get_index(self.db)
+        index.update(index.get('a'), {'category': 'projects', 'tags': ['y']})
+        index = self.get_index(self.db)
+        self.assertEqual(index.in_category('facts'), [])
+        self.assertEqual([m['id'] for m in index.in_category('projects')], ['a'])
+        self.assertEqual(index.by_tag.get('x'), set())
+        self.assertEqual(len(index.by_tag['y']), 1)
+        self.assertEqual(index.tags_of(index.get('a')), frozenset({'y'}))
+
+    def test_remove_drops_all_entries(self):
+        self._insert('a', category='facts', tags=['x'])
+        index = self.get_index(self.db)
+        index.remove(index.get('a'))
+        index = self.get_index(self.db)
+        self.assertIsNone(index.get('a'))
+        self.assertEqual(index.in_category('facts'), [])
+
+    def test_tags_are_interned_across_documents(self):
+        table = self.db.table('memories')
+        table.insert({'id': 'a', 'tags': [''.join(['pro', 'ject'])]})
+        table.insert({'id': 'b', 'tags': [''.join(['proj', 'ect'])]})
+        index = self.get_index(self.db)
+        self.assertIs(index.get('a')['tags'][0], index.get('b')['tags'][0])
+
+    def test_all_is_reused_until_next_write(self):
+        self._insert('a')
+        index = self.get_index(self.db)
+        first = index.all()
+        self.assertIs(index.all(), first)
+        self._insert('b')
+        self.assertEqual([m['id'] for m in self.get_index(self.db).all()], ['a', 'b'])
+
+    def test_direct_table_write_triggers_rebuild(self):
+        """Writes that bypass the index are picked up on the next get."""
+        self._insert('a')
+        self.db.table('memories').insert({'id': 'direct', 'category': 'facts'})
+        index = self.get_index(self.db)
+        self.assertEqual(index.get('direct')['id'], 'direct')
+        self.assertEqual([m['id'] for m in index.in_category('facts')], ['direct'])
+
+    def test_build_backfills_expiry_timestamp(self):
+        """Legacy rows without expires_at_ts get it filled in when the index is built."""
+        from first_mcp.memory.index import expiry_timestamp
+        table = self.db.table('memories')
+        table.insert({'id': 'old', 'expires_at': '2020-01-01T00:00:00Z'})
+        table.insert({'id': 'bad', 'expires_at': 'not-a-date'})
+        index = self.get_index(self.db)
+        self.assertEqual(index.get('old')['expires_at_ts'],
+                         expiry_timestamp('2020-01-01T00:00:00+00:00'))
+        self.assertIsNone(index.get('bad')['expires_at_ts'])
+        self.assertTrue(index.is_current())
+
+
+class TestMemoryStats(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_data_path = os.environ.get('FIRST_MCP_DATA_PATH')
+        os.environ['FIRST_MCP_DATA_PATH'] = self.test_dir
+        from first_mcp.memory.database import get_memory_tinydb
+        from first_mcp.memory.memory_tools import tinydb_memory_stats
+        self.table = get_memory_tinydb().table('memories')
+        self.stats = tinydb_memory_stats
+
+    def tearDown(self):
+        if self.original_data_path:
+            os.environ['FIRST_MCP_DATA_PATH'] = self.original_data_path
+        elif 'FIRST_MCP_DATA_PATH' in os.environ:
+            del os.environ['FIRST_MCP_DATA_PATH']
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_distributions_and_expiry(self):
+        self.table.insert({'id': 'a', 'importance': 5, 'category': 'facts'})
+        self.table.insert({'id': 'b', 'importance': 5, 'category': 'facts',
+                           'expires_at': '2000-01-01T00:00:00', 'expires_at_ts': 946684800.0})
+        self.table.insert({'id': 'c', 'category': 'projects'})
+        self.table.insert({'id': 'd', 'importance': 9, 'expires_at_ts': None})
+        result = self.stats()
+        self.assertEqual(result['total_memories'], 4)
+        self.assertEqual(result['active_memories'], 3)
+        self.assertEqual(result['expired_memories'], 1)
+        self.assertEqual(result['importance_distribution'], {1: 0, 2: 0, 3: 1, 4: 0, 5: 2})
+        self.assertEqual(result['category_distribution'], {'facts': 2, 'projects': 1})
+
+
+class TestDeleteMemory(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_data_path = os.environ.get('FIRST_MCP_DATA_PATH')
+        os.environ['FIRST_MCP_DATA_PATH'] = self.test_dir
+        from first_mcp.memory.database import get_memory_tinydb
+        from first_mcp.memory.memory_tools import tinydb_delete_memory
+        self.table = get_memory_tinydb().table('memories')
+        self.delete = tinydb_delete_memory
+
+    def tearDown(self):
+        if self.original_data_path:
+            os.environ['FIRST_MCP_DATA_PATH'] = self.original_data_path
+        elif 'FIRST_MCP_DATA_PATH' in os.environ:
+            del os.environ['FIRST_MCP_DATA_PATH']
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_deleted_memory_omits_internal_fields(self):
+        self.table.insert({'id': 'a', 'content': 'x', 'expires_at': '2999-01-01T00:00:00',
+                           'expires_at_ts': 32472144000.0})
+        result = self.delete('a')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['deleted_memory']['expires_at'], '2999-01-01T00:00:00')
+        self.assertNotIn('expires_at_ts', result['deleted_memory'])
+        self.assertEqual(len(self.table), 0)
+
+
+class TestCheckCategoryExists(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_data_path = os.environ.get('FIRST_MCP_DATA_PATH')
+        os.environ['FIRST_MCP_DATA_PATH'] = self.test_dir
+        from first_mcp.memory.database import get_categories_tinydb
+        from first_mcp.memory.semantic_search import check_category_exists
+        self.table = get_categories_tinydb().table('categories')
+        self.check = check_category_exists
+
+    def tearDown(self):
+        if self.original_data_path:
+            os.environ['FIRST_MCP_DATA_PATH'] = self.original_data_path
+        elif 'FIRST_MCP_DATA_PATH' in os.environ:
+            del os.environ['FIRST_MCP_DATA_PATH']
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_no_categories(self):
+        self.assertEqual(self.check('facts'), (False, "No categories exist in database", []))
+
+    def test_case_insensitive_match(self):
+        self.table.insert({'category': 'Projects'})
+        exists, error, names = self.check('projects')
+        self.assertTrue(exists)
+        self.assertEqual(names, ['Projects'])
+
+    def test_new_category_seen_after_insert(self):
+        self.table.insert({'category': 'facts'})
+        self.assertFalse(self.check('projects')[0])
+        self.table.insert({'category': 'projects'})
+        self.assertTrue(self.check('projects')[0])
+
+    def test_usage_update_finds_category_by_name(self):
+        from first_mcp.memory.memory_tools import tinydb_update_category_usage
+        tinydb_update_category_usage('facts')
+        self.table.insert({'category': 'projects', 'usage_count': 2})
+        tinydb_update_category_usage('projects')
+        tinydb_update_category_usage('facts')
+        self.assertEqual({c['category']: c['usage_count'] for c in self.table.all()},
+                         {'facts': 2, 'projects': 3})
+
+
+
+class TestFindSimilarTagsBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_data_path = os.environ.get('FIRST_MCP_DATA_PATH')
+        os.environ['FIRST_MCP_DATA_PATH'] = self.test_dir
+        from first_mcp.memory.database import get_tags_tinydb
+        from first_mcp.memory import semantic_search
+        self.semantic_search = semantic_search
+        self.table = get_tags_tinydb().table('tags')
+        self.table.insert({'tag': 'scheduling', 'usage_count': 3, 'normalized': True,
+                           'embedding': [1.0, 0.0, 0.0]})
+        self.table.insert({'tag': 'python', 'usage_count': 1, 'normalized': True,
+                           'embedding': [0.0, 1.0, 0.0]})
+
+    def tearDown(self):
+        if self.original_data_path:
+            os.environ['FIRST_MCP_DATA_PATH'] = self.original_data_path
+        elif 'FIRST_MCP_DATA_PATH' in os.environ:
+            del os.environ['FIRST_MCP_DATA_PATH']
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _batch(self, queries, embeddings, **kwargs):
+        from unittest import mock
+        with mock.patch.object(self.semantic_search, '_generate_embeddings_batch',
+                               return_value=embeddings) as batch:
+            results = self.semantic_search.find_similar_tags_batch(queries, **kwargs)
+        batch.assert_called_once_with(queries)
+        return results
+
+    def test_one_embedding_call_for_all_queries(self):
+        results = self._batch(['timetabling', 'coding'], [[0.9, 0.1, 0.0], [0.0, 2.0, 0.0]],
+                              min_similarity=0.7)
+        self.assertEqual([r['tag'] for r in results[0]], ['scheduling'])
+        self.assertEqual(results[1], [{'tag': 'python', 'similarity': 1.0, 'usage_count': 1}])
+
+    def test_tag_registry_follows_tag_writes(self):
+        from first_mcp.memory import tag_scoring
+        registry = tag_scoring.build_tag_registry()
+        self.assertEqual(sorted(registry), ['python', 'scheduling'])
+        self.assertIs(tag_scoring.build_tag_registry(), registry)
+        from first_mcp.memory import tag_tools
+        tag_tools.increment_tag_usage(['python'])
+        self.assertIs(tag_scoring.build_tag_registry(), registry)
+        self.table.insert({'tag': 'rust', 'usage_count': 1, 'embedding': [0.0, 0.0, 2.0]})
+        self.assertAlmostEqual(float(tag_scoring.build_tag_registry()['rust'][2]), 1.0, places=3)
+
+    def test_usage_update_patches_cached_columns(self):
+        from first_mcp.memory import tag_tools
+        names, _, matrix = self.semantic_search.get_tag_matrix(3)
+        self.semantic_search.find_similar_tags_by_string('python', 0.5)
+        tag_tools.increment_tag_usage(['python', 'python'])
+        names_after, usage, matrix_after = self.semantic_search.get_tag_matrix(3)
+        self.assertIs(names_after, names)
+        self.assertIs(matrix_after, matrix)
+        self.assertEqual(usage.tolist(), [3, 3])
+        entry = self.semantic_search.find_similar_tags_by_string('python', 0.5)[0]
+        self.assertEqual(entry['usage_count'], 3)
+        self.assertEqual(entry['last_used'], self.table.get(doc_id=2)['last_used_at'])
+
+    def test_failed_embedding_falls_back_to_string_match(self):
+        results = self._batch(['py'], [None], min_similarity=0.7)
+        self.assertEqual(results, [[{'tag': 'python', 'similarity': 0.8, 'usage_count': 1}]])
+
+    def test_failed_query_embedding_not_memoized(self):
+        """A string-ladder fallback after a failed embedding call is not served from the cache."""
+        from unittest import mock
+        find = self.semantic_search.find_similar_tags_internal
+        with mock.patch.object(self.semantic_search, '_generate_embedding', return_value=None):
+            self.assertEqual(find('timetabling', min_similarity=0.5), [])
+        with mock.patch.object(self.semantic_search, '_generate_embedding', return_value=[0.9, 0.1, 0.0]):
+            self.assertEqual(find('timetabling', min_similarity=0.5), ['scheduling'])
+
+    def test_find_similar_tags_tool_uses_the_tag_matrix(self):
+        from unittest import mock
+        from first_mcp.memory import tag_tools
+        self.table.update({'last_used_at': 't2'}, doc_ids=[1])
+        with mock.patch.object(tag_tools, '_generate_embedding', return_value=[0.9, 0.1, 0.0]):
+            result = tag_tools.tinydb_find_similar_tags('timetabling', min_similarity=0.5)
+        self.assertEqual(result['total_found'], 1)
+        self.assertFalse(result['total_found_approximate'])
+        entry = result['similar_tags'][0]
+        self.assertEqual((entry['tag'], entry['method'], entry['last_used']),
+                         ('scheduling', 'embedding', 't2'))
+
+    def test_find_similar_tags_tool_flags_approximate_count(self):
+        from unittest import mock
+        from first_mcp.memory import tag_tools
+        with mock.patch.object(tag_tools, '_generate_embedding', return_value=[0.9, 0.1, 0.0]), \
+                mock.patch.object(tag_tools, 'uses_ann_index', return_value=True):
+            result = tag_tools.tinydb_find_similar_tags('timetabling', min_similarity=0.5)
+        self.assertTrue(result['total_found_approximate'])
+
+    def test_find_similar_tags_tool_counts_all_string_matches(self):
+        from unittest import mock
+        from first_mcp.memory import tag_tools
+        self.table.insert({'tag': 'python-web', 'usage_count': 7, 'embedding': []})
+        with mock.patch.object(tag_tools, '_generate_embedding', return_value=None):
+            result = tag_tools.tinydb_find_similar_tags('python', limit=1, min_similarity=0.5)
+        self.assertEqual(result['total_found'], 2)
+        self.assertEqual([(e['tag'], e['method']) for e in result['similar_tags']],
+                         [('python-web', 'string')])
+
+    def test_similar_tag_map_excludes_the_tag_itself(self):
+        from first_mcp.memory.tag_enrichment import _similar_tag_map
+        self.table.insert({'tag': 'timetabling', 'usage_count': 2, 'normalized': True,
+                           'embedding': [0.8, 0.6, 0.0]})
+        similar = _similar_tag_map(['scheduling', 'unregistered'])
+        self.assertEqual([(s['tag'], s['usage_count']) for s in similar['scheduling']],
+                         [('timetabling', 2)])
+        self.assertAlmostEqual(similar['scheduling'][0]['similarity'], 0.8, places=3)
+        self.assertEqual(similar['unregistered'], [])
+
+    def test_string_matches_ranked_from_cached_columns(self):
+        self.table.insert({'tag': 'python-web', 'usage_count': 7, 'last_used_at': 't1',
+                           'embedding': []})
+        entries = self.semantic_search.find_similar_tags_by_string('python', 0.3)
+        self.assertEqual([(e['tag'], e['similarity']) for e in entries],
+                         [('python-web', 0.8), ('python', 0.8)])
+        self.assertEqual(entries[0]['last_used'], 't1')
+        self.assertEqual(len(self.semantic_search.find_similar_tags_by_string('python', 0.3, 1)), 1)
+
+
+class TestTagRegistration(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_data_path = os.environ.get('FIRST_MCP_DATA_PATH')
+        os.environ['FIRST_MCP_DATA_PATH'] = self.test_dir
+        from first_mcp.memory.database import get_tags_tinydb
+        from first_mcp.memory import tag_tools
+        self.tag_tools = tag_tools
+        self.table = get_tags_tinydb().table('tags')
+
+    def tearDown(self):
+        if self.original_data_path:
+            os.environ['FIRST_MCP_DATA_PATH'] = self.original_data_path
+        elif 'FIRST_MCP_DATA_PATH' in os.environ:
+            del os.environ['FIRST_MCP_DATA_PATH']
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _counts(self):
+        return {t['tag']: t['usage_count'] for t in self.table.all()}
+
+    def test_register_increment_decrement(self):
+        self.tag_tools.tinydb_register_tags(['python', 'web'])
+        self.tag_tools.tinydb_register_tags(['python'])
+        self.tag_tools.increment_tag_usage(['web', 'unknown'])
+        self.tag_tools.decrement_tag_usage(['python'])
+        self.assertEqual(self._counts(), {'python': 1, 'web': 2})
+
+    def test_usage_bump_deferred_until_flush(self):
+        from first_mcp.memory.database import get_tags_tinydb
+        path = os.path.join(self.test_dir, 'tinydb_tags.json')
+        self.tag_tools.tinydb_register_tags(['python'])
+        self.tag_tools.increment_tag_usage(['python'])
+        self.assertEqual(self._counts(), {'python': 2})
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(list(json.load(f)['tags'].values())[0]['usage_count'], 1)
+        get_tags_tinydb().flush()
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(list(json.load(f)['tags'].values())[0]['usage_count'], 2)
+
+    def test_repeated_tag_in_one_call(self):
+        result = self.tag_tools.tinydb_register_tags(['go', 'go'])
+        self.assertEqual(result['registered_tags'][1], 'Updated: go')
+        self.tag_tools.increment_tag_usage(['go', 'go'])
+        self.assertEqual(self._counts(), {'go': 4})
+
+    def test_caller_timestamp_used_for_the_batch(self):
+        stamp = '2026-01-02T03:04:05'
+        self.tag_tools.tinydb_register_tags(['python', 'web'], stamp)
+        self.tag_tools.tinydb_register_tags(['python'], '2026-01-03T00:00:00')
+        rows = {t['tag']: t for t in self.table.all()}
+        self.assertEqual({t['created_at'] for t in rows.values()}, {stamp})
+        self.assertEqual(rows['python']['last_used_at'], '2026-01-03T00:00:00')
+
+    def test_tag_timestamps_formatted_once_per_second(self):
+        from unittest import mock
+        with mock.patch.object(self.tag_tools.time, 'time', return_value=1767225600.25):
+            first = self.tag_tools._now_iso()
+            self.assertIs(self.tag_tools._now_iso(), first)
+        with mock.patch.object(self.tag_tools.time, 'time', return_value=1767225601.0):
+            self.assertGreater(self.tag_tools._now_iso(), first)
+        self.tag_tools.tinydb_register_tags(['python'])
+        self.tag_tools.increment_tag_usage(['python'])
+        self.assertEqual(len(self.table.all()[0]['last_used_at']), len('2026-01-01T00:00:00'))
+
+    def test_missing_embeddings_generated_in_one_batch(self):
+        from unittest import mock
+        self.tag_tools.tinydb_register_tags(['python', 'web', 'rust'])
+        with mock.patch.object(self.tag_tools, '_generate_embeddings_batch',
+                               return_value=[[3.0, 4.0], None, [0.0, 2.0]]) as batch:
+            result = self.tag_tools.tinydb_generate_missing_embeddings()
+        batch.assert_called_once_with(['python', 'web', 'rust'])
+        self.assertEqual((result['generated'], result['failed']), (2, 1))
+        embeddings = {t['tag']: t['embedding'] for t in self.table.all()}
+        self.assertEqual(embeddings['web'], [])
+        self.assertEqual(embeddings['rust'], [0.0, 1.0])
+        self.assertAlmostEqual(embeddings['python'][0], 0.6, places=5)
+
+    def test_embedding_stats_follow_writes(self):
+        from unittest import mock
+        self.tag_tools.tinydb_register_tags(['python', 'web'])
+        self.assertEqual(self.tag_tools.tinydb_embedding_stats()['tags_without_embeddings'], 2)
+        with mock.patch.object(self.tag_tools, '_generate_embeddings_batch',
+                               return_value=[[1.0, 0.0], None]):
+            self.tag_tools.tinydb_generate_missing_embeddings()
+        stats = self.tag_tools.tinydb_embedding_stats()
+        self.assertEqual((stats['tags_with_embeddings'], stats['tags_without_embeddings']), (1, 1))
+
+    def test_tags_written_elsewhere_are_found(self):
+        self.tag_tools.tinydb_register_tags(['python'])
+        self.table.insert({'tag': 'rust', 'usage_count': 4, 'embedding': []})
+        self.tag_tools.tinydb_register_tags(['rust'])
+        self.assertEqual(self._counts(), {'python': 1, 'rust': 5})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ Data Processing Layer Tests — Embeddings
 Tests the embeddings.py module at the data layer:
 - cosine_similarity (pure math, no API required)
 - weighted_combine_embeddings (pure math, no API required)
+- normalize_embedding (pure math, no API required)
 - compute_text_similarity graceful error handling when API unavailable
 - rank_texts_by_similarity graceful error handling when API unavailable
 """
@@ -127,6 +128,128 @@ class TestWeightedCombineEmbeddings(unittest.TestCase):
         self.assertIsNone(result)
 
 
+class TestNormalizeEmbedding(unittest.TestCase):
+    """Test normalize_embedding with known vectors."""
+
+    def setUp(self):
+        from first_mcp.embeddings import normalize_embedding
+        self.normalize = normalize_embedding
+
+    def test_unit_length(self):
+        result = self.normalize([3.0, 4.0])
+        self.assertAlmostEqual(result[0], 0.6, places=5)
+        self.assertAlmostEqual(result[1], 0.8, places=5)
+
+    def test_zero_vector_unchanged(self):
+        self.assertEqual(self.normalize([0.0, 0.0]), [0.0, 0.0])
+
+    def test_components_serialize_compactly(self):
+        import json
+        result = self.normalize([1.0, 2.0, 3.0])
+        self.assertTrue(all(len(json.dumps(x)) <= 12 for x in result))
+        self.assertAlmostEqual(sum(x * x for x in result), 1.0, places=6)
+
+    def test_empty_vector_unchanged(self):
+        self.assertEqual(self.normalize([]), [])
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test the shared embedding cache without calling the API."""
+
+    def setUp(self):
+        from first_mcp import embeddings
+        self.embeddings = embeddings
+        self._original_key = os.environ.get('GOOGLE_API_KEY')
+        os.environ['GOOGLE_API_KEY'] = 'test-key'
+        self._original_size = embeddings._EMBEDDING_CACHE_SIZE
+        embeddings._embedding_cache.clear()
+
+    def tearDown(self):
+        self.embeddings._embedding_cache.clear()
+        self.embeddings._EMBEDDING_CACHE_SIZE = self._original_size
+        if self._original_key is not None:
+            os.environ['GOOGLE_API_KEY'] = self._original_key
+        else:
+            os.environ.pop('GOOGLE_API_KEY', None)
+
+    def _put(self, text, embedding):
+        self.embeddings._cache_put(self.embeddings._cache_key(text, 'test-key'), embedding)
+
+    def test_cached_texts_skip_the_api(self):
+        self._put('some content', [0.25, 0.5])
+        self._put('tag', [1.0, 0.0])
+        self.assertEqual(self.embeddings.generate_embeddings_batch(['some content', 'tag']),
+                         [[0.25, 0.5], [1.0, 0.0]])
+        self.assertEqual(self.embeddings.generate_embedding('tag'), [1.0, 0.0])
+
+    def test_least_recently_used_entry_evicted(self):
+        self.embeddings._EMBEDDING_CACHE_SIZE = 2
+        self._put('a', [1.0])
+        self._put('b', [2.0])
+        self.embeddings.generate_embedding('a')  # refresh 'a'
+        self._put('c', [3.0])
+        self.assertEqual(self.embeddings.generate_embeddings_batch(['a', 'c']), [[1.0], [3.0]])
+        key_b = self.embeddings._cache_key('b', 'test-key')
+        self.assertNotIn(key_b, self.embeddings._embedding_cache)
+
+    def test_rank_texts_scores_cached_candidates(self):
+        self._put('query', [1.0, 0.0])
+        self._put('same', [2.0, 0.0])
+        self._put('diagonal', [1.0, 1.0])
+        self._put('opposite', [-1.0, 0.0])
+        self._put('other model', [1.0, 0.0, 0.0])
+        result = self.embeddings.rank_texts_by_similarity(
+            'query', ['opposite', 'diagonal', 'same', 'other model'])
+        self.assertTrue(result['success'])
+        self.assertEqual([(r['index'], r['similarity']) for r in result['ranked']],
+                         [(2, 1.0), (1, 0.7071), (0, 0.0), (3, 0.0)])
+
+    def test_parallel_batches_keep_input_order(self):
+        from types import SimpleNamespace
+        from unittest import mock
+
+        def embed_content(model, contents):
+            if 'bad' in contents:
+                raise RuntimeError('quota')
+            return SimpleNamespace(embeddings=[SimpleNamespace(values=[float(len(t))]) for t in contents])
+
+        client = SimpleNamespace(models=SimpleNamespace(embed_content=embed_content))
+        self._put('cached', [9.0])
+        with mock.patch.object(self.embeddings, 'get_genai_client', return_value=client):
+            results = self.embeddings.generate_embeddings_batch(
+                ['a', 'bb', 'cached', 'bad', 'dddd'], batch_size=1)
+        self.assertEqual(results, [[1.0], [2.0], [9.0], None, [4.0]])
+        self.assertEqual(self.embeddings.generate_embedding('dddd'), [4.0])
+
+
+class TestGenaiClient(unittest.TestCase):
+    """Test that the google.genai client is created once and shared."""
+
+    def setUp(self):
+        from unittest import mock
+        from first_mcp import embeddings
+        self.embeddings = embeddings
+        self.genai = mock.MagicMock()
+        google = mock.MagicMock(genai=self.genai)
+        self._modules = mock.patch.dict(sys.modules, {'google': google, 'google.genai': self.genai})
+        self._modules.start()
+        embeddings._client = embeddings._client_key = None
+
+    def tearDown(self):
+        self._modules.stop()
+        self.embeddings._client = self.embeddings._client_key = None
+
+    def test_client_reused_across_calls(self):
+        first = self.embeddings.get_genai_client('key-1')
+        self.assertIs(self.embeddings.get_genai_client('key-1'), first)
+        self.genai.Client.assert_called_once_with(api_key='key-1')
+
+    def test_new_key_creates_new_client(self):
+        self.embeddings.get_genai_client('key-1')
+        self.embeddings.get_genai_client('key-2')
+        self.assertEqual(self.genai.Client.call_count, 2)
+
+
 class TestComputeTextSimilarityNoApi(unittest.TestCase):
     """
     Test compute_text_similarity behaviour when the embedding API is unavailable.
@@ -2,10 +2,11 @@
 """
 Data Processing Layer Tests — Memory Retrieval (pagination + tag scoring)
 
-Tests the two new data-layer modules with no MCP client and no external API:
+Tests the data-layer modules with no MCP client and no external API:
 
-  pagination.py  — save/get/cleanup of paginated result files
-  tag_scoring.py — score_memories_by_tags with synthetic embeddings
+  pagination.py      — save/get/cleanup of paginated result files
+  tag_scoring.py     — score_memories_by_tags with synthetic embeddings
+  semantic_search.py — stacked tag-embedding matrix, string-similarity fallback
 
 All tests run without GOOGLE_API_KEY or a real TinyDB.
 """
@@ -15,6 +16,7 @@ import os
 import sys
 import tempfile
 import unittest
+from unittest import mock
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
@@ -248,6 +250,28 @@ class TestTagScoring(unittest.TestCase):
         self.assertIn("known", ids)
         self.assertNotIn("unknown", ids)
 
+    def test_mismatched_embedding_size_scores_zero(self):
+        """A memory tag embedded with a different model size is never a match."""
+        registry = dict(self.registry, legacy=[1.0, 0.0, 0.0, 0.0])
+        memories = [
+            _make_memory("known",  ["timetabling"]),
+            _make_memory("legacy", ["legacy"]),
+        ]
+        results = self.score(["timetabling"], memories, registry)
+        ids = [m["id"] for (_, m, _) in results]
+        self.assertEqual(ids, ["known"])
+
+    def test_unknown_query_tags_embedded_in_one_call(self):
+        """Query tags missing from the registry are resolved with a single batched API call."""
+        from first_mcp.memory import tag_scoring
+        memories = [_make_memory("m", ["timetabling"])]
+        batch = mock.Mock(return_value=[[1.0, 0.0, 0.0], None])
+        with mock.patch.object(tag_scoring, '_generate_embeddings_batch', batch):
+            results = self.score(["agenda", "ghost", "agenda"], memories, self.registry)
+        batch.assert_called_once_with(["agenda", "ghost"])
+        self.assertEqual([m["id"] for (_, m, _) in results], ["m"])
+        self.assertEqual(results[0][2], ["agenda"])
+
     def test_result_sorted_descending_by_score(self):
         """Results are sorted highest rank_score first."""
         memories = [
@@ -321,6 +345,210 @@ class TestTagScoring(unittest.TestCase):
                 "perfect sim=1.0 should score at least as high as partial sim<1.0")
 
 
+# ---------------------------------------------------------------------------
+# Tag matrix tests
+# ---------------------------------------------------------------------------
+
+class TestTagMatrix(unittest.TestCase):
+    """Tests for semantic_search._load_tag_matrix with synthetic 3-dim embeddings."""
+
+    def setUp(self):
+        from first_mcp.memory.semantic_search import _load_tag_matrix
+        self.load = _load_tag_matrix
+
+    def test_rows_are_unit_length(self):
+        names, usage, matrix = self.load(
+            [{"tag": "a", "embedding": [3.0, 4.0, 0.0], "usage_count": 2}], 3)
+        self.assertEqual(names, ["a"])
+        self.assertEqual(usage.tolist(), [2])
+        self.assertAlmostEqual(float((matrix[0] ** 2).sum()), 1.0, places=5)
+
+    def test_missing_and_mismatched_embeddings_skipped(self):
+        names, _, matrix = self.load([
+            {"tag": "ok", "embedding": [1.0, 0.0, 0.0]},
+            {"tag": "empty", "embedding": []},
+            {"tag": "none"},
+            {"tag": "old-model", "embedding": [1.0, 0.0]},
+        ], 3)
+        self.assertEqual(names, ["ok"])
+        self.assertEqual(matrix.shape, (1, 3))
+
+    def test_rows_flagged_normalized_are_used_as_stored(self):
+        _, _, matrix = self.load([
+            {"tag": "pre", "embedding": [0.6, 0.8, 0.0], "normalized": True},
+            {"tag": "legacy", "embedding": [0.0, 2.0, 0.0]},
+        ], 3)
+        self.assertEqual(matrix[1].tolist(), [0.0, 1.0, 0.0])
+        self.assertAlmostEqual(float(matrix[0][1]), 0.8, places=5)
+
+    def test_zero_vector_does_not_divide_by_zero(self):
+        _, _, matrix = self.load([{"tag": "z", "embedding": [0.0, 0.0, 0.0]}], 3)
+        self.assertEqual(matrix.tolist(), [[0.0, 0.0, 0.0]])
+
+    def test_empty_input(self):
+        names, usage, matrix = self.load([], 3)
+        self.assertEqual(names, [])
+        self.assertEqual(matrix.shape, (0, 3))
+
+    def test_sidecar_written_reused_and_replaced(self):
+        tmpdir = tempfile.mkdtemp()
+        base = os.path.join(tmpdir, "tinydb_tags.embeddings")
+        rows = [{"tag": "a", "embedding": [3.0, 4.0, 0.0], "embedding_generated_at": "t1"}]
+
+        _, _, cold = self.load(rows, 3, base)
+        files = [f for f in os.listdir(tmpdir) if f.endswith(".f32.npy")]
+        self.assertEqual(len(files), 1)
+
+        _, _, warm = self.load(rows, 3, base)
+        self.assertEqual(cold.tolist(), warm.tolist())
+
+        rows[0]["embedding_generated_at"] = "t2"
+        self.load(rows, 3, base)
+        replaced = [f for f in os.listdir(tmpdir) if f.endswith(".f32.npy")]
+        self.assertEqual(len(replaced), 1)
+        self.assertNotEqual(replaced, files)
+
+    def test_sidecar_keyed_on_embedding_stamp(self):
+        """A warm load takes the sidecar without reading the embeddings; a new stamp rebuilds."""
+        base = os.path.join(tempfile.mkdtemp(), "tinydb_tags.embeddings")
+        rows = [{"tag": "a", "embedding": [3.0, 4.0, 0.0], "embedding_generated_at": "t1"}]
+        self.load(rows, 3, base)
+        rows[0]["embedding"] = [3.0, 0.0, 0.0]
+        _, _, matrix = self.load(rows, 3, base)
+        self.assertAlmostEqual(float(matrix[0][1]), 0.8, places=5)
+        rows[0]["embedding_generated_at"] = "t2"
+        _, _, matrix = self.load(rows, 3, base)
+        self.assertEqual(matrix.tolist(), [[1.0, 0.0, 0.0]])
+
+    def test_unstamped_rows_hashed_by_components(self):
+        base = os.path.join(tempfile.mkdtemp(), "tinydb_tags.embeddings")
+        rows = [{"tag": "a", "embedding": [3.0, 4.0, 0.0]}]
+        self.load(rows, 3, base)
+        rows[0]["embedding"] = [3.0, 0.0, 0.0]
+        _, _, matrix = self.load(rows, 3, base)
+        self.assertEqual(matrix.tolist(), [[1.0, 0.0, 0.0]])
+
+    def test_matrix_stays_float32(self):
+        """Cold and sidecar-backed loads both hand the BLAS matvec a float32 matrix."""
+        base = os.path.join(tempfile.mkdtemp(), "tinydb_tags.embeddings")
+        rows = [{"tag": "a", "embedding": [1.0, 2.0, 2.0], "embedding_generated_at": "t1"}]
+        _, _, cold = self.load(rows, 3, base)
+        _, _, warm = self.load(rows, 3, base)
+        self.assertEqual(str(cold.dtype), "float32")
+        self.assertEqual(str(warm.dtype), "float32")
+
+    def test_usage_change_reuses_the_matrix(self):
+        base = os.path.join(tempfile.mkdtemp(), "tinydb_tags.embeddings")
+        rows = [{"tag": "a", "embedding": [3.0, 4.0, 0.0], "usage_count": 1}]
+        _, _, first = self.load(rows, 3, base)
+        rows[0]["usage_count"] = 2
+        _, usage, second = self.load(rows, 3, base)
+        self.assertIs(first, second)
+        self.assertEqual(usage.tolist(), [2])
+
+
+
+class TestStringSimilarities(unittest.TestCase):
+    """Tests for the semantic_search string-similarity fallback helpers."""
+
+    def setUp(self):
+        from first_mcp.memory import semantic_search
+        self.ss = semantic_search
+
+    def score(self, query, names):
+        columns = self.ss._string_columns([name.lower() for name in names])
+        return self.ss._string_scores(query, *columns).tolist()
+
+    def test_ladder(self):
+        names = ["machine learning", "learn", "python", "ml ops"]
+        self.assertEqual(self.score("Machine Learning ", names), [0.8, 0.4, 0.0, 0.0])
+        self.assertEqual(self.score("learning python", names), [0.6, 0.4, 0.6, 0.0])
+
+    def test_word_checks_are_substring_matches(self):
+        self.assertEqual(self.score("py", ["python"]), [0.8])
+        self.assertEqual(self.score("deep learning", ["learn"]), [0.4])
+        self.assertEqual(self.score("autoscaling", ["scale up", "scal"]), [0.0, 0.4])
+
+    def test_rungs_below_min_similarity_skipped(self):
+        names = ["machine learning", "learn", "python", "ml ops"]
+        columns = self.ss._string_columns([name.lower() for name in names])
+        with mock.patch.object(self.ss, '_rows_with_word_in') as word_in:
+            scores = self.ss._string_scores("learning python", *columns, min_similarity=0.5)
+        word_in.assert_not_called()
+        self.assertEqual(scores.tolist(), [0.6, 0.0, 0.6, 0.0])
+        scores = self.ss._string_scores("learning python", *columns, min_similarity=0.9)
+        self.assertEqual(scores.tolist(), [0.0] * 4)
+
+    def test_empty_vocabulary(self):
+        self.assertEqual(self.score("python", []), [])
+
+    def test_matches_do_not_cross_names(self):
+        """A needle spanning the end of one name and the start of the next is no match."""
+        self.assertEqual(self.score("onpy", ["python", "py", "java"]), [0.0, 0.4, 0.0])
+        self.assertEqual(self.score("", ["a", "", "b"]), [0.8, 0.8, 0.8])
+
+    def test_every_matching_row_reported_once(self):
+        haystack, starts, _, _ = self.ss._string_columns(["aa aa", "b", "aab", "aa"])
+        self.assertEqual(self.ss._rows_containing(haystack, starts, "aa"), [0, 2, 3])
+
+
+class TestTopRows(unittest.TestCase):
+    """Tests for semantic_search._top_rows (partial top-k selection)."""
+
+    def setUp(self):
+        import numpy as np
+        from first_mcp.memory.semantic_search import _top_rows
+        self.np = np
+        self.top = _top_rows
+
+    def test_matches_full_sort(self):
+        np = self.np
+        rng = np.random.default_rng(0)
+        sims = rng.choice([0.5, 0.6, 0.7, 0.9], size=200)
+        usage = rng.integers(0, 20, size=200)
+        full = np.lexsort((-usage, -sims))
+        for limit in (1, 5, 50, 200, 500):
+            top = self.top(sims, usage, limit)
+            self.assertEqual(list(zip(sims[top], usage[top])),
+                             list(zip(sims[full[:limit]], usage[full[:limit]])))
+
+    def test_usage_breaks_ties_at_the_cut(self):
+        np = self.np
+        top = self.top(np.array([0.5, 0.9, 0.5, 0.5]), np.array([1, 0, 7, 3]), 2)
+        self.assertEqual(top.tolist(), [1, 2])
+
+    def test_empty_and_zero_limit(self):
+        np = self.np
+        self.assertEqual(self.top(np.array([]), np.array([], dtype=np.int64), 5).tolist(), [])
+        self.assertEqual(self.top(np.array([0.9]), np.array([1]), 0).tolist(), [])
+
+
+class TestAnnIndex(unittest.TestCase):
+    """Tests for semantic_search._similar_rows through the HNSW index (needs hnswlib)."""
+
+    def setUp(self):
+        import numpy as np
+        from first_mcp.memory import semantic_search
+        if not semantic_search.HNSWLIB_AVAILABLE:
+            self.skipTest('hnswlib not installed')
+        self.np = np
+        self.ss = semantic_search
+        patcher = mock.patch.object(semantic_search, 'ANN_MIN_TAGS', 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_index_built_once_per_matrix(self):
+        np = self.np
+        matrix = np.eye(20, dtype=np.float32)
+        idx, sims = self.ss._similar_rows(matrix, matrix[3], 0.5, 5)
+        self.assertEqual(idx.tolist(), [3])
+        self.assertAlmostEqual(float(sims[0]), 1.0, places=5)
+        index = self.ss._ann_cache[1]
+        self.ss._similar_rows(matrix, matrix[7], 0.5, 5)
+        self.assertIs(self.ss._ann_cache[1], index)
+        self.ss._similar_rows(matrix.copy(), matrix[7], 0.5, 5)
+        self.assertIsNot(self.ss._ann_cache[1], index)
+
 # ---------------------------------------------------------------------------
 # Date sort key tests
 # ---------------------------------------------------------------------------
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Data Processing Layer Tests — Weather API client (weather.py)
+
+Covers:
+  - Forecasts are served from cache until their Expires time, in a bounded LRU
+  - Stale entries are revalidated with ETag / Last-Modified; 304 reuses the body
+  - Current conditions are extracted once per downloaded forecast and kept in its entry
+  - Token bucket rate limiting and 429 retries
+  - Concurrent batch geocoding
+
+The HTTP session is replaced by a mock. No network access required.
+"""
+
+import json
+import os
+import sys
+import time
+import unittest
+from email.utils import formatdate
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+
+def _response(status=200, body=None, headers=None):
+    response = mock.MagicMock(status_code=status, headers=headers or {})
+    response.json.return_value = body
+    response.content = json.dumps(body).encode('utf-8')
+    return response
+
+
+class TestForecastCache(unittest.TestCase):
+
+    def setUp(self):
+        from first_mcp.weather import WeatherAPI
+        WeatherAPI._cache.clear()
+        self.api = WeatherAPI()
+        self.api.session = mock.MagicMock()
+
+    def tearDown(self):
+        self.api._cache.clear()
+
+    def test_fresh_entry_skips_the_request(self):
+        expires = formatdate(time.time() + 3600, usegmt=True)
+        self.api.session.get.return_value = _response(body={'n': 1}, headers={'Expires': expires})
+        self.assertEqual(self.api.get_forecast(59.91273, 10.74609), {'n': 1})
+        self.assertEqual(self.api.get_forecast(59.912731, 10.746091), {'n': 1})
+        self.assertEqual(self.api.session.get.call_count, 1)
+
+    def test_stale_entry_revalidated(self):
+        expired = formatdate(time.time() - 60, usegmt=True)
+        self.api.session.get.return_value = _response(
+            body={'n': 1}, headers={'Expires': expired, 'ETag': '"v1"',
+                                    'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+        self.api.get_forecast(60.0, 10.0)
+
+        self.api.session.get.return_value = _response(status=304)
+        self.assertEqual(self.api.get_forecast(60.0, 10.0), {'n': 1})
+        headers = self.api.session.get.call_args.kwargs['headers']
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(headers['If-Modified-Since'], 'Mon, 01 Jan 2024 00:00:00 GMT')
+
+    def test_invalid_expires_is_not_cached(self):
+        self.api.session.get.return_value = _response(body={'n': 1}, headers={'Expires': 'soon'})
+        self.api.get_forecast(60.0, 10.0)
+        self.api.get_forecast(60.0, 10.0)
+        self.assertEqual(self.api.session.get.call_count, 2)
+
+    def test_cache_bounded_and_expired_entries_dropped(self):
+        fresh = formatdate(time.time() + 3600, usegmt=True)
+        expired = formatdate(time.time() - 60, usegmt=True)
+        self.api.session.get.return_value = _response(body={'n': 1}, headers={'Expires': expired})
+        self.api.get_forecast(50.0, 5.0)
+        self.api.session.get.return_value = _response(body={'n': 1}, headers={'Expires': fresh})
+        with mock.patch.object(type(self.api), '_CACHE_SIZE', 2):
+            for lon in (1.0, 2.0, 3.0):
+                self.api.get_forecast(60.0, lon)
+        self.assertEqual(list(self.api._cache), [(60.0, 2.0), (60.0, 3.0)])
+
+    def test_brotli_requested_only_when_decodable(self):
+        from first_mcp import weather
+        encodings = weather.WeatherAPI().session.headers['Accept-Encoding'].split(', ')
+        self.assertIn('gzip', encodings)
+        self.assertEqual('br' in encodings, weather.BROTLI_AVAILABLE)
+
+    def test_non_ascii_body_decoded(self):
+        self.api.session.get.return_value = _response(body={'name': 'Tromsø'})
+        self.assertEqual(self.api.get_forecast(69.6, 18.9), {'name': 'Tromsø'})
+
+    def test_current_conditions_follow_the_forecast(self):
+        def forecast(temperature):
+            return {'properties': {'timeseries': [
+                {'time': 't0', 'data': {'instant': {'details': {'air_temperature': temperature}}}}]}}
+
+        expired = formatdate(time.time() - 60, usegmt=True)
+        self.api.session.get.return_value = _response(body=forecast(5.0), headers={'Expires': expired})
+        first = self.api.get_current_weather(60.0, 10.0)
+        self.assertEqual((first['time'], first['temperature']), ('t0', 5.0))
+        self.assertEqual(first['location'], {'latitude': 60.0, 'longitude': 10.0})
+
+        self.api.session.get.return_value = _response(status=304, headers={'Expires': expired})
+        self.assertEqual(self.api.get_current_weather(60.0, 10.0)['temperature'], 5.0)
+
+        self.api.session.get.return_value = _response(body=forecast(7.0))
+        self.assertEqual(self.api.get_current_weather(60.0, 10.0)['temperature'], 7.0)
+
+        self.api.session.get.return_value = _response(body={'properties': {'timeseries': []}})
+        self.assertEqual(self.api.get_current_weather(60.0, 10.0), {"error": "No weather data available"})
+
+
+class TestRateLimit(unittest.TestCase):
+
+    def setUp(self):
+        from first_mcp import weather
+        self.weather = weather
+
+    def test_bucket_sleeps_only_when_empty(self):
+        bucket = self.weather._TokenBucket(capacity=2, rate=10.0)
+        with mock.patch.object(self.weather.time, 'monotonic', return_value=bucket.last_refill), \
+                mock.patch.object(self.weather.time, 'sleep') as sleep:
+            bucket.acquire()
+            bucket.acquire()
+            sleep.assert_not_called()
+            bucket.acquire()
+        self.assertAlmostEqual(sleep.call_args.args[0], 0.1)
+
+    def test_429_is_retried(self):
+        self.weather.WeatherAPI._cache.clear()
+        api = self.weather.WeatherAPI()
+        api.session = mock.MagicMock()
+        api.session.get.side_effect = [_response(status=429), _response(body={'n': 1})]
+        with mock.patch.object(self.weather.WeatherAPI, '_bucket', self.weather._TokenBucket()), \
+                mock.patch.object(self.weather.time, 'sleep'):
+            self.assertEqual(api.get_forecast(61.0, 11.0), {'n': 1})
+        self.assertEqual(api.session.get.call_count, 2)
+        self.weather.WeatherAPI._cache.clear()
+
+
+
+class TestGeocodeMany(unittest.TestCase):
+
+    def test_results_keyed_in_input_order(self):
+        from first_mcp import weather
+        api = weather.GeocodingAPI(api_key='test-key')
+        api.session = mock.MagicMock()
+        api.session.get.side_effect = lambda url, params, timeout: _response(
+            body=[{'name': params['q'], 'limit': params['limit']}])
+        with mock.patch.object(weather.GeocodingAPI, '_bucket', weather._TokenBucket(capacity=10)):
+            results = api.geocode_many(['Oslo', 'Bergen', 'Oslo', 'Tromsø'], limit=1)
+        self.assertEqual(list(results), ['Oslo', 'Bergen', 'Tromsø'])
+        self.assertEqual(results['Bergen'], [{'name': 'Bergen', 'limit': 1}])
+        self.assertEqual(api.session.get.call_count, 3)
+        self.assertEqual(api.geocode_many([]), {})
+
+    def test_session_pool_and_retries(self):
+        from first_mcp import weather
+        adapter = weather.GeocodingAPI(api_key='test-key').session.get_adapter(
+            weather.GeocodingAPI.BASE_URL)
+        self.assertEqual(adapter._pool_maxsize, weather.GeocodingAPI.POOL_SIZE)
+        self.assertEqual(adapter.max_retries.total, weather.GeocodingAPI.MAX_RETRIES)
+        self.assertNotIn(429, adapter.max_retries.status_forcelist)
+
+
+if __name__ == '__main__':
+    unittest.main()